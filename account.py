@@ -0,0 +1,225 @@
+# Account state of one strategy run (the globals of get_info.py in one dict)
+# and the glue that feeds it through TradeManager.open_* / close_*
+
+def new_account(balance=1000, leverage=5):
+    return {
+        "balance": balance,
+        "balance_without_fee": balance,
+        "first_balance": balance,
+        "tactical_balance": balance,
+        "leverage": leverage,
+        "current_position": None,  # None | "long" | "short"
+
+        # open position
+        "entry_price": None,
+        "position_size": None,
+        "position_size_no_fee": None,
+        "margin": None,
+        "margin_no_fee": None,
+        "balance_before_trade": None,
+        "balance_before_trade_no_fee": None,
+        "open_time_value": None,
+
+        # margin locked in the lots of trade_manager.positions (lot mode)
+        "lot_margin": 0,
+
+        # counters / trackers
+        "deducting_fee_total": 0,
+        "profits_lst": [],
+        "total_profit_percent": 0,
+        "count_closed_orders": 0,
+        "equity_curve": [],
+        "max_drawdown": 0,
+        "total_wins": 0,
+        "total_wins_long": 0,
+        "total_wins_short": 0,
+        "total_losses": 0,
+        "total_long": 0,
+        "total_short": 0,
+
+        # cooldown / monthly close filter
+        "cooldown_until_index": -1,
+        "trade_power": True,
+        "profit_percent_per_month": 0,
+        "lst_profit_percent_per_month": [],
+        "save_money": 0,
+    }
+
+
+# balance + margin locked in the open position (or lots)
+def total_balance(account):
+    locked = account["margin"] if account["current_position"] is not None else 0
+    return account["balance"] + locked + account.get("lot_margin", 0)
+
+
+def open_position(trade_manager, account, side, price, time_str, trade_amount_percent, total_balance_value):
+    opener = trade_manager.open_long if side == "long" else trade_manager.open_short
+    updates = opener(
+        price,
+        time_str,
+        account["balance"],
+        account["balance_without_fee"],
+        account["first_balance"],
+        trade_amount_percent,
+        total_balance_value,
+        account["leverage"])
+
+    for key in ("entry_price", "balance", "balance_without_fee", "balance_before_trade",
+                "balance_before_trade_no_fee", "margin", "leverage", "position_size",
+                "margin_no_fee", "position_size_no_fee", "open_time_value", "current_position"):
+        account[key] = updates[key]
+    return updates
+
+
+def close_position(trade_manager, account, price, time_str, fee_rate, cooldown_after_big_pnl, trade_amount_percent, csv_logger=None):
+    side = account["current_position"]
+    if side == "long":
+        closer, wins_key, count_key = trade_manager.close_long, "total_wins_long", "total_long"
+    else:
+        closer, wins_key, count_key = trade_manager.close_short, "total_wins_short", "total_short"
+
+    updates = closer(
+        price,
+        time_str,
+        account["entry_price"],
+        account["position_size"],
+        account["position_size_no_fee"],
+        fee_rate,
+        account["margin"],
+        account["margin_no_fee"],
+        account["balance"],
+        account["balance_without_fee"],
+        account["balance_before_trade"],
+        account["balance_before_trade_no_fee"],
+        account["deducting_fee_total"],
+        account["profits_lst"],
+        account["total_profit_percent"],
+        account["count_closed_orders"],
+        account["equity_curve"],
+        account["max_drawdown"],
+        account["total_wins"],
+        account[wins_key],
+        account["total_losses"],
+        account[count_key],
+        cooldown_after_big_pnl,
+        account["leverage"],
+        account["cooldown_until_index"],
+        account["open_time_value"],
+        csv_logger if csv_logger is not None else trade_manager.csv_logger,
+        trade_amount_percent,
+        account["profit_percent_per_month"],
+        account["save_money"],
+        account["trade_power"])
+
+    for key in ("balance", "balance_without_fee", "deducting_fee_total", "profits_lst",
+                "total_profit_percent", "count_closed_orders", "equity_curve", "max_drawdown",
+                "total_wins", wins_key, "total_losses", count_key, "cooldown_until_index",
+                "current_position", "profit_percent_per_month", "save_money", "trade_power"):
+        account[key] = updates[key]
+    account["tactical_balance"] = trade_manager.tactical_balance
+    return updates
+
+
+# ---------- LOTS (trade_manager.positions: many positions per symbol) ----------
+
+def open_lot(trade_manager, account, name, symbol, side, price, time_str, trade_amount_percent,
+             total_balance_value=None, order_id=None):
+    """
+    Open one more lot: same sizing as open_position, but the account keeps no
+    position fields, the lot goes into trade_manager.positions
+
+    returns TradeManager.open_long / open_short updates + "lot"
+    """
+    opener = trade_manager.open_long if side == "long" else trade_manager.open_short
+    if total_balance_value is None:
+        total_balance_value = total_balance(account)
+    updates = opener(
+        price,
+        time_str,
+        account["balance"],
+        account["balance_without_fee"],
+        account["first_balance"],
+        trade_amount_percent,
+        total_balance_value,
+        account["leverage"])
+
+    account["balance"] = updates["balance"]
+    account["balance_without_fee"] = updates["balance_without_fee"]
+    updates["lot"] = trade_manager.positions.open(
+        name, symbol, side, updates["entry_price"], updates["open_time_value"], updates["position_size"],
+        updates["margin"], updates["leverage"], size_no_fee=updates["position_size_no_fee"],
+        margin_no_fee=updates["margin_no_fee"], order_id=order_id)
+    account["lot_margin"] = trade_manager.positions.locked_margin(name)
+    return updates
+
+
+def close_lot(trade_manager, account, lot_id, price, time_str, fee_rate, cooldown_after_big_pnl, trade_amount_percent,
+              fraction=1.0, csv_logger=None):
+    """
+    Close a lot (or `fraction` of it) with TradeManager.close_long / close_short.
+    The balance before the trade is the balance with this part's margin given
+    back, so with one lot the numbers are the ones close_position gives. The
+    margin still locked in the other lots counts as equity for the monthly
+    profit, the save_money refill / transfer and the equity curve.
+
+    returns the close updates + "lot" (the closed part)
+    """
+    book = trade_manager.positions
+    part = book.part(lot_id, fraction)
+    if part["side"] == "long":
+        closer, wins_key, count_key = trade_manager.close_long, "total_wins_long", "total_long"
+    else:
+        closer, wins_key, count_key = trade_manager.close_short, "total_wins_short", "total_short"
+
+    updates = closer(
+        price,
+        time_str,
+        part["entry_price"],
+        part["size"],
+        part["size_no_fee"],
+        fee_rate,
+        part["margin"],
+        part["margin_no_fee"],
+        account["balance"],
+        account["balance_without_fee"],
+        account["balance"] + part["margin"],
+        account["balance_without_fee"] + part["margin_no_fee"],
+        account["deducting_fee_total"],
+        account["profits_lst"],
+        account["total_profit_percent"],
+        account["count_closed_orders"],
+        account["equity_curve"],
+        account["max_drawdown"],
+        account["total_wins"],
+        account[wins_key],
+        account["total_losses"],
+        account[count_key],
+        cooldown_after_big_pnl,
+        part["leverage"],
+        account["cooldown_until_index"],
+        part["open_time"],
+        csv_logger if csv_logger is not None else trade_manager.csv_logger,
+        trade_amount_percent,
+        account["profit_percent_per_month"],
+        account["save_money"],
+        account["trade_power"],
+        # margin of the other lots (and the rest of this one): monthly %, refill and equity see all of it
+        locked_margin=book.locked_margin(part["account"]) - part["margin"])
+
+    for key in ("balance", "balance_without_fee", "deducting_fee_total", "profits_lst",
+                "total_profit_percent", "count_closed_orders", "equity_curve", "max_drawdown",
+                "total_wins", wins_key, "total_losses", count_key, "cooldown_until_index",
+                "profit_percent_per_month", "save_money", "trade_power"):
+        account[key] = updates[key]
+    account["tactical_balance"] = trade_manager.tactical_balance
+    updates["lot"] = book.close(lot_id, price, time_str, fraction, updates["profit"], updates["profit_percent"])
+    account["lot_margin"] = book.locked_margin(part["account"])
+    return updates
+
+
+# close every lot of one side, oldest first -> list of close updates
+def close_lots(trade_manager, account, name, symbol, side, price, time_str, fee_rate, cooldown_after_big_pnl,
+               trade_amount_percent, csv_logger=None):
+    return [close_lot(trade_manager, account, lot["id"], price, time_str, fee_rate, cooldown_after_big_pnl,
+                      trade_amount_percent, csv_logger=csv_logger)
+            for lot in trade_manager.positions.lots(name, symbol, side)]
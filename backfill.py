@@ -0,0 +1,251 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+import numpy as np
+import requests
+
+from candles import klines_to_candles, empty_candles, concat_candles, save_candles, load_candles
+from ratelimit import shared_limiter, kline_flight, klines_weight
+from resampler import interval_to_ms
+
+BINANCE_URL = "https://api.binance.com"
+PAGE_LIMIT = 1000  # max candles per klines call
+
+
+# "2024-01-01" / "2024-01-01 12:00" / ms -> ms (UTC)
+def to_ms(value):
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    dt = datetime.fromisoformat(str(value))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+# ---------- CANDLE STORE ----------
+# store_dir/SYMBOL/INTERVAL/<page start ms>.npz, one file per page (candles.save_candles format).
+# a page file is only written once its whole range was fetched, so the files are the resume checkpoint.
+
+def page_dir(store_dir, symbol, interval):
+    return os.path.join(store_dir, symbol.upper(), interval)
+
+
+def page_starts(start_ms, end_ms, interval, page_limit=PAGE_LIMIT):
+    step = interval_to_ms(interval)
+    first = start_ms // step * step
+    return list(range(first, end_ms, step * page_limit))
+
+
+def stored_pages(store_dir, symbol, interval):
+    path = page_dir(store_dir, symbol, interval)
+    if not os.path.isdir(path):
+        return set()
+    return {int(name[:-4]) for name in os.listdir(path) if name.endswith(".npz") and name[:-4].isdigit()}
+
+
+def load_store(store_dir, symbol, interval, start=None, end=None):
+    """
+    Candles of the store in [start, end), sorted, duplicates removed
+    returns dict of arrays (candles.CANDLE_FIELDS)
+    """
+    path = page_dir(store_dir, symbol, interval)
+    pages = [load_candles(os.path.join(path, f"{page}.npz")) for page in sorted(stored_pages(store_dir, symbol, interval))]
+    candles = dedupe_candles(concat_candles(*pages) if pages else empty_candles())
+
+    open_times = candles["open_times"]
+    lo = 0 if start is None else np.searchsorted(open_times, to_ms(start))
+    hi = len(open_times) if end is None else np.searchsorted(open_times, to_ms(end))
+    return {field: values[lo:hi] for field, values in candles.items()}
+
+
+# ---------- CHECKS (vectorized) ----------
+
+def dedupe_candles(candles):
+    """sort by open time, keep the last copy of a repeated candle"""
+    open_times = candles["open_times"]
+    if len(open_times) == 0:
+        return candles
+    order = np.argsort(open_times, kind="stable")
+    sorted_times = open_times[order]
+    keep = np.ones(len(order), dtype=bool)
+    keep[:-1] = sorted_times[1:] != sorted_times[:-1]
+    return {field: values[order][keep] for field, values in candles.items()}
+
+
+def check_candles(candles, interval, start_ms=None, end_ms=None):
+    """
+    returns dict: duplicates (count), gaps [(first missing open ms, end ms)],
+                  missing (candles), misaligned (open times not on the interval grid)
+    """
+    step = interval_to_ms(interval)
+    open_times = np.sort(candles["open_times"])
+    diffs = np.diff(open_times)
+
+    gaps = []
+    for i in np.flatnonzero(diffs > step).tolist():
+        gaps.append((int(open_times[i]) + step, int(open_times[i + 1])))
+    if len(open_times) and start_ms is not None and open_times[0] > start_ms:
+        gaps.insert(0, (start_ms, int(open_times[0])))
+    if len(open_times) and end_ms is not None and open_times[-1] + step < end_ms:
+        gaps.append((int(open_times[-1]) + step, end_ms))
+    if len(open_times) == 0 and start_ms is not None and end_ms is not None:
+        gaps.append((start_ms, end_ms))
+
+    return {
+        "duplicates": int((diffs == 0).sum()),
+        "gaps": gaps,
+        "missing": sum((hi - lo) // step for lo, hi in gaps),
+        "misaligned": int((open_times % step != 0).sum()),
+    }
+
+
+# ---------- FETCH ----------
+
+class KlineFetcher:
+    """
+    GET /api/v3/klines from many threads under one WeightLimiter
+    (one requests.Session per thread, retries on 429/418/5xx/network errors)
+
+    limiter : default = ratelimit.shared_limiter(), the process wide one
+    identical requests running at the same time share one call (ratelimit.kline_flight)
+    """
+
+    def __init__(self, base_url=BINANCE_URL, limiter=None, retries=6, timeout=10):
+        self.base_url = base_url.rstrip("/")
+        self.limiter = limiter or shared_limiter()
+        self.retries = retries
+        self.timeout = timeout
+        self.local = threading.local()
+        self.calls = 0
+        self.throttled = 0
+        self.duplicates = 0
+
+    def session(self):
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    # start_ms / end_ms None = the latest `limit` candles (last one still forming)
+    def get(self, symbol, interval, start_ms=None, end_ms=None, limit=PAGE_LIMIT):
+        params = {"symbol": symbol.upper(), "interval": interval, "limit": limit}
+        if start_ms is not None:
+            params["startTime"] = start_ms
+        if end_ms is not None:
+            params["endTime"] = end_ms
+        key = (self.base_url, params["symbol"], interval, start_ms, end_ms, limit)
+        return kline_flight.do(key, lambda: self._get(params))
+
+    def _get(self, params):
+        symbol, interval, limit = params["symbol"], params["interval"], params["limit"]
+        for attempt in range(self.retries):
+            self.limiter.acquire(klines_weight(limit))
+            try:
+                response = self.session().get(f"{self.base_url}/api/v3/klines", params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                error = e
+                time.sleep(min(2 ** attempt * 0.5, 30))
+                continue
+            self.calls += 1
+            self.limiter.observe(response.headers)
+
+            if response.status_code in (418, 429):
+                self.throttled += 1
+                self.limiter.backoff(float(response.headers.get("Retry-After", 60)))
+                error = RuntimeError(f"throttled ({response.status_code})")
+                continue
+            if response.status_code >= 500:
+                error = RuntimeError(f"server error {response.status_code}")
+                time.sleep(min(2 ** attempt * 0.5, 30))
+                continue
+            response.raise_for_status()
+            return klines_to_candles(response.json())
+        raise RuntimeError(f"klines {symbol} {interval} {params.get('startTime')}: gave up after {self.retries} tries: {error}")
+
+    # one page = up to page_limit candles from page_start
+    def get_page(self, symbol, interval, page_start, page_limit=PAGE_LIMIT):
+        page_end = page_start + interval_to_ms(interval) * page_limit - 1
+        candles = self.get(symbol, interval, page_start, page_end, limit=page_limit)
+        keep = (candles["open_times"] >= page_start) & (candles["open_times"] <= page_end)
+        page = dedupe_candles({field: values[keep] for field, values in candles.items()})
+        self.duplicates += int(keep.sum()) - len(page["open_times"])
+        return page
+
+
+# ---------- BACKFILL ----------
+
+def backfill(symbol, interval, start, end=None, store_dir="candle_store", base_url=BINANCE_URL,
+             workers=8, limiter=None, page_limit=PAGE_LIMIT, refill=True, now_ms=None, verbose=True):
+    """
+    Download [start, end) into the candle store, page by page, `workers` pages at a time
+
+    end      : default = last closed candle
+    refill   : after the download, fetch again the pages around gaps found by check_candles()
+               (whatever is still missing afterwards is reported, the exchange has real gaps)
+
+    resumable: pages already in the store are skipped
+
+    returns dict: pages, fetched, skipped, calls, throttled, seconds, check (check_candles of the range)
+    """
+    step = interval_to_ms(interval)
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    last_closed = (now_ms // step) * step  # open time of the candle still forming
+    start_ms = to_ms(start) // step * step
+    end_ms = min(last_closed, to_ms(end)) if end is not None else last_closed
+
+    path = page_dir(store_dir, symbol, interval)
+    os.makedirs(path, exist_ok=True)
+    fetcher = KlineFetcher(base_url, limiter=limiter)
+    t = time.perf_counter()
+
+    def fetch(pages):
+        done = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(fetcher.get_page, symbol, interval, page, page_limit): page for page in pages}
+            for future in as_completed(futures):
+                page = futures[future]
+                candles = future.result()
+                # a page reaching into the present would be incomplete: keep only closed candles
+                keep = candles["open_times"] < end_ms
+                save_candles(os.path.join(path, f"{page}.npz"), {f: v[keep] for f, v in candles.items()})
+                done += 1
+                if verbose and done % 50 == 0:
+                    print(f"backfill {symbol} {interval}: {done}/{len(pages)} pages")
+        return done
+
+    pages = page_starts(start_ms, end_ms, interval, page_limit)
+    # the last page may have been saved while it still reached past `end`: fetch it again
+    have = stored_pages(store_dir, symbol, interval) - {pages[-1]} if pages else set()
+    todo = [page for page in pages if page not in have]
+    fetched = fetch(todo)
+
+    candles = load_store(store_dir, symbol, interval, start_ms, end_ms)
+    check = check_candles(candles, interval, start_ms, end_ms)
+    if refill and (check["gaps"] or check["duplicates"]):
+        # pages overlapping a gap
+        starts = np.asarray(pages, dtype=np.int64)
+        gaps = np.asarray(check["gaps"], dtype=np.int64).reshape(-1, 2)
+        overlap = (starts[:, None] < gaps[:, 1]) & (starts[:, None] + step * page_limit > gaps[:, 0])
+        fetched += fetch(starts[overlap.any(axis=1)].tolist())
+        candles = load_store(store_dir, symbol, interval, start_ms, end_ms)
+        check = check_candles(candles, interval, start_ms, end_ms)
+
+    result = {
+        "pages": len(pages),
+        "fetched": fetched,
+        "skipped": len(pages) - len(todo),
+        "candles": len(candles["open_times"]),
+        "calls": fetcher.calls,
+        "throttled": fetcher.throttled,
+        "duplicates": fetcher.duplicates,
+        "waited": fetcher.limiter.waited,
+        "seconds": time.perf_counter() - t,
+        "check": check,
+    }
+    if verbose:
+        print(f"backfill {symbol} {interval}: {result['candles']} candles | {fetched} pages fetched, "
+              f"{result['skipped']} already stored | {len(check['gaps'])} gaps ({check['missing']} candles) "
+              f"| {result['seconds']:.1f} s")
+    return result
@@ -0,0 +1,320 @@
+import copy
+
+import numpy as np
+
+from account import new_account, close_position
+from candles import close_time_str, month_starts, slice_candles
+from indicator_cache import data_fingerprint, get_default_cache
+from intrabar import SubBars
+from rules import tick_orders
+from signals import indicator_arrays, signal_conditions, slice_arrays, SignalEvents
+from trade_csv_logger import TradeCSVLogger
+from trademanager import TradeManager
+
+# same values as the settings in get_info.py
+DEFAULT_PARAMS = {
+    "balance": 1000,
+    "leverage": 5,
+    "trade_amount_percent": 0.5,
+    "monthly_profit_percent_stop_trade": 8,
+    "monthly_compound": 3,
+    "monthly_close_filter": True,
+    "cooldown_after_big_pnl": 4 * 46,
+    "fee_rate": 0.0005,
+
+    "ma_distance_threshold": 0.00204,
+    "candle_move_threshold": 0.0082,
+    "adx_filter": True,
+    "adx_threshold": 20.5,
+    "volume_filter": True,
+    "volume_multiplier": 1.2,
+    "strong_body_ratio": 0.6,
+
+    # protective exits, price move in % from entry (None = off, exits only on signals)
+    "stop_loss_percent": None,
+    "take_profit_percent": None,
+    "maintenance_rate": 0.005,
+
+    # lots per side (pyramiding) and long + short at once, StrategyEngine only
+    # (max_lots > 1 or hedge puts the strategy on a positions.PositionBook)
+    "max_lots": 1,
+    "hedge": False,
+}
+
+# params that only change the entry/exit conditions (indicators stay the same)
+SIGNAL_PARAMS = ("ma_distance_threshold", "candle_move_threshold", "adx_filter", "adx_threshold",
+                 "volume_filter", "volume_multiplier", "strong_body_ratio")
+
+
+# indicator_arrays() name -> candle field (not cached, taken from the candles themselves)
+RAW_ARRAYS = {"open": "open_prices", "high": "high_prices", "low": "low_prices",
+              "close": "close_prices", "volume": "volume_prices"}
+
+
+def candle_arrays(candles, volume_window=15, symbol=None, interval="15m", cache=None, follow_stream=False):
+    """
+    signals.indicator_arrays() of a candle set, through the indicator cache: the
+    same candles (sweeps, backtest reruns, engines on one feed) are computed once
+
+    cache         : indicator_cache.IndicatorCache, default the process cache, False = no cache
+    follow_stream : live feed, drop the cached arrays of the previous candle range
+
+    the indicator arrays are shared and read-only
+    """
+    fields = [candles[field] for field in RAW_ARRAYS.values()]
+    if cache is False:
+        return indicator_arrays(*fields, volume_window=volume_window)
+
+    cache = cache if cache is not None else get_default_cache()
+    fingerprint = data_fingerprint(candles["open_times"], *fields)
+    if follow_stream:
+        cache.advance_stream(symbol, interval, fingerprint)
+
+    def compute():
+        arrays = indicator_arrays(*fields, volume_window=volume_window)
+        for name in RAW_ARRAYS:
+            del arrays[name]
+        for values in arrays.values():
+            values.flags.writeable = False
+        return arrays
+
+    indicators = cache.get_or_compute((symbol, interval, fingerprint, "indicator_arrays", (volume_window,)), compute)
+    arrays = {name: np.asarray(candles[field], dtype=float) for name, field in RAW_ARRAYS.items()}
+    arrays.update(indicators)
+    return arrays
+
+
+# replay ma_strategy over a candle history
+def run_backtest(candles, params=None, arrays=None, start=0, end=None, close_at_end=True, sub_candles=None,
+                 resume=None):
+    """
+    Run the live rules (same TradeManager accounting) over history
+
+    candles      : dict of arrays (see candles.CANDLE_FIELDS)
+    params       : overrides for DEFAULT_PARAMS
+    arrays       : candle_arrays(candles), pass it to reuse the indicators between runs
+    start / end  : candles to trade [start, end), indicators still see the candles before start
+    close_at_end : close a position still open on the last candle
+    sub_candles  : 1m candles under `candles`, stop loss / take profit / liquidation
+                   are resolved on them (first touch). with only stop_loss_percent /
+                   take_profit_percent set, the candles' own high/low are used
+    resume       : result["resume"] of an earlier run with the same params / start and
+                   close_at_end=False: continue it up to `end` instead of starting over
+                   (same result as one run over the whole range)
+
+    Only candles where the position can change are visited: flat -> next entry
+    signal, in a trade -> next exit signal, cooldown and the monthly stop are
+    jumped over in one step. With protective exits the sub bars between two
+    visited candles are searched in one vectorized call.
+    """
+    p = dict(DEFAULT_PARAMS)
+    p.update(params or {})
+
+    if arrays is None:
+        arrays = candle_arrays(candles)
+    n = len(arrays["close"])
+    end = n if end is None else min(end, n)
+    length = max(end - start, 0)
+
+    window = slice_arrays(arrays, start, end)
+    conditions = signal_conditions(window, **{name: p[name] for name in SIGNAL_PARAMS})
+    entry_long = conditions["entry_long"]
+    entry_short = conditions["entry_short"]
+    exit_long = conditions["exit_long"]
+    exit_short = conditions["exit_short"]
+    events = SignalEvents(conditions)
+
+    closes = window["close"]
+    close_times = candles["close_times"][start:end]
+    new_months = np.flatnonzero(month_starts(candles["close_times"])[start:end])
+    new_month_set = set(new_months.tolist())
+
+    if resume is not None and resume["start"] != start:
+        raise ValueError(f"resume state starts at {resume['start']}, not {start}")
+    state = copy.deepcopy(resume) if resume is not None else None
+
+    account = state["account"] if state else new_account(balance=p["balance"], leverage=p["leverage"])
+    csv_logger = TradeCSVLogger()
+    trade_manager = TradeManager(csv_logger, account["first_balance"], p["monthly_profit_percent_stop_trade"],
+                                 account["tactical_balance"], p["monthly_close_filter"], p["monthly_compound"],
+                                 verbose=False, stop_loss_percent=p["stop_loss_percent"],
+                                 take_profit_percent=p["take_profit_percent"], maintenance_rate=p["maintenance_rate"])
+    if state:
+        trade_manager.tactical_balance = state["tactical_balance"]
+
+    protective = sub_candles is not None or p["stop_loss_percent"] is not None or p["take_profit_percent"] is not None
+    if protective:
+        bars = SubBars(slice_candles(candles, start, end) if sub_candles is None else sub_candles, close_times)
+    # levels of the open position, candle up to which its sub bars were checked
+    guard = state["guard"] if state else {"levels": None, "checked": None}
+
+    trades = state["trades"] if state else []
+    equity_index = state["equity_index"] if state else [start]
+    equity = state["equity"] if state else [account["balance"]]
+
+    def record_close(i, updates, price=None, reason="signal"):
+        trades[-1].update({
+            "close_index": start + i,
+            "close_price": float(closes[i] if price is None else price),
+            "profit": updates["profit"],
+            "profit_percent": updates["profit_percent"],
+            "exit": reason,
+        })
+        equity_index.append(start + i)
+        equity.append(account["balance"] + account["save_money"])
+
+    def record_open(i, side):
+        trades.append({
+            "side": side,
+            "open_index": start + i,
+            "entry_price": float(closes[i]),
+            "leverage": account["leverage"],
+            "margin": account["margin"],
+            "close_index": None,
+        })
+        if protective:
+            guard["levels"] = trade_manager.protective_levels(side, float(closes[i]), account["leverage"])
+            guard["checked"] = i
+
+    # stop / take profit / liquidation between the close of guard["checked"] and the close of candle i
+    def protective_exit(i):
+        side = account["current_position"]
+        levels = guard["levels"]
+        adverse = levels["stop_price"] if levels["stop_price"] is not None else levels["liquidation_price"]
+        if side == "long":
+            adverse = max(adverse, levels["liquidation_price"])
+            j = bars.first_touch(guard["checked"], i, below=adverse, above=levels["take_profit_price"])
+        else:
+            adverse = min(adverse, levels["liquidation_price"])
+            j = bars.first_touch(guard["checked"], i, below=levels["take_profit_price"], above=adverse)
+        guard["checked"] = i
+        if j is None:
+            return None
+
+        reason, fill = trade_manager.intrabar_exit(side, levels, bars.opens[j], bars.highs[j], bars.lows[j])
+        c = bars.candle_of(j)
+        updates = close_position(trade_manager, account, fill, close_time_str(bars.close_times[j]),
+                                 p["fee_rate"], p["cooldown_after_big_pnl"], p["trade_amount_percent"])
+        record_close(c, updates, fill, reason)
+        return c
+
+    i = state["position"] if state else 0
+    while i < length:
+        # in a trade: anything hit before this candle closed? the tick of that candle ends
+        # with the exit (as in ma_strategy, no new order on it), go on from the next one
+        guarded = protective and account["current_position"] is not None
+        if guarded and i > guard["checked"]:
+            c = protective_exit(i)
+            if c is not None:
+                i = c + 1
+                continue
+
+        # ---- Monthly close filter ----
+        # (candle by candle when a position is open, its stops still run)
+        if guarded and p["monthly_close_filter"] and not account["trade_power"] and i not in new_month_set:
+            i += 1
+            continue
+        if p["monthly_close_filter"] and not account["trade_power"]:
+            pos = np.searchsorted(new_months, i)
+            if pos >= len(new_months):
+                break
+            i = int(new_months[pos])
+            account["lst_profit_percent_per_month"].append(account["profit_percent_per_month"])
+            account["profit_percent_per_month"] = 0
+            account["trade_power"] = True
+
+        # ---- Cooldown ----
+        if account["cooldown_until_index"] > 0:
+            skip = 1 if guarded else min(account["cooldown_until_index"], length - i)
+            account["cooldown_until_index"] -= skip
+            i += skip
+            continue
+
+        # ---- one tick of ma_strategy ----
+        actions = tick_orders(account, trade_manager, p, entry_long[i], exit_long[i], entry_short[i], exit_short[i],
+                              closes[i], close_time_str(close_times[i]))
+        for action, updates in actions:
+            if action.startswith("open"):
+                record_open(i, action.split("_")[1])
+            else:
+                record_close(i, updates)
+
+        # ---- jump to the next candle that can change something ----
+        if account["cooldown_until_index"] > 0 or (p["monthly_close_filter"] and not account["trade_power"]):
+            i += 1
+            continue
+        if account["current_position"] is None:
+            nxt = events.next_any(("entry_long", "entry_short"), i + 1)
+        elif account["current_position"] == "long":
+            nxt = events.next("exit_long", i + 1)
+        else:
+            nxt = events.next("exit_short", i + 1)
+        # no exit signal left: the stops can still close it, visit the last candle to search them
+        if nxt is None and protective and account["current_position"] is not None and i + 1 < length:
+            nxt = length - 1
+        i = length if nxt is None else nxt
+
+    # where a resumed run picks up (the loop may have jumped past the end)
+    position = min(i, length)
+    if protective and account["current_position"] is not None and length - 1 > guard["checked"]:
+        c = protective_exit(length - 1)
+        if c is not None:
+            position = c
+
+    if close_at_end and length > 0 and account["current_position"] is not None:
+        last = length - 1
+        updates = close_position(trade_manager, account, closes[last], close_time_str(close_times[last]),
+                                 p["fee_rate"], p["cooldown_after_big_pnl"], p["trade_amount_percent"])
+        record_close(last, updates)
+        trades[-1]["forced"] = True
+
+    result = backtest_result(p, start, end, account, trades, equity_index, equity)
+    if not close_at_end:
+        result["resume"] = {
+            "start": start,
+            "position": position,
+            "account": account,
+            "tactical_balance": trade_manager.tactical_balance,
+            "guard": guard,
+            "trades": trades,
+            "equity_index": equity_index,
+            "equity": equity,
+        }
+    return result
+
+
+def backtest_result(params, start, end, account, trades, equity_index, equity):
+    equity = np.asarray(equity, dtype=float)
+    closed = [t for t in trades if t["close_index"] is not None]
+    wins = sum(1 for t in closed if t["profit_percent"] > 0)
+
+    final_equity = account["balance"] + account["save_money"]
+    if account["current_position"] is not None:
+        final_equity += account["margin"]
+    final_equity += account.get("lot_margin", 0)
+
+    return {
+        "params": params,
+        "start": start,
+        "end": end,
+        "start_equity": account["first_balance"],
+        "final_equity": final_equity,
+        "return_percent": (final_equity / account["first_balance"] - 1) * 100,
+        "max_drawdown": equity_max_drawdown(equity),
+        "trades": len(closed),
+        "wins": wins,
+        "win_rate": wins * 100 / len(closed) if closed else 0.0,
+        "equity_index": np.asarray(equity_index, dtype=np.int64),
+        "equity": equity,
+        "trade_list": trades,
+        "account": account,
+    }
+
+
+# max drawdown in % (negative number, like TradeManager's max_drawdown)
+def equity_max_drawdown(equity):
+    equity = np.asarray(equity, dtype=float)
+    if len(equity) == 0:
+        return 0.0
+    peaks = np.maximum.accumulate(equity)
+    return float(((equity - peaks) / peaks * 100).min())
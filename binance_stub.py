@@ -0,0 +1,152 @@
+import argparse
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+from ratelimit import klines_weight, WEIGHT_HEADER
+from resampler import interval_to_ms
+
+
+class StubBinance(ThreadingHTTPServer):
+    """
+    Local stand-in for GET /api/v3/klines (deterministic random walk), to run
+    the backfill / live fetch code without network.
+
+    missing      : [(start_ms, end_ms)] ranges the "exchange" has no candles for
+    duplicates   : every page repeats its first candle (tests the dedup)
+    throttle_every: answer every n-th request with 429 + Retry-After
+    max_weight   : weight per minute before 429 (X-MBX-USED-WEIGHT-1M is always sent)
+    now_ms       : the exchange's "now" (no candle opens after it), or
+    clock        : a clock.SimulatedClock giving it (soak tests)
+    candles      : serve these candles (dict of arrays, e.g. a recorded / backfilled
+                   history) instead of the random walk
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port=0, start_ms=1_600_000_000_000, seed=0, missing=(), duplicates=False,
+                 throttle_every=None, max_weight=6000, now_ms=None, clock=None, candles=None):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.start_ms = start_ms
+        self.seed = seed
+        self.missing = list(missing)
+        self.duplicates = duplicates
+        self.throttle_every = throttle_every
+        self.max_weight = max_weight
+        self.now_ms = now_ms
+        self.clock = clock
+        self.candles = candles
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.weight = 0
+        self.window_start = time.monotonic()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def current_ms(self):
+        if self.clock is not None:
+            return int(self.clock.time() * 1000)
+        return self.now_ms
+
+    # same candle for the same open time, whatever page asks for it
+    def klines(self, interval, start_time, end_time, limit):
+        step = interval_to_ms(interval)
+        now_ms = self.current_ms()
+        if start_time is None:
+            # latest candles, like binance without startTime
+            end_time = min(end_time, int(time.time() * 1000) if now_ms is None else now_ms)
+            start_time = (end_time // step - limit + 1) * step
+        # candles sit on the interval grid (like binance), from start_ms on
+        first = -(-max(start_time, self.start_ms) // step) * step
+        open_times = np.arange(first, end_time + 1, step, dtype=np.int64)
+        if now_ms is not None:
+            open_times = open_times[open_times <= now_ms]
+        for lo, hi in self.missing:
+            open_times = open_times[(open_times < lo) | (open_times >= hi)]
+        open_times = open_times[:limit]
+
+        if self.candles is not None:
+            return self._stored_klines(open_times, step)
+
+        rows = []
+        for t in open_times.tolist():
+            n = t // step
+            rng = np.random.default_rng([self.seed, n])
+            close = 30000 * (1 + 0.0001 * (n % 997)) * (1 + rng.normal(scale=0.002))
+            open_ = close * (1 + rng.normal(scale=0.001))
+            rows.append([t, f"{open_:.2f}", f"{max(open_, close) * 1.001:.2f}", f"{min(open_, close) * 0.999:.2f}",
+                         f"{close:.2f}", f"{rng.random() * 100:.3f}", t + step - 1, "0", 0, "0", "0", "0"])
+        if self.duplicates and rows:
+            rows.insert(0, list(rows[0]))
+        return rows
+
+
+    def _stored_klines(self, open_times, step):
+        stored = self.candles["open_times"]
+        pos = np.clip(np.searchsorted(stored, open_times), 0, max(len(stored) - 1, 0))
+        pos = pos[stored[pos] == open_times] if len(stored) else pos[:0]
+        c = self.candles
+        return [[int(c["open_times"][k]), f"{c['open_prices'][k]:.2f}", f"{c['high_prices'][k]:.2f}",
+                 f"{c['low_prices'][k]:.2f}", f"{c['close_prices'][k]:.2f}", f"{c['volume_prices'][k]:.3f}",
+                 int(c["open_times"][k]) + step - 1, "0", 0, "0", "0", "0"] for k in pos.tolist()]
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, headers=()):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        if url.path != "/api/v3/klines":
+            return self._send(404, {"code": -1, "msg": "not found"})
+
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        limit = int(query.get("limit", 500))
+        with server.lock:
+            server.requests += 1
+            if time.monotonic() - server.window_start >= 60:
+                server.window_start = time.monotonic()
+                server.weight = 0
+            server.weight += klines_weight(limit)
+            throttled = (server.throttle_every and server.requests % server.throttle_every == 0) \
+                or server.weight > server.max_weight
+            weight = server.weight
+        if throttled:
+            return self._send(429, {"code": -1003, "msg": "Too many requests"},
+                              [("Retry-After", "1"), (WEIGHT_HEADER, str(weight))])
+
+        start_time = int(query["startTime"]) if "startTime" in query else None
+        rows = server.klines(query.get("interval", "15m"), start_time, int(query.get("endTime", 2 ** 62)), limit)
+        self._send(200, rows, [(WEIGHT_HEADER, str(weight))])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="local stub of the binance klines endpoint")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--throttle-every", type=int, default=None)
+    args = parser.parse_args()
+    stub = StubBinance(port=args.port, throttle_every=args.throttle_every)
+    print(f"stub binance on {stub.url}")
+    stub.serve_forever()
@@ -0,0 +1,101 @@
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+
+# same names as the lists in ma_strategy / columns of symbol_data
+CANDLE_FIELDS = ("open_times", "open_prices", "high_prices", "low_prices",
+                 "close_prices", "volume_prices", "close_times")
+TIME_FIELDS = ("open_times", "close_times")
+
+
+# binance kline json -> dict of numpy arrays (times stay in milliseconds)
+def klines_to_candles(data):
+    """
+    data : get_ohlcv() response (list of klines)
+
+    returns dict with CANDLE_FIELDS, times are int64 ms, prices float64
+    """
+    if len(data) == 0:
+        return empty_candles()
+
+    rows = np.array([row[:7] for row in data], dtype=object)
+    return {
+        "open_times": rows[:, 0].astype(np.int64),
+        "open_prices": rows[:, 1].astype(float),
+        "high_prices": rows[:, 2].astype(float),
+        "low_prices": rows[:, 3].astype(float),
+        "close_prices": rows[:, 4].astype(float),
+        "volume_prices": rows[:, 5].astype(float),
+        "close_times": rows[:, 6].astype(np.int64),
+    }
+
+
+def empty_candles():
+    return {
+        field: np.array([], dtype=np.int64 if field in TIME_FIELDS else float)
+        for field in CANDLE_FIELDS
+    }
+
+
+def slice_candles(candles, start, end=None):
+    return {field: values[start:end] for field, values in candles.items()}
+
+
+def concat_candles(*parts):
+    return {field: np.concatenate([part[field] for part in parts]) for field in CANDLE_FIELDS}
+
+
+# add new candles to a buffer, drop duplicates (same open time -> newest wins), keep the last maxlen
+def merge_candles(buffer, new, maxlen=None):
+    if buffer is None or len(buffer["open_times"]) == 0:
+        merged = {field: np.asarray(new[field]) for field in CANDLE_FIELDS}
+    elif len(new["open_times"]) == 0:
+        merged = buffer
+    else:
+        keep = buffer["open_times"] < new["open_times"][0]
+        merged = concat_candles(
+            {field: values[keep] for field, values in buffer.items()},
+            new)
+    if maxlen is not None and len(merged["open_times"]) > maxlen:
+        merged = slice_candles(merged, -maxlen)
+    return merged
+
+
+# same strings ma_strategy builds for open/close times (TradeManager parses them)
+def open_time_str(open_time_ms):
+    return str(datetime.fromtimestamp(open_time_ms / 1000, tz=timezone.utc))
+
+
+def close_time_str(close_time_ms):
+    return str(datetime.fromtimestamp((close_time_ms / 1000) + 0.001, tz=timezone.utc))
+
+
+# month number (year * 12 + month) of every candle close, UTC
+def close_months(close_times):
+    close_times = np.asarray(close_times, dtype=np.int64)
+    # binance close time is xx:59.999, the candle belongs to the month of close + 1ms
+    months = (close_times + 1).astype("datetime64[ms]").astype("datetime64[M]")
+    return months.astype(np.int64)
+
+
+# candles where a new month starts (same rule as the monthly close filter in ma_strategy)
+def month_starts(close_times):
+    months = close_months(close_times)
+    starts = np.ones(len(months), dtype=bool)
+    starts[1:] = months[1:] != months[:-1]
+    return starts
+
+
+# ---------- FILES ----------
+
+def save_candles(path, candles):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **{field: candles[field] for field in CANDLE_FIELDS})
+    os.replace(tmp_path, path)
+
+
+def load_candles(path):
+    with np.load(path) as data:
+        return {field: data[field] for field in CANDLE_FIELDS}
@@ -0,0 +1,56 @@
+import io
+import json
+import os
+
+import numpy as np
+
+from candles import CANDLE_FIELDS
+
+CHECKPOINT_VERSION = 1
+
+
+# write bot state + candle buffer to one binary file (atomic: tmp file + rename)
+def save_checkpoint(path, state, candles=None):
+    """
+    path    : checkpoint file
+    state   : dict of plain values (numbers, strings, None, lists)
+    candles : candle buffer (dict of arrays, see candles.CANDLE_FIELDS) or None
+    """
+    payload = {
+        "version": np.array(CHECKPOINT_VERSION),
+        "state": np.frombuffer(json.dumps(state, default=float).encode("utf-8"), dtype=np.uint8),
+    }
+    if candles is not None:
+        for field in CANDLE_FIELDS:
+            payload[field] = np.asarray(candles[field])
+
+    buf = io.BytesIO()
+    np.savez(buf, **payload)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(buf.getbuffer())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+# returns (state, candles) or (None, None) when there is no usable checkpoint
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return None, None
+
+    try:
+        with np.load(path) as data:
+            if int(data["version"]) != CHECKPOINT_VERSION:
+                print(f"checkpoint {path} has version {int(data['version'])}, ignoring it")
+                return None, None
+            state = json.loads(data["state"].tobytes().decode("utf-8"))
+            candles = None
+            if all(field in data.files for field in CANDLE_FIELDS):
+                candles = {field: data[field] for field in CANDLE_FIELDS}
+    except Exception as e:
+        print(f"checkpoint {path} can't be read ({e}), starting cold")
+        return None, None
+
+    return state, candles
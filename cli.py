@@ -0,0 +1,383 @@
+import time
+
+_started = time.perf_counter()
+
+import argparse
+import importlib
+import sys
+
+# modules are imported by the command that needs them, not here:
+# `report` never loads numpy/pandas/requests, `live` loads pandas on the first ADX
+_import_times = []
+
+
+def lazy_import(name):
+    t = time.perf_counter()
+    module = importlib.import_module(name)
+    _import_times.append((name, time.perf_counter() - t))
+    return module
+
+
+def print_startup_profile(command):
+    total = time.perf_counter() - _started
+    print(f"⏱ startup ({command}): {total * 1000:.1f} ms")
+    for name, seconds in _import_times:
+        print(f"   import {name:<14} {seconds * 1000:8.1f} ms")
+    heavy = [name for name in ("numpy", "pandas", "requests", "psutil") if name in sys.modules]
+    print(f"   heavy modules loaded: {', '.join(heavy) if heavy else 'none'}")
+
+
+# "0.002" -> 0.002, "14" -> 14, "true" -> True
+def parse_value(text):
+    lowered = text.lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def parse_pairs(pairs, many=False):
+    result = {}
+    for pair in pairs or []:
+        if "=" not in pair:
+            raise SystemExit(f"expected name=value, got: {pair}")
+        name, value = pair.split("=", 1)
+        if many:
+            result[name] = [parse_value(v) for v in value.split(",")]
+        else:
+            result[name] = parse_value(value)
+    return result
+
+
+# ---------- COMMANDS ----------
+
+def cmd_live(args):
+    get_info = lazy_import("get_info")
+    if args.profile_startup:
+        print_startup_profile("live")
+    # default: get_info.RECORD_FILE, same file as `python get_info.py`
+    record_file = None if args.no_record else args.record or get_info.RECORD_FILE
+    get_info.run_live(rammonitor=args.rammonitor, record_file=record_file,
+                      slow_tick_ms=args.slow_tick_ms)
+
+
+def cmd_backtest(args):
+    candles_module = lazy_import("candles")
+    params = parse_pairs(args.set)
+    grid = parse_pairs(args.grid, many=True)
+
+    if grid:
+        walkforward = lazy_import("walkforward")
+    else:
+        backtest = lazy_import("backtest")
+    if args.profile_startup:
+        print_startup_profile("backtest")
+
+    candles = candles_module.load_candles(args.candles)
+
+    if grid and args.optimize:
+        result = walkforward.successive_halving(candles, grid, start=max(args.start, 200), end=args.end,
+                                                min_candles=args.min_candles, eta=args.eta,
+                                                objective=args.objective, base_params=params,
+                                                workers=args.workers, search=args.search)
+        for value, combo, rung_end in result["ranking"][:10]:
+            print(f"{combo} | score {value:.2f} | up to candle {rung_end}")
+        print("-" * 90)
+        stats = result["stats"]
+        picked = {name: result["params"][name] for name in grid}
+        print(f"best: {picked} | return: {stats['return_percent']:.2f}% | max drawdown: {stats['max_drawdown']:.2f}% "
+              f"| trades: {stats['trades']}")
+        print(f"{args.search}: {result['candles']} candles backtested ({result['candles'] * 100 / result['grid_candles']:.1f}% "
+              f"of the full grid) | rungs: {result['rungs']} | {result['seconds']:.1f} s")
+        return
+
+    if grid:
+        result = walkforward.walk_forward(candles, grid,
+                                          in_sample=args.in_sample, out_sample=args.out_sample,
+                                          objective=args.objective, base_params=params, workers=args.workers,
+                                          search=args.search)
+        for window in result["windows"]:
+            picked = {name: window["params"][name] for name in grid}
+            print(f"window {window['out_sample']}: {picked} | IS {window['in_sample_return']:.2f}% "
+                  f"| OOS {window['return_percent']:.2f}% ({window['trades']} trades)")
+        print("-" * 90)
+        print(f"walk-forward OOS return: {result['return_percent']:.2f}% | max drawdown: {result['max_drawdown']:.2f}% "
+              f"| trades: {result['trades']} | win rate: {result['win_rate']:.1f}% "
+              f"| profitable windows: {result['profitable_windows']}/{len(result['windows'])}")
+        return
+
+    t = time.perf_counter()
+    sub_candles = candles_module.load_candles(args.sub_candles) if args.sub_candles else None
+    result = backtest.run_backtest(candles, params, start=args.start, end=args.end, sub_candles=sub_candles)
+    print(f"candles: {len(candles['close_prices'])} | backtest time: {(time.perf_counter() - t) * 1000:.1f} ms")
+    print(f"return: {result['return_percent']:.2f}% | final equity: {result['final_equity']:.2f} $ "
+          f"| max drawdown: {result['max_drawdown']:.2f}%")
+    print(f"trades: {result['trades']} | win rate: {result['win_rate']:.1f}%")
+    if args.report:
+        report = lazy_import("report")
+        size = report.write_report(report.build_report(result, candles, title=args.candles),
+                                   args.report)
+        print(f"wrote {args.report} ({size / 1024:.0f} KB)")
+
+
+def cmd_report(args):
+    database = lazy_import("database")
+    if args.profile_startup:
+        print_startup_profile("report")
+
+    db = database.Database(db_name=args.db)
+    orders = db.get_closed_orders(symbol=args.symbol)
+    open_orders = db.get_open_orders(symbol=args.symbol)
+    lots = [lot for lot in db.get_open_positions() if args.symbol is None or lot["symbol"] == args.symbol]
+    ledger = db.get_monthly_ledger() if args.symbol is None else []
+    db.close()
+
+    wins = sum(1 for order in orders if (order["profit"] or 0) > 0)
+    total_profit = sum(order["profit"] or 0 for order in orders)
+    print(f"closed orders: {len(orders)} | wins: {wins} | losses: {len(orders) - wins} "
+          f"| win rate: {(wins * 100 / len(orders)) if orders else 0:.1f}%")
+    print(f"total profit: {total_profit:.2f} $")
+
+    # ---- per month: from the monthly ledger, older DBs fall back to the orders ----
+    if ledger:
+        for row in ledger:
+            flags = ("target hit" if row["compounded"] else "") + ("" if row["trade_power"] else ", stopped")
+            print(f"   {row['month']}: {row['trades']:4d} trades | {row['profit']:10.2f} $ "
+                  f"| {row['profit_percent']:6.2f}% | tactical {row['tactical_balance']:.2f} $ "
+                  f"| saved {row['save_money']:.2f} $ {flags}")
+    else:
+        months = {}
+        for order in orders:
+            month = (order["close_time"] or "")[:7]
+            count, profit = months.get(month, (0, 0.0))
+            months[month] = (count + 1, profit + (order["profit"] or 0))
+        for month, (count, profit) in sorted(months.items()):
+            print(f"   {month}: {count:4d} trades | {profit:10.2f} $")
+
+    for open_order in open_orders:
+        print(f"open order #{open_order['id']}: {open_order['side']} @ {open_order['entry_price']} "
+              f"(margin={open_order['margin']}, lev={open_order['leverage']})")
+    for lot in lots:
+        print(f"open lot #{lot['id']} [{lot['account']}] {lot['symbol']}: {lot['side']} @ {lot['entry_price']} "
+              f"(size={lot['size']}, margin={lot['margin']}, lev={lot['leverage']})")
+
+
+def cmd_replay(args):
+    replay = lazy_import("replay")
+    if args.profile_startup:
+        print_startup_profile("replay")
+
+    results = replay.replay_file(args.file, session=args.session,
+                                 use_recorded_config=args.use_recorded_config, quiet=not args.verbose)
+    failed = False
+    for number, result in enumerate(results):
+        print(f"session {number}: {result['ticks']} ticks in {result['seconds'] * 1000:.1f} ms "
+              f"| mismatches: {len(result['mismatches'])}")
+        for tick, recorded, replayed in result["mismatches"]:
+            failed = True
+            print(f"   tick {tick}: recorded {recorded}")
+            print(f"   {' ' * len(str(tick))}       replayed {replayed}")
+    if failed:
+        raise SystemExit(1)
+
+
+def cmd_montecarlo(args):
+    montecarlo = lazy_import("montecarlo")
+    if args.candles:
+        candles_module = lazy_import("candles")
+        backtest = lazy_import("backtest")
+    else:
+        database = lazy_import("database")
+    if args.profile_startup:
+        print_startup_profile("montecarlo")
+
+    if args.candles:
+        candles = candles_module.load_candles(args.candles)
+        ledger = montecarlo.ledger_from_backtest(backtest.run_backtest(candles, parse_pairs(args.set)), candles)
+    else:
+        db = database.Database(db_name=args.db)
+        ledger = montecarlo.ledger_from_orders(db.get_closed_orders(symbol=args.symbol))
+        db.close()
+    if len(ledger["returns"]) == 0:
+        raise SystemExit("no closed trades")
+
+    t = time.perf_counter()
+    result = montecarlo.monte_carlo(ledger, paths=args.paths, method=args.method, ruin_percent=args.ruin_percent,
+                                    seed=args.seed, workers=args.workers or None)
+    stats = montecarlo.summary(result)
+    print(f"{stats['paths']} paths ({args.method}) of {result['trades']} trades in "
+          f"{(time.perf_counter() - t) * 1000:.1f} ms")
+    for name in ("return_percent", "max_drawdown", "longest_underwater_days"):
+        values = " | ".join(f"p{q}: {value:8.2f}" for q, value in stats[name].items())
+        print(f"   {name:<24} {values}")
+    print(f"   loss probability: {stats['loss_probability'] * 100:.1f}% "
+          f"| ruin (-{args.ruin_percent}%): {stats['ruin_probability'] * 100:.1f}% "
+          f"| monthly target hit rate: {stats['monthly_target_hit_rate'] * 100:.1f}%")
+
+
+def cmd_backfill(args):
+    backfill = lazy_import("backfill")
+    candles_module = lazy_import("candles")
+    if args.profile_startup:
+        print_startup_profile("backfill")
+
+    result = backfill.backfill(args.symbol, args.interval, args.start, args.end, store_dir=args.store,
+                               base_url=args.base_url, workers=args.workers)
+    for lo, hi in result["check"]["gaps"]:
+        print(f"   gap: {candles_module.open_time_str(lo)} -> {candles_module.open_time_str(hi)}")
+    if args.out:
+        candles = backfill.load_store(args.store, args.symbol, args.interval, args.start, args.end)
+        candles_module.save_candles(args.out, candles)
+        print(f"wrote {len(candles['open_times'])} candles to {args.out}")
+
+
+def cmd_shards(args):
+    coordinator = lazy_import("coordinator")
+    if args.profile_startup:
+        print_startup_profile("shards")
+
+    symbols = [symbol.strip().upper() for symbol in args.symbols.split(",") if symbol.strip()]
+    source = coordinator.KlineSource(args.base_url, args.interval)
+    coordinator.Coordinator(symbols, workers=args.workers, source=source, state_dir=args.state_dir).run()
+
+
+def cmd_maintenance(args):
+    retention = lazy_import("retention")
+    if args.profile_startup:
+        print_startup_profile("db-maintenance")
+
+    if args.enable_incremental_vacuum:
+        retention.enable_incremental_vacuum(args.db)
+        print(f"{args.db}: auto_vacuum = INCREMENTAL")
+    policy = {"candle_days": args.candle_days, "order_months": args.order_months,
+              "candle_store": args.store, "archive_dir": args.archive_dir, "budget_seconds": float("inf")}
+    retention.run_maintenance(args.db, policy)
+
+
+def cmd_soak(args):
+    soak = lazy_import("soak")
+    if args.profile_startup:
+        print_startup_profile("soak")
+
+    candles = None
+    if args.candles:
+        candles = lazy_import("candles").load_candles(args.candles)
+    result = soak.run_soak(days=args.days, workdir=args.dir, candles=candles, seed=args.seed, record=args.record,
+                           quiet=not args.verbose, sample_every=args.sample_every)
+    print(soak.format_soak(result))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Trading bot")
+    parser.add_argument("--profile-startup", action="store_true", help="print startup / import times")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    live = sub.add_parser("live", help="run the live bot")
+    live.add_argument("--rammonitor", action="store_true", help="Enable RAM monitor")
+    live.add_argument("--record", default=None,
+                      help="tick log file (raw inputs of every tick), default get_info.RECORD_FILE")
+    live.add_argument("--no-record", action="store_true", help="don't write the tick log")
+    live.add_argument("--slow-tick-ms", type=float, default=None,
+                      help="dump a sampled profile of every tick slower than this to slow_ticks/")
+    live.set_defaults(func=cmd_live)
+
+    backtest = sub.add_parser("backtest", help="backtest / walk-forward on a candle file")
+    backtest.add_argument("--candles", required=True, help="candle file (.npz, see candles.save_candles)")
+    backtest.add_argument("--sub-candles", default=None,
+                          help="1m candle file, stop loss / take profit / liquidation are checked on it")
+    backtest.add_argument("--set", action="append", metavar="NAME=VALUE", help="override a strategy param")
+    backtest.add_argument("--report", default=None,
+                          help="write a report (.html, self-contained, or .json) with downsampled curves")
+    backtest.add_argument("--start", type=int, default=0, help="first candle to trade")
+    backtest.add_argument("--end", type=int, default=None, help="stop before this candle")
+    backtest.add_argument("--grid", action="append", metavar="NAME=V1,V2",
+                          help="walk-forward: values to search for a param")
+    backtest.add_argument("--in-sample", type=int, default=4 * 24 * 90, help="walk-forward in-sample candles")
+    backtest.add_argument("--out-sample", type=int, default=4 * 24 * 30, help="walk-forward out-of-sample candles")
+    backtest.add_argument("--objective", default="return", choices=("return", "calmar"))
+    backtest.add_argument("--search", default="grid", choices=("grid", "halving"),
+                          help="halving: short backtests first, only the best sets go on over longer ones")
+    backtest.add_argument("--optimize", action="store_true", help="search the grid on [start, end), no walk-forward")
+    backtest.add_argument("--eta", type=int, default=3, help="halving: keep 1/eta of the sets per rung")
+    backtest.add_argument("--min-candles", type=int, default=None,
+                          help="halving: candles of the first rung (default: range / eta^3)")
+    backtest.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    backtest.set_defaults(func=cmd_backtest)
+
+    report = sub.add_parser("report", help="summary of the orders in database.db")
+    report.add_argument("--db", default="database.db")
+    report.add_argument("--symbol", default=None)
+    report.set_defaults(func=cmd_report)
+
+    replay = sub.add_parser("replay", help="replay a tick log offline and check the decisions")
+    replay.add_argument("file", help="tick log written by the live bot")
+    replay.add_argument("--session", type=int, default=None, help="only this session (0 = first)")
+    replay.add_argument("--use-recorded-config", action="store_true", help="use the settings of the recording")
+    replay.add_argument("--verbose", action="store_true", help="show the console output of the ticks")
+    replay.set_defaults(func=cmd_replay)
+
+    backfill = sub.add_parser("backfill", help="download historical klines into the candle store")
+    backfill.add_argument("symbol")
+    backfill.add_argument("--interval", default="15m")
+    backfill.add_argument("--start", required=True, help="UTC date, e.g. 2023-01-01")
+    backfill.add_argument("--end", default=None, help="UTC date (default: last closed candle)")
+    backfill.add_argument("--store", default="candle_store", help="candle store directory")
+    backfill.add_argument("--out", default=None, help="also write the range to one candle file (.npz)")
+    backfill.add_argument("--workers", type=int, default=8, help="pages downloaded at the same time")
+    backfill.add_argument("--base-url", default="https://api.binance.com", help="e.g. a local binance_stub.py")
+    backfill.set_defaults(func=cmd_backfill)
+
+    shards = sub.add_parser("shards", help="run the MA strategy on many symbols, sharded over processes")
+    shards.add_argument("symbols", help="comma separated, e.g. BTCUSDT,ETHUSDT")
+    shards.add_argument("--interval", default="15m")
+    shards.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    shards.add_argument("--state-dir", default="shard_state", help="per symbol checkpoints")
+    shards.add_argument("--base-url", default="https://api.binance.com", help="e.g. a local binance_stub.py")
+    shards.set_defaults(func=cmd_shards)
+
+    maintenance = sub.add_parser("db-maintenance", help="archive old candles / orders, vacuum and ANALYZE database.db")
+    maintenance.add_argument("--db", default="database.db")
+    maintenance.add_argument("--candle-days", type=int, default=30, help="symbol_data rows kept")
+    maintenance.add_argument("--order-months", type=int, default=12, help="closed orders kept")
+    maintenance.add_argument("--store", default="candle_store", help="candle store for the old candles")
+    maintenance.add_argument("--archive-dir", default="archive", help="yearly order archives")
+    maintenance.add_argument("--enable-incremental-vacuum", action="store_true",
+                             help="one full VACUUM to switch an older DB to incremental vacuum (bot stopped)")
+    maintenance.set_defaults(func=cmd_maintenance)
+
+    soak = sub.add_parser("soak", help="run the live loop on a simulated clock (days of live in minutes)")
+    soak.add_argument("--days", type=float, default=30)
+    soak.add_argument("--dir", default="soak", help="database / checkpoint / archives of the run")
+    soak.add_argument("--candles", default=None, help="recorded candle file (.npz) to serve, default a random walk")
+    soak.add_argument("--seed", type=int, default=0, help="random walk seed")
+    soak.add_argument("--record", action="store_true", help="write the tick log too")
+    soak.add_argument("--sample-every", type=int, default=96, help="ticks between DB size / memory samples")
+    soak.add_argument("--verbose", action="store_true", help="show the bot's console output")
+    soak.set_defaults(func=cmd_soak)
+
+    montecarlo = sub.add_parser("montecarlo", help="Monte Carlo risk of the trade ledger")
+    montecarlo.add_argument("--db", default="database.db", help="closed orders of the live bot")
+    montecarlo.add_argument("--symbol", default=None)
+    montecarlo.add_argument("--candles", default=None, help="use the trades of a backtest on this candle file")
+    montecarlo.add_argument("--set", action="append", metavar="NAME=VALUE", help="backtest param override")
+    montecarlo.add_argument("--paths", type=int, default=10_000)
+    montecarlo.add_argument("--method", default="bootstrap", choices=("bootstrap", "shuffle"))
+    montecarlo.add_argument("--ruin-percent", type=float, default=50, help="loss of the start balance counted as ruin")
+    montecarlo.add_argument("--seed", type=int, default=None)
+    montecarlo.add_argument("--workers", type=int, default=1, help="processes (0 = all cores)")
+    montecarlo.set_defaults(func=cmd_montecarlo)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class SystemClock:
+    """
+    The real clock. The live loop (scheduler, ma_strategy, RamMonitor,
+    maintenance job) reads time and sleeps only through a clock, so a soak
+    test can swap in SimulatedClock.
+    """
+
+    # longest single sleep of sleep_until (a wall clock jump is seen within this)
+    poll = 0.3
+
+    def time(self):
+        return time.time()
+
+    def now(self):
+        return datetime.now(timezone.utc)
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def sleep_until(self, deadline):
+        """deadline : unix time (s)"""
+        while True:
+            left = deadline - self.time()
+            if left <= 0:
+                return
+            self.sleep(min(left, self.poll))
+
+
+class SimulatedClock(SystemClock):
+    """
+    Clock for accelerated soak tests: time only moves when the driving thread
+    (the one that created the clock, i.e. the live loop) sleeps, and its sleeps
+    return at once, the clock jumps to the deadline.
+
+    Any other thread that sleeps (RamMonitor, ...) blocks until the driver has
+    moved the clock past its deadline, so background loops follow simulated
+    time instead of spinning.
+    """
+
+    def __init__(self, start=0.0):
+        self.t = float(start)
+        self.driver = threading.get_ident()
+        self.cond = threading.Condition()
+        self.closed = False
+
+    def time(self):
+        return self.t
+
+    def now(self):
+        return datetime.fromtimestamp(self.t, timezone.utc)
+
+    def monotonic(self):
+        return self.t
+
+    def sleep(self, seconds):
+        self.sleep_until(self.t + max(seconds, 0))
+
+    def sleep_until(self, deadline):
+        with self.cond:
+            if threading.get_ident() == self.driver:
+                if deadline > self.t:
+                    self.t = float(deadline)
+                    self.cond.notify_all()
+                return
+            while self.t < deadline and not self.closed:
+                # real timeout: a thread still waiting when the soak ends sees close()
+                self.cond.wait(1.0)
+
+    # the soak is over: release threads waiting for simulated time
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
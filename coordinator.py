@@ -0,0 +1,275 @@
+import multiprocessing
+import os
+import queue
+import time
+import traceback
+
+import numpy as np
+
+from candles import merge_candles, slice_candles
+from checkpoint import save_checkpoint, load_checkpoint
+
+
+# ---------- CANDLE SOURCE ----------
+
+class KlineSource:
+    """
+    Closed candles of a symbol from the klines endpoint (picklable: the
+    HTTP session and rate limiter are made in the process that uses it)
+    """
+
+    def __init__(self, base_url="https://api.binance.com", interval="15m"):
+        self.base_url = base_url
+        self.interval = interval
+        self.fetcher = None
+
+    def __getstate__(self):
+        return {"base_url": self.base_url, "interval": self.interval, "fetcher": None}
+
+    def __call__(self, symbol, limit):
+        if self.fetcher is None:
+            from backfill import KlineFetcher
+            self.fetcher = KlineFetcher(self.base_url)
+        candles = self.fetcher.get(symbol, self.interval, limit=limit)
+        # last kline is the candle still forming (same as get_info: data[:-1])
+        return {field: values[:-1] for field, values in candles.items()}
+
+
+# ---------- ONE SYMBOL (inside a worker) ----------
+
+class SymbolRunner:
+    """
+    Candle buffer + StrategyEngine (Indicator / TradeManager state) of one symbol,
+    checkpointed to state_dir/<symbol>.ckpt after every new candle. Lots
+    (params max_lots > 1 or hedge) are kept in state_dir/<symbol>.db.
+    """
+
+    def __init__(self, symbol, source, state_dir, params=None, buffer_size=200):
+        from engine import StrategyEngine
+        from resampler import interval_to_ms
+        from strategy import MAStrategy
+
+        self.symbol = symbol
+        self.source = source
+        self.buffer_size = buffer_size
+        interval = getattr(source, "interval", "15m")
+        self.interval_ms = interval_to_ms(interval)
+        self.path = os.path.join(state_dir, f"{symbol}.ckpt")
+        params = params or {}
+        db = None
+        if params.get("max_lots", 1) > 1 or params.get("hedge"):
+            from database import Database
+            db = Database(db_name=os.path.join(state_dir, f"{symbol}.db"))
+        self.engine = StrategyEngine([MAStrategy(symbol, **params)], min_candles=buffer_size, symbol=symbol,
+                                     interval=interval, db=db)
+        self.buffer = None
+
+        state, candles = load_checkpoint(self.path)
+        if state is not None:
+            self.engine.set_state(state)
+            self.buffer = candles
+
+    def tick(self, tick_id):
+        t0 = time.perf_counter()
+        # buffer after each new closed candle, the strategy steps through all of them
+        windows = []
+        last = None
+        if self.buffer is not None:
+            last = self.buffer["open_times"][-1]
+            new = self.source(self.symbol, 3)
+            new = slice_candles(new, int(np.searchsorted(new["open_times"], last, side="right")))
+            # off longer than these klines cover: the buffer would have a hole, load it again (as get_info)
+            if len(new["open_times"]) and new["open_times"][0] > last + self.interval_ms:
+                self.buffer = None
+            else:
+                for i in range(len(new["open_times"])):
+                    self.buffer = merge_candles(self.buffer, slice_candles(new, i, i + 1), maxlen=self.buffer_size)
+                    windows.append(self.buffer)
+
+        if self.buffer is None:
+            # first tick or after a gap: one decision on the latest candle
+            self.buffer = merge_candles(None, self.source(self.symbol, self.buffer_size + 1), maxlen=self.buffer_size)
+            open_times = self.buffer["open_times"]
+            new_candles = len(open_times) if last is None else int((open_times > last).sum())
+            if new_candles:
+                windows.append(self.buffer)
+        else:
+            new_candles = len(windows)
+        t1 = time.perf_counter()
+
+        # nothing closed since the last tick (e.g. a re-sent tick after a restart): no decision
+        orders = []
+        for window in windows:
+            orders += [(action, updates.get("profit")) for _, action, updates in self.engine.step(window)]
+        t2 = time.perf_counter()
+
+        if new_candles:
+            save_checkpoint(self.path, self.engine.get_state(), self.buffer)
+        t3 = time.perf_counter()
+
+        account = self.engine.slots[self.symbol]["account"]
+        return {
+            "symbol": self.symbol,
+            "tick": tick_id,
+            "new_candles": new_candles,
+            "orders": orders,
+            "position": account["current_position"],
+            "balance": account["balance"],
+            "timings": {"fetch": (t1 - t0) * 1000, "strategy": (t2 - t1) * 1000, "persist": (t3 - t2) * 1000},
+        }
+
+
+def _worker_main(worker_id, symbols, inbox, outbox, source, state_dir, params, buffer_size):
+    runners = {}
+    for symbol in symbols:
+        runners[symbol] = SymbolRunner(symbol, source, state_dir, params, buffer_size)
+    outbox.put(("ready", worker_id, os.getpid()))
+
+    while True:
+        message = inbox.get()
+        if message[0] == "stop":
+            break
+        tick_id = message[1]
+        t = time.perf_counter()
+        results = []
+        for runner in runners.values():
+            # one broken market must not stop the others of the shard
+            try:
+                results.append(runner.tick(tick_id))
+            except Exception as e:
+                results.append({"symbol": runner.symbol, "tick": tick_id, "error": repr(e),
+                                "traceback": traceback.format_exc()})
+        outbox.put(("result", worker_id, tick_id, results, (time.perf_counter() - t) * 1000))
+
+
+# ---------- COORDINATOR ----------
+
+class Coordinator:
+    """
+    Shards symbols over worker processes (round robin), sends every tick to all
+    of them and gathers the per symbol results / timings.
+
+    A worker that died or didn't answer in tick_timeout is replaced by a new
+    process; it restores its symbols from their checkpoints and gets the tick
+    again (symbols that already handled the candle see no new candle and skip it).
+    """
+
+    def __init__(self, symbols, workers=None, source=None, state_dir="shard_state", params=None,
+                 buffer_size=200, tick_timeout=60.0):
+        workers = min(workers or os.cpu_count(), len(symbols))
+        self.shards = [list(symbols[i::workers]) for i in range(workers)]
+        self.source = source or KlineSource()
+        self.state_dir = state_dir
+        self.params = params
+        self.buffer_size = buffer_size
+        self.tick_timeout = tick_timeout
+        self.outbox = multiprocessing.Queue()
+        self.workers = [None] * workers
+        self.restarts = 0
+        self.tick_count = 0
+        os.makedirs(state_dir, exist_ok=True)
+
+    def _spawn(self, worker_id):
+        inbox = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=_worker_main,
+            args=(worker_id, self.shards[worker_id], inbox, self.outbox, self.source, self.state_dir,
+                  self.params, self.buffer_size),
+            daemon=True)
+        process.start()
+        self.workers[worker_id] = {"process": process, "inbox": inbox}
+
+    def _restart(self, worker_id):
+        old = self.workers[worker_id]["process"]
+        if old.is_alive():
+            old.terminate()
+        old.join(1)
+        print(f"coordinator: restarting worker {worker_id} ({', '.join(self.shards[worker_id])}), "
+              f"exit code {old.exitcode}")
+        self.restarts += 1
+        self._spawn(worker_id)
+
+    def start(self):
+        for worker_id in range(len(self.workers)):
+            self._spawn(worker_id)
+
+    def tick(self, retries=1):
+        """
+        One candle for every symbol
+        returns dict: results {symbol: result}, worker_ms {worker: ms}, restarted [workers], seconds
+        """
+        self.tick_count += 1
+        tick_id = self.tick_count
+        t = time.perf_counter()
+        pending = set(range(len(self.workers)))
+        attempts = dict.fromkeys(pending, 0)
+        results = {}
+        worker_ms = {}
+        restarted = []
+
+        for worker_id in pending:
+            self.workers[worker_id]["inbox"].put(("tick", tick_id))
+
+        deadline = time.monotonic() + self.tick_timeout
+        while pending:
+            try:
+                message = self.outbox.get(timeout=0.2)
+            except queue.Empty:
+                message = None
+
+            if message is not None and message[0] == "result" and message[2] == tick_id and message[1] in pending:
+                _, worker_id, _, worker_results, ms = message
+                for result in worker_results:
+                    results[result["symbol"]] = result
+                worker_ms[worker_id] = ms
+                pending.discard(worker_id)
+                continue
+
+            # ---- supervise: dead or stuck workers ----
+            timed_out = time.monotonic() > deadline
+            for worker_id in list(pending):
+                if self.workers[worker_id]["process"].is_alive() and not timed_out:
+                    continue
+                self._restart(worker_id)
+                restarted.append(worker_id)
+                if attempts[worker_id] < retries:
+                    attempts[worker_id] += 1
+                    self.workers[worker_id]["inbox"].put(("tick", tick_id))
+                else:
+                    for symbol in self.shards[worker_id]:
+                        results[symbol] = {"symbol": symbol, "tick": tick_id, "error": "worker lost"}
+                    pending.discard(worker_id)
+            if timed_out:
+                deadline = time.monotonic() + self.tick_timeout
+
+        return {"results": results, "worker_ms": worker_ms, "restarted": restarted,
+                "seconds": time.perf_counter() - t}
+
+    def stop(self):
+        for worker in self.workers:
+            if worker is not None and worker["process"].is_alive():
+                worker["inbox"].put(("stop",))
+        for worker in self.workers:
+            if worker is not None:
+                worker["process"].join(5)
+                if worker["process"].is_alive():
+                    worker["process"].terminate()
+
+    # live: one tick per closed 15m candle
+    def run(self):
+        import get_info
+
+        self.start()
+        try:
+            while True:
+                get_info.wait_for_next_quarter()
+                tick = self.tick()
+                errors = [r for r in tick["results"].values() if "error" in r]
+                orders = sum(len(r.get("orders", ())) for r in tick["results"].values())
+                print(f"tick {self.tick_count}: {len(tick['results'])} symbols | {orders} orders "
+                      f"| {len(errors)} errors | {tick['seconds'] * 1000:.0f} ms")
+                for error in errors:
+                    print(f"   {error['symbol']}: {error['error']}")
+                get_info.clock.sleep(get_info.FETCH_WINDOW_SECONDS + 1)
+        finally:
+            self.stop()
@@ -5,6 +5,8 @@ class Database:
     def __init__(self, db_name="database.db"):
         self.conn = sqlite3.connect(db_name)
         self.cursor = self.conn.cursor()
+        # new DBs give freed pages back in small steps (retention.vacuum_step), no full VACUUM
+        self.cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
         self.create_tables()
 
     def create_tables(self):
@@ -61,11 +63,60 @@ class Database:
         )
         """)
 
+        # monthly ledger (one row per month, updated on every close)
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS monthly_ledger (
+            month TEXT PRIMARY KEY,
+            start_tactical_balance REAL,
+            tactical_balance REAL,
+            balance REAL,
+            profit REAL,
+            profit_percent REAL,
+            trades INTEGER,
+            wins INTEGER,
+            save_money REAL,
+            saved_in REAL,
+            saved_out REAL,
+            compounded INTEGER,
+            trade_power INTEGER,
+            updated_at TEXT
+        )
+        """)
+
+        # positions: open lots (many per symbol / account, see positions.PositionBook)
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS positions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            account TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            side TEXT NOT NULL,
+            status TEXT NOT NULL,
+            entry_price REAL,
+            open_time TEXT,
+            size REAL,
+            size_no_fee REAL,
+            margin REAL,
+            margin_no_fee REAL,
+            leverage REAL,
+            order_id INTEGER,
+            parent_id INTEGER,
+            close_price REAL,
+            close_time TEXT,
+            profit REAL,
+            profit_percent REAL
+        )
+        """)
+
         self.conn.commit()
 
         # ensure any missing columns are added for older DBs
         self._ensure_order_columns()
 
+        # open lots / the open order are found without scanning the history
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_positions_open ON positions (account, symbol, status)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_status ON orders (status)")
+        self.conn.commit()
+
     # ---------- INSERT METHODS ----------
 
     def insert_user(self, username, email, created_at):
@@ -144,6 +195,131 @@ class Database:
             'current_position': row[14]
         }
 
+    # every open order (get_open_order only gives the newest one)
+    def get_open_orders(self, symbol=None):
+        query = """
+        SELECT id, symbol, side, entry_price, open_time, position_size, margin, leverage
+        FROM orders
+        WHERE status = 'open'
+        """
+        params = ()
+        if symbol is not None:
+            query += " AND symbol = ?"
+            params = (symbol,)
+        query += " ORDER BY id"
+        self.cursor.execute(query, params)
+        cols = ['id', 'symbol', 'side', 'entry_price', 'open_time', 'position_size', 'margin', 'leverage']
+        return [dict(zip(cols, row)) for row in self.cursor.fetchall()]
+
+    def get_closed_orders(self, symbol=None):
+        query = """
+        SELECT id, symbol, side, entry_price, open_time, close_price, close_time,
+               position_size, margin, leverage, profit, profit_percent
+        FROM orders
+        WHERE status = 'closed'
+        """
+        params = ()
+        if symbol is not None:
+            query += " AND symbol = ?"
+            params = (symbol,)
+        query += " ORDER BY id"
+        self.cursor.execute(query, params)
+        cols = ['id', 'symbol', 'side', 'entry_price', 'open_time', 'close_price', 'close_time',
+                'position_size', 'margin', 'leverage', 'profit', 'profit_percent']
+        return [dict(zip(cols, row)) for row in self.cursor.fetchall()]
+
+    # ---------- EXECUTION (real fills, see execution.py) ----------
+    EXECUTION_COLUMNS = {
+        "open": ('open_client_order_id', 'open_exchange_order_id', 'open_fill_price', 'open_fill_qty',
+                 'open_slippage_bps', 'open_ack_ms', 'open_fill_ms'),
+        "close": ('close_client_order_id', 'close_exchange_order_id', 'close_fill_price', 'close_fill_qty',
+                  'close_slippage_bps', 'close_ack_ms', 'close_fill_ms'),
+    }
+
+    def update_order_execution(self, order_id, leg, client_order_id, exchange_order_id, fill_price, fill_qty,
+                               slippage_bps, ack_ms, fill_ms):
+        cols = self.EXECUTION_COLUMNS[leg]
+        self.cursor.execute(f"""
+        UPDATE orders
+        SET {', '.join(f'{col} = ?' for col in cols)}
+        WHERE id = ?
+        """, (client_order_id, exchange_order_id, fill_price, fill_qty, slippage_bps, ack_ms, fill_ms, order_id))
+        self.conn.commit()
+
+    def get_order_execution(self, order_id):
+        cols = self.EXECUTION_COLUMNS["open"] + self.EXECUTION_COLUMNS["close"]
+        self.cursor.execute(f"SELECT {', '.join(cols)} FROM orders WHERE id = ?", (order_id,))
+        row = self.cursor.fetchone()
+        return dict(zip(cols, row)) if row else None
+
+    # ---------- POSITIONS (lots) ----------
+    POSITION_COLUMNS = ['id', 'account', 'symbol', 'side', 'entry_price', 'open_time', 'size', 'size_no_fee',
+                        'margin', 'margin_no_fee', 'leverage', 'order_id']
+
+    def insert_position(self, lot, status="open"):
+        cols = self.POSITION_COLUMNS[1:] + ['status', 'parent_id', 'close_price', 'close_time', 'profit',
+                                            'profit_percent']
+        values = [lot.get(col) for col in self.POSITION_COLUMNS[1:]] + [status] + \
+                 [lot.get(col) for col in cols[len(self.POSITION_COLUMNS):]]
+        self.cursor.execute(f"""
+        INSERT INTO positions ({', '.join(cols)})
+        VALUES ({', '.join('?' for _ in cols)})
+        """, values)
+        self.conn.commit()
+        return self.cursor.lastrowid
+
+    def update_position_size(self, position_id, size, size_no_fee, margin, margin_no_fee):
+        self.cursor.execute("""
+        UPDATE positions
+        SET size = ?, size_no_fee = ?, margin = ?, margin_no_fee = ?
+        WHERE id = ?
+        """, (size, size_no_fee, margin, margin_no_fee, position_id))
+        self.conn.commit()
+
+    def close_position(self, position_id, close_price, close_time, profit, profit_percent):
+        self.cursor.execute("""
+        UPDATE positions
+        SET close_price = ?, close_time = ?, profit = ?, profit_percent = ?, status = 'closed'
+        WHERE id = ?
+        """, (close_price, close_time, profit, profit_percent, position_id))
+        self.conn.commit()
+
+    def get_open_positions(self, account=None, symbol=None):
+        query = f"SELECT {', '.join(self.POSITION_COLUMNS)} FROM positions WHERE "
+        if account is None:
+            # the index starts with account: no account = every open lot
+            query += "status = 'open'"
+            params = ()
+        elif symbol is None:
+            query += "account = ? AND status = 'open'"
+            params = (account,)
+        else:
+            query += "account = ? AND symbol = ? AND status = 'open'"
+            params = (account, symbol)
+        self.cursor.execute(query + " ORDER BY id", params)
+        return [dict(zip(self.POSITION_COLUMNS, row)) for row in self.cursor.fetchall()]
+
+    # ---------- MONTHLY LEDGER ----------
+    MONTH_COLUMNS = ['month', 'start_tactical_balance', 'tactical_balance', 'balance', 'profit', 'profit_percent',
+                     'trades', 'wins', 'save_money', 'saved_in', 'saved_out', 'compounded', 'trade_power', 'updated_at']
+
+    def upsert_month(self, row):
+        cols = self.MONTH_COLUMNS
+        self.cursor.execute(f"""
+        INSERT OR REPLACE INTO monthly_ledger ({', '.join(cols)})
+        VALUES ({', '.join('?' for _ in cols)})
+        """, tuple(row[col] for col in cols))
+        self.conn.commit()
+
+    def get_last_month(self):
+        self.cursor.execute(f"SELECT {', '.join(self.MONTH_COLUMNS)} FROM monthly_ledger ORDER BY month DESC LIMIT 1")
+        row = self.cursor.fetchone()
+        return dict(zip(self.MONTH_COLUMNS, row)) if row else None
+
+    def get_monthly_ledger(self):
+        self.cursor.execute(f"SELECT {', '.join(self.MONTH_COLUMNS)} FROM monthly_ledger ORDER BY month")
+        return [dict(zip(self.MONTH_COLUMNS, row)) for row in self.cursor.fetchall()]
+
     def _ensure_order_columns(self):
         # Check existing columns and add missing ones (for existing DBs)
         self.cursor.execute("PRAGMA table_info('orders')")
@@ -157,6 +333,10 @@ class Database:
             'position_size_no_fee': 'REAL',
             'current_position': 'TEXT'
         }
+        for leg in ("open", "close"):
+            for col in self.EXECUTION_COLUMNS[leg]:
+                additions[col] = 'TEXT' if col.endswith('order_id') else 'REAL'
+
         for col, col_type in additions.items():
             if col not in cols:
                 try:
@@ -0,0 +1,238 @@
+from account import new_account, close_position, close_lot
+from backtest import DEFAULT_PARAMS, candle_arrays, backtest_result
+from candles import close_months, month_starts
+from positions import PositionBook
+from rules import tick_gate, apply_actions
+from strategy import Frame
+from trade_csv_logger import TradeCSVLogger
+from trademanager import TradeManager
+
+
+class StrategyEngine:
+    """
+    Drives any number of Strategy instances from one candle feed. Every
+    strategy gets its own account + TradeManager; the indicators are computed
+    once per candle set and shared.
+
+    backtest : run(candles)            -> {name: backtest result}
+    live     : step(candle_buffer)     -> orders of the buffer's last candle
+    workers  : engine(window, seq)     -> same as step(), so an engine is a
+               shared_feed.worker_loop handler
+
+    A strategy with params max_lots > 1 or hedge=True trades lots on a
+    positions.PositionBook (pyramiding / long + short at once) instead of
+    the one position of its account. With a database.Database (live) the
+    book is kept in its positions table and its open lots are loaded back
+    when the strategy is added; run() always trades on a fresh in-memory book.
+    """
+
+    def __init__(self, strategies=(), min_candles=200, verbose=False, symbol=None, interval="15m", db=None):
+        self.slots = {}
+        self.min_candles = min_candles
+        self.verbose = verbose
+        self.db = db
+        # indicator cache stream of the candles (backtest.candle_arrays)
+        self.symbol = symbol
+        self.interval = interval
+        self.candle_count = 0
+        for strategy in strategies:
+            self.add(strategy)
+
+    def add(self, strategy):
+        if strategy.name in self.slots:
+            raise ValueError(f"strategy name already used: {strategy.name}")
+        params = dict(DEFAULT_PARAMS)
+        params.update(strategy.params)
+        self.slots[strategy.name] = {"strategy": strategy, "params": params}
+        self._reset(self.slots[strategy.name], self.db)
+        return strategy
+
+    def _reset(self, slot, db=None):
+        p = slot["params"]
+        account = new_account(balance=p["balance"], leverage=p["leverage"])
+        slot["account"] = account
+        slot["trade_manager"] = TradeManager(TradeCSVLogger(), account["first_balance"],
+                                             p["monthly_profit_percent_stop_trade"], account["tactical_balance"],
+                                             p["monthly_close_filter"], p["monthly_compound"], verbose=self.verbose)
+        if p["max_lots"] > 1 or p["hedge"]:
+            book = PositionBook(db)
+            if db is not None:
+                name = slot["strategy"].name
+                book.load(account=name)
+                account["lot_margin"] = book.locked_margin(name)
+            slot["trade_manager"].positions = book
+        slot["trades"] = []
+        # lot id -> index in trades of its open trade (lot mode)
+        slot["open_trades"] = {}
+        slot["equity_index"] = []
+        slot["equity"] = []
+
+    # account + TradeManager state of every strategy (plain values, for checkpoints)
+    def get_state(self):
+        return {
+            "candle_count": self.candle_count,
+            "slots": {name: {"account": slot["account"], "tactical_balance": slot["trade_manager"].tactical_balance,
+                             "positions": self._book_state(slot)}
+                      for name, slot in self.slots.items()},
+        }
+
+    @staticmethod
+    def _book_state(slot):
+        book = slot["trade_manager"].positions
+        return book.get_state() if book is not None else None
+
+    def set_state(self, state):
+        self.candle_count = state.get("candle_count", 0)
+        for name, saved in state.get("slots", {}).items():
+            if name in self.slots:
+                self.slots[name]["account"].update(saved["account"])
+                self.slots[name]["trade_manager"].tactical_balance = saved["tactical_balance"]
+                book = self.slots[name]["trade_manager"].positions
+                if book is None:
+                    continue
+                if book.db is not None:
+                    # a database backed book already holds the open lots (load() in add)
+                    self.slots[name]["account"]["lot_margin"] = book.locked_margin(name)
+                elif saved.get("positions"):
+                    book.set_state(saved["positions"])
+
+    # ---------- ONE CANDLE ----------
+
+    def _record(self, slot, index, action, price, updates):
+        account = slot["account"]
+        lot = updates.get("lot")
+        if action.startswith("open"):
+            if lot is not None:
+                slot["open_trades"][lot["id"]] = len(slot["trades"])
+            slot["trades"].append({
+                "side": action.split("_")[1],
+                "open_index": index,
+                "entry_price": float(price),
+                "leverage": updates["leverage"],
+                "margin": updates["margin"],
+                "close_index": None,
+            })
+        else:
+            if lot is not None:
+                k = slot["open_trades"].pop(lot["id"], None)
+            else:
+                k = len(slot["trades"]) - 1 if slot["trades"] and slot["trades"][-1]["close_index"] is None else None
+            if k is None:
+                # opened before a restart (set_state): only the close is known here
+                slot["trades"].append({"side": action.split("_")[1], "open_index": None, "close_index": None})
+                k = -1
+            slot["trades"][k].update({
+                "close_index": index,
+                "close_price": float(price),
+                "profit": updates["profit"],
+                "profit_percent": updates["profit_percent"],
+            })
+            slot["equity_index"].append(index)
+            slot["equity"].append(account["balance"] + account["save_money"])
+
+    def _dispatch(self, slot, frame, index):
+        account = slot["account"]
+        if not tick_gate(account, slot["params"], frame.new_month):
+            return ()
+        actions = slot["strategy"].on_candle(frame, account)
+        if not actions:
+            return ()
+
+        price = frame.price
+        results = apply_actions(account, slot["trade_manager"], slot["params"], actions, price, frame.time_str,
+                                name=slot["strategy"].name, symbol=slot["params"].get("symbol"))
+        for action, updates in results:
+            self._record(slot, index, action, price, updates)
+        return results
+
+    # ---------- BACKTEST ----------
+
+    def run(self, candles, arrays=None, start=0, end=None, close_at_end=True):
+        """
+        Every strategy over the same history, each from a fresh account
+
+        arrays       : backtest.candle_arrays(candles), pass it to reuse the indicators
+        start / end  : candles to trade [start, end)
+        close_at_end : close positions still open on the last candle
+
+        returns {strategy name: backtest.backtest_result()}
+        """
+        if arrays is None:
+            arrays = candle_arrays(candles, symbol=self.symbol, interval=self.interval)
+        n = len(arrays["close"])
+        end = n if end is None else min(end, n)
+
+        slots = list(self.slots.values())
+        for slot in slots:
+            self._reset(slot)
+            slot["equity_index"].append(start)
+            slot["equity"].append(slot["account"]["balance"])
+            slot["strategy"].prepare(candles, arrays)
+
+        new_months = month_starts(candles["close_times"]).tolist()
+        frame = Frame(candles, arrays)
+        dispatch = self._dispatch
+        for i in range(start, end):
+            frame.i = i
+            frame.new_month = new_months[i]
+            for slot in slots:
+                dispatch(slot, frame, i)
+
+        results = {}
+        for name, slot in self.slots.items():
+            account = slot["account"]
+            book = slot["trade_manager"].positions
+            p = slot["params"]
+            if close_at_end and end > start and account["current_position"] is not None:
+                frame.i = end - 1
+                action = "close_" + account["current_position"]
+                updates = close_position(slot["trade_manager"], account, frame.price, frame.time_str,
+                                         p["fee_rate"], p["cooldown_after_big_pnl"], p["trade_amount_percent"])
+                self._record(slot, end - 1, action, frame.price, updates)
+                slot["trades"][-1]["forced"] = True
+            if close_at_end and end > start and book is not None and book.open_lots:
+                frame.i = end - 1
+                for lot_id in list(book.open_lots):
+                    k = slot["open_trades"].get(lot_id, -1)
+                    updates = close_lot(slot["trade_manager"], account, lot_id, frame.price, frame.time_str,
+                                        p["fee_rate"], p["cooldown_after_big_pnl"], p["trade_amount_percent"])
+                    self._record(slot, end - 1, "close_" + updates["lot"]["side"], frame.price, updates)
+                    slot["trades"][k]["forced"] = True
+            results[name] = backtest_result(slot["params"], start, end, account, slot["trades"],
+                                            slot["equity_index"], slot["equity"])
+        return results
+
+    # ---------- LIVE ----------
+
+    def step(self, candles, index=None):
+        """
+        A candle closed: run every strategy on the last candle of the buffer
+
+        candles : candle buffer (dict of arrays), last item = the candle that just closed
+        index   : number of that candle in the feed (default: candles seen by step())
+
+        returns list of (strategy name, action, updates)
+        """
+        self.candle_count += 1
+        index = self.candle_count if index is None else index
+        n = len(candles["close_prices"])
+        if n < self.min_candles:
+            return []
+
+        arrays = candle_arrays(candles, symbol=self.symbol, interval=self.interval, follow_stream=True)
+        frame = Frame(candles, arrays)
+        frame.i = n - 1
+        months = close_months(candles["close_times"][-2:])
+        frame.new_month = len(months) < 2 or months[-1] != months[-2]
+
+        orders = []
+        for name, slot in self.slots.items():
+            slot["strategy"].prepare(candles, arrays)
+            for action, updates in self._dispatch(slot, frame, index):
+                orders.append((name, action, updates))
+                if self.verbose:
+                    print(f"[{name}] {action} @ {frame.price} | balance: {round(slot['account']['balance'], 2)} $")
+        return orders
+
+    def __call__(self, window, seq):
+        return self.step(window, index=seq)
@@ -0,0 +1,220 @@
+import hashlib
+import hmac
+import math
+import threading
+import time
+from collections import deque
+from urllib.parse import urlencode
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from pipeline import SideEffects
+
+TOOBIT_URL = "https://api.toobit.com"
+API_KEY_HEADER = "X-BB-APIKEY"
+ORDER_PATH = "/api/v1/futures/order"
+RECV_WINDOW = 5000
+DUPLICATE_ORDER_CODE = -1194     # newClientOrderId already used: the order exists, look it up
+
+# order side of every strategy action (Toobit futures: open / close legs are explicit)
+ACTION_SIDES = {
+    "open_long": "BUY_OPEN",
+    "close_long": "SELL_CLOSE",
+    "open_short": "SELL_OPEN",
+    "close_short": "BUY_CLOSE",
+}
+FILLED_STATUSES = ("FILLED",)
+DEAD_STATUSES = ("CANCELED", "REJECTED", "EXPIRED")
+
+
+class ExchangeError(Exception):
+    def __init__(self, status, code, message):
+        super().__init__(f"{status} {code}: {message}")
+        self.status = status
+        self.code = code
+
+
+# HMAC-SHA256 of the query string, like binance / toobit
+def sign(secret, params):
+    return hmac.new(secret.encode("utf-8"), urlencode(params).encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+# same id for every retry of an order: the exchange can't fill it twice
+def client_order_id(order_id, action, prefix="ma"):
+    return f"{prefix}-{order_id}-{action}"
+
+
+class ToobitClient:
+    """
+    Signed REST calls on one pooled keep-alive session (the TLS handshake is
+    paid once, not on every order).
+    """
+
+    def __init__(self, api_key, secret, base_url=TOOBIT_URL, timeout=5, retries=3, pool_size=4,
+                 recv_window=RECV_WINDOW, clock=time.time):
+        self.api_key = api_key
+        self.secret = secret
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.recv_window = recv_window
+        self.clock = clock
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({API_KEY_HEADER: api_key})
+
+    def request(self, method, path, params=None):
+        params = dict(params or {})
+        params["timestamp"] = int(self.clock() * 1000)
+        params["recvWindow"] = self.recv_window
+        params["signature"] = sign(self.secret, params)
+        response = self.session.request(method, f"{self.base_url}{path}", params=params, timeout=self.timeout)
+        body = response.json() if response.content else {}
+        if response.status_code >= 400 or (isinstance(body, dict) and body.get("code", 0) not in (0, 200)):
+            code = body.get("code") if isinstance(body, dict) else None
+            raise ExchangeError(response.status_code, code, body.get("msg") if isinstance(body, dict) else body)
+        return body
+
+    def query_order(self, symbol, client_id):
+        return self.request("GET", ORDER_PATH, {"symbol": symbol, "origClientOrderId": client_id})
+
+    def place_order(self, symbol, side, quantity, client_id, order_type="MARKET"):
+        """
+        returns the order (ack). a timeout / 5xx is retried with the same client
+        order id; if the first try did reach the exchange, the duplicate is
+        answered by looking the order up
+        """
+        params = {"symbol": symbol, "side": side, "type": order_type, "quantity": quantity,
+                  "newClientOrderId": client_id}
+        error = None
+        for attempt in range(self.retries):
+            try:
+                return self.request("POST", ORDER_PATH, params)
+            except ExchangeError as e:
+                if e.code == DUPLICATE_ORDER_CODE:
+                    return self.query_order(symbol, client_id)
+                if e.status < 500:
+                    raise
+                error = e
+            except requests.RequestException as e:
+                error = e
+            time.sleep(min(0.2 * 2 ** attempt, 2))
+        # the order may still exist: last chance to find it
+        try:
+            return self.query_order(symbol, client_id)
+        except ExchangeError:
+            raise RuntimeError(f"order {client_id}: gave up after {self.retries} tries: {error}")
+
+
+class ExecutionAdapter:
+    """
+    Sends the bot's orders to the exchange and reconciles the fills into the
+    orders table (execution columns of database.Database).
+
+    execute() only queues the order; a single worker thread places them in
+    order, waits for the fill and records submit -> ack -> fill latency and
+    slippage against the simulated price (the candle close TradeManager used).
+    """
+
+    def __init__(self, client, db_factory, symbol="BTC-SWAP-USDT", qty_step=0.001, fill_timeout=10.0,
+                 poll=0.2, inline=False):
+        self.client = client
+        self.db_factory = db_factory
+        self.symbol = symbol
+        self.qty_step = qty_step
+        self.fill_timeout = fill_timeout
+        self.poll = poll
+        self.queue = SideEffects(workers=1, inline=inline)
+        self.local = threading.local()
+        self.fills = deque(maxlen=1000)
+        self.open_qty = {}
+
+    # the worker thread's own connection (sqlite connections stay in their thread)
+    def db(self):
+        if not hasattr(self.local, "db"):
+            self.local.db = self.db_factory()
+        return self.local.db
+
+    # position_size : coins (TradeManager's position_value / entry_price), floored to the lot step
+    def quantity(self, position_size):
+        return math.floor(position_size / self.qty_step + 1e-9) * self.qty_step
+
+    def execute(self, action, order_id, price, position_size=None):
+        return self.queue.submit("execution", self._execute, action, order_id, price, position_size)
+
+    def _execute(self, action, order_id, price, position_size):
+        leg = action.split("_")[0]
+        if leg == "open":
+            qty = round(self.quantity(position_size), 10)
+        else:
+            # close what was really filled on the open
+            qty = self.open_qty.pop(order_id, None)
+            if qty is None:
+                qty = (self.db().get_order_execution(order_id) or {}).get("open_fill_qty")
+        if not qty:
+            print(f"execution: nothing to {action} for order #{order_id}")
+            return None
+
+        client_id = client_order_id(order_id, action)
+        t_submit = time.perf_counter()
+        order = self.client.place_order(self.symbol, ACTION_SIDES[action], qty, client_id)
+        t_ack = time.perf_counter()
+
+        deadline = t_ack + self.fill_timeout
+        while order.get("status") not in FILLED_STATUSES:
+            if order.get("status") in DEAD_STATUSES:
+                raise RuntimeError(f"order {client_id} {order.get('status')}")
+            if time.perf_counter() > deadline:
+                raise RuntimeError(f"order {client_id} not filled after {self.fill_timeout} s")
+            time.sleep(self.poll)
+            order = self.client.query_order(self.symbol, client_id)
+        t_fill = time.perf_counter()
+
+        fill_price = float(order.get("avgPrice") or order.get("price"))
+        fill_qty = float(order.get("executedQty") or qty)
+        # positive = paid more than the simulation (bought higher / sold lower)
+        direction = 1 if ACTION_SIDES[action].startswith("BUY") else -1
+        slippage_bps = direction * (fill_price / price - 1) * 10_000
+        record = {
+            "order_id": order_id,
+            "action": action,
+            "client_order_id": client_id,
+            "exchange_order_id": str(order.get("orderId")),
+            "price": price,
+            "fill_price": fill_price,
+            "fill_qty": fill_qty,
+            "slippage_bps": slippage_bps,
+            "ack_ms": (t_ack - t_submit) * 1000,
+            "fill_ms": (t_fill - t_submit) * 1000,
+        }
+        if leg == "open":
+            self.open_qty[order_id] = fill_qty
+        self.db().update_order_execution(order_id, leg, client_id, record["exchange_order_id"], fill_price, fill_qty,
+                                         slippage_bps, record["ack_ms"], record["fill_ms"])
+        self.fills.append(record)
+        print(f"FILLED {action} #{order_id}: {fill_qty} @ {fill_price} | slippage {slippage_bps:.1f} bps "
+              f"| ack {record['ack_ms']:.0f} ms | fill {record['fill_ms']:.0f} ms")
+        return record
+
+    def flush(self, timeout=None):
+        self.queue.flush(timeout)
+
+    def shutdown(self):
+        self.queue.shutdown()
+
+    def summary(self):
+        if not self.fills:
+            return {"fills": 0}
+        ack = np.array([f["ack_ms"] for f in self.fills])
+        fill = np.array([f["fill_ms"] for f in self.fills])
+        slippage = np.array([f["slippage_bps"] for f in self.fills])
+        return {
+            "fills": len(self.fills),
+            "ack_ms": {q: float(np.percentile(ack, q)) for q in (50, 95, 99)},
+            "fill_ms": {q: float(np.percentile(fill, q)) for q in (50, 95, 99)},
+            "slippage_bps": {"mean": float(slippage.mean()), "worst": float(slippage.max())},
+        }
@@ -1,20 +1,58 @@
 import requests
-import time
+import hashlib
+import json
+import os
 import argparse
-from datetime import datetime, timezone
+import bisect
+from collections import deque
+
+import numpy as np
 
 # My Files
-from indicators import Indicator
+from indicator_cache import CachedIndicator
 from telegram_bot import TelegramNotifier
 from database import Database
-from rammonitor import RamMonitor
+from monthly_ledger import MonthlyLedger
 from trademanager import TradeManager
 from trade_csv_logger import TradeCSVLogger
-
+from candles import klines_to_candles, merge_candles, open_time_str, close_time_str
+from checkpoint import save_checkpoint, load_checkpoint
+from pipeline import SideEffects, TickTimer, format_tick_timings
+from intrabar import first_touch
+from recorder import TickRecorder
+from ratelimit import shared_limiter, kline_flight, endpoint_weight
+from clock import SystemClock
+
+BINANCE_URL = "https://api.binance.com"   # e.g. a local binance_stub.py
 VALID_MINUTES = {0, 15, 30, 45}
 FETCH_WINDOW_SECONDS = 10
-BOT_TOKEN = "TOKEN"
-CHAT_ID = int("CHAT_ID")
+# telegram settings (env vars win over the values written here)
+BOT_TOKEN = os.environ.get("BOT_TOKEN", "TOKEN")
+CHAT_ID = os.environ.get("CHAT_ID", "CHAT_ID")
+CHECKPOINT_FILE = "bot_state.ckpt"
+DB_FILE = "database.db"
+RECORD_FILE = "ticks.rec"  # raw inputs of every tick (None = off), replay with: python cli.py replay ticks.rec
+telegram_enabled = True
+CANDLE_BUFFER_SIZE = 200   # closed candles kept between ticks (MA200 needs 200)
+HIGHER_TIMEFRAMES = ("1h", "4h")   # built from the 15m candles (resampler.py), no extra requests
+# database.db retention (see retention.py), None = keep everything in database.db
+RETENTION_POLICY = {
+    "candle_days": 30,             # older symbol_data rows move to the candle store
+    "candle_store": "candle_store",
+    "order_months": 12,            # older closed orders move to archive/orders_<year>.db
+    "archive_dir": "archive",
+}
+MAINTENANCE_EVERY_HOURS = 6
+# real orders on Toobit futures (see execution.py), off = signals / telegram only
+EXECUTION_ENABLED = False
+TOOBIT_API_KEY = os.environ.get("TOOBIT_API_KEY", "")
+TOOBIT_SECRET = os.environ.get("TOOBIT_SECRET", "")
+TOOBIT_URL = os.environ.get("TOOBIT_URL", "https://api.toobit.com")  # e.g. a local toobit_mock.py
+TOOBIT_SYMBOL = "BTC-SWAP-USDT"
+# ticks slower than this (ms) dump a sampled profile to SLOW_TICK_DIR (see slowtick.py), None = off
+SLOW_TICK_BUDGET_MS = None
+SLOW_TICK_DIR = "slow_ticks"
+SLOW_TICK_KEEP = 20
 
 # ---- settings is here ----
 balance = 1000
@@ -35,6 +73,11 @@ cooldown_until_index = -1
 # fee rate
 fee_rate = 0.0005  # 0.05% per trade (entry or exit)
 
+# protective exits, price move in % from entry (None = off); liquidation is always checked
+stop_loss_percent = None
+take_profit_percent = None
+maintenance_rate = 0.005  # isolated margin maintenance rate (liquidation price)
+
 save_money = 0
 total_wins = 0
 total_wins_long = 0
@@ -66,6 +109,57 @@ first_balance = balance
 tactical_balance = first_balance
 
 current_position = None  # None | "long" | "short"
+margin = None
+margin_no_fee = None
+
+# last CANDLE_BUFFER_SIZE closed candles (dict of arrays, see candles.py)
+candle_buffer = None
+# HIGHER_TIMEFRAMES bars of the same feed (resampler.MultiTimeframe), timeframes["4h"].indicator()
+timeframes = None
+
+# tick side effects (candle archive, telegram, console, metrics) run here, off the decision path
+side_effects = SideEffects(workers=1)
+# stage timings of the last ticks
+tick_timings = deque(maxlen=1000)
+# orders connection of the decision thread (opened once, not every tick)
+db = None
+# monthly close filter state per month (monthly_ledger table)
+monthly_ledger = None
+
+# record / replay of the raw tick inputs (see recorder.py, replay.py)
+recorder = None
+# retention / vacuum / ANALYZE on a background thread between ticks (live only)
+maintenance_job = None
+# exchange orders (execution.ExecutionAdapter, live only)
+executor = None
+replay_feed = None
+# orders opened / closed by the current tick
+tick_decisions = []
+# time source of the live loop (clock.SimulatedClock in soak tests, see soak.py)
+clock = SystemClock()
+# rammonitor.RamMonitor of run_live(rammonitor=True)
+ram_monitor = None
+# slowtick.SlowTickProfiler (live only, SLOW_TICK_BUDGET_MS set)
+slow_tick_profiler = None
+
+# strategy settings written into the tick log (replay can compare / reuse them)
+CONFIG_FIELDS = (
+    "leverage", "trade_amount_percent", "monthly_profit_percent_stop_trade", "monthly_compound",
+    "monthly_close_filter", "adx_filter", "volume_filter", "ma_distance_threshold",
+    "candle_move_threshold", "cooldown_after_big_pnl", "fee_rate", "first_balance",
+    "stop_loss_percent", "take_profit_percent", "maintenance_rate",
+)
+
+# globals saved in the checkpoint after every tick
+STATE_FIELDS = (
+    "balance", "balance_without_fee", "current_position", "margin", "margin_no_fee", "leverage",
+    "position_size_no_fee", "balance_before_trade", "balance_before_trade_no_fee",
+    "trade_power", "cooldown_until_index", "tactical_balance", "save_money",
+    "deducting_fee_total", "profits_lst", "total_profit_percent", "count_closed_orders",
+    "equity_curve", "max_drawdown", "total_wins", "total_wins_long", "total_wins_short",
+    "total_losses", "total_long", "total_short",
+    "profit_percent_per_month", "lst_profit_percent_per_month",
+)
 
 # get open, high, low, close, volume with json data
 def get_ohlcv(
@@ -80,7 +174,7 @@ def get_ohlcv(
     limit    : number of candles
     """
 
-    url = "https://api.binance.com/api/v3/klines"
+    url = f"{BINANCE_URL}/api/v3/klines"
 
     params = {
         "symbol": symbol.upper(),
@@ -88,54 +182,276 @@ def get_ohlcv(
         "limit": limit
     }
     print("📊 Fetching OHLCV data...")
+    if replay_feed is not None:
+        return json.loads(replay_feed.next_response(url, params))
+
+    # same request already running in another thread (backfill, other strategies...): share its answer
+    key = (url, params["symbol"], interval, limit)
+    return kline_flight.do(key, lambda: _fetch_json(url, params))
+
+
+# one GET under the process wide weight limiter
+def _fetch_json(url, params):
+    limiter = shared_limiter()
+    limiter.acquire(endpoint_weight(url, params))
     response = requests.get(url, params=params)
+    limiter.observe(response.headers)
+    if response.status_code in (418, 429):
+        limiter.backoff(float(response.headers.get("Retry-After", 60)))
     response.raise_for_status()
-    data = response.json()
+    body = response.content
+    if recorder is not None:
+        recorder.record_http(url, params, response.status_code, body)
+    data = json.loads(body)
 
     return data
 
 
+# keep the candle buffer up to date, only the new candles are downloaded
+def update_candle_buffer():
+    global candle_buffer
+
+    if candle_buffer is not None:
+        # last 2 closed candles + the running one
+        data = get_ohlcv(symbol= "BTCUSDT", interval= "15m", limit= 3)
+        new = klines_to_candles(data[:-1])
+        # bot was off for a while -> the buffer can't be continued, load it again
+        if len(new["open_times"]) == 0 or new["open_times"][0] > candle_buffer["open_times"][-1] + 15 * 60 * 1000:
+            candle_buffer = None
+        else:
+            candle_buffer = merge_candles(candle_buffer, new, maxlen=CANDLE_BUFFER_SIZE)
+
+    if candle_buffer is None:
+        data = get_ohlcv(symbol= "BTCUSDT", interval= "15m", limit= CANDLE_BUFFER_SIZE + 1)
+        candle_buffer = merge_candles(None, klines_to_candles(data[:-1]), maxlen=CANDLE_BUFFER_SIZE)
+
+    return candle_buffer
+
+
+# feed the closed candles the higher timeframes don't have yet (usually one)
+def update_timeframes(candles):
+    global timeframes
+
+    if not HIGHER_TIMEFRAMES:
+        return None
+    if timeframes is None:
+        from resampler import MultiTimeframe
+        timeframes = MultiTimeframe(HIGHER_TIMEFRAMES, base_interval="15m")
+        timeframes.seed(candles["open_times"], candles["open_prices"], candles["high_prices"],
+                        candles["low_prices"], candles["close_prices"], candles["volume_prices"])
+        return timeframes
+
+    last = next(iter(timeframes.resamplers.values())).last_base_open_time
+    start = int(np.searchsorted(candles["open_times"], last, side="right")) if last is not None else 0
+    for i in range(start, len(candles["open_times"])):
+        timeframes.update(candles["open_times"][i], candles["open_prices"][i], candles["high_prices"][i],
+                          candles["low_prices"][i], candles["close_prices"][i], candles["volume_prices"][i])
+    return timeframes
+
+
+def strategy_config():
+    return {name: globals()[name] for name in CONFIG_FIELDS}
+
+
+def config_hash(config):
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def current_state():
+    return {name: globals()[name] for name in STATE_FIELDS}
+
+
+# put a saved state back into the globals
+def apply_state(state):
+    for name in STATE_FIELDS:
+        if name in state:
+            globals()[name] = state[name]
+
+
+# save account state + candle buffer after a tick
+def save_state():
+    state = current_state()
+    try:
+        save_checkpoint(CHECKPOINT_FILE, state, candle_buffer)
+    except OSError as e:
+        print("checkpoint write failed:", e)
+
+
+# load the last checkpoint at startup (open order itself still comes from the DB)
+def restore_state():
+    global candle_buffer
+    state, candles = load_checkpoint(CHECKPOINT_FILE)
+    if state is None:
+        # no checkpoint: the monthly filter state still comes back from the ledger
+        fields = get_ledger().restore_fields()
+        apply_state(fields)
+        if fields:
+            print(f"Restored monthly ledger: balance={balance} | tactical_balance={tactical_balance} | "
+                  f"trade_power={trade_power}")
+        return False
+
+    apply_state(state)
+    candle_buffer = candles
+    print(f"Restored checkpoint: balance={balance} | trade_power={trade_power} | cooldown={cooldown_until_index}")
+    return True
+
+
+def get_db():
+    global db
+    if db is None:
+        db = Database(db_name=DB_FILE)
+    return db
+
+
+def get_ledger():
+    global monthly_ledger
+    if monthly_ledger is None:
+        monthly_ledger = MonthlyLedger(get_db(), clock=clock)
+    return monthly_ledger
+
+
+# ---- stage: ingest ----
+def ingest_stage():
+    # get data from binance (only new candles when the buffer is warm)
+    candles = update_candle_buffer()
+    update_timeframes(candles)
+    # normalize candle timestamps (UTC)
+    return candles, {
+        "open_times": [open_time_str(t) for t in candles["open_times"].tolist()],
+        "open_prices": candles["open_prices"].tolist(),
+        "high_prices": candles["high_prices"].tolist(),
+        "low_prices": candles["low_prices"].tolist(),
+        "close_prices": candles["close_prices"].tolist(),
+        "volume_prices": candles["volume_prices"].tolist(),
+        "close_times": [close_time_str(t) for t in candles["close_times"].tolist()],
+    }
+
+
+# ---- side effect: move the last candle to database.db (own connection, runs on the worker) ----
+def archive_candle(symbol, open_time, open_price, high_price, low_price, close_price, volume, close_time):
+    archive_db = Database(db_name=DB_FILE)
+    print(f"inserting data to {DB_FILE}")
+    archive_db.insert_data(symbol= symbol,
+                           open_times= open_time,
+                           open_prices= open_price,
+                           high_prices= high_price,
+                           low_prices= low_price,
+                           close_prices= close_price,
+                           volume_prices= volume,
+                           close_times= close_time
+                           )
+    archive_db.close()
+
+
+# ---- side effect: metrics ----
+def report_tick_timings(timings):
+    print(format_tick_timings(timings))
+
+
+# ---- stop loss / take profit / liquidation of the open position ----
+def protective_exit(trade_manager, candles, close_times, side, entry_price, entry_time, leverage):
+    """
+    Candles closed since the entry (entry_time = close time str of the entry
+    candle), high / low against the position's levels, the first touch wins.
+    Scanning from the entry (not only the last candle) also covers candles
+    fetched after a restart.
+
+    returns (reason, fill price) or (None, None)
+    """
+    levels = trade_manager.protective_levels(side, entry_price, leverage)
+    n = len(close_times)
+    start = bisect.bisect_right(close_times, entry_time) if entry_time is not None else n - 1
+    adverse = levels["stop_price"] if levels["stop_price"] is not None else levels["liquidation_price"]
+    if side == "long":
+        adverse = max(adverse, levels["liquidation_price"])
+        below, above = adverse, levels["take_profit_price"]
+    else:
+        adverse = min(adverse, levels["liquidation_price"])
+        below, above = levels["take_profit_price"], adverse
+    j = first_touch(candles["high_prices"], candles["low_prices"], max(start, 0), n, below=below, above=above)
+    if j is None:
+        return None, None
+    reason, fill = trade_manager.intrabar_exit(side, levels, candles["open_prices"][j],
+                                               candles["high_prices"][j], candles["low_prices"][j])
+    return reason, float(fill)
+
+
+# ---- what a tick worked on (slow tick dumps) ----
+def tick_inputs():
+    return {
+        "candle_buffer": len(candle_buffer["close_prices"]) if candle_buffer is not None else 0,
+        "decisions": len(tick_decisions),
+        "pending_side_effects": len(side_effects.pending),
+        "open_position": current_position,
+        "maintenance_job": maintenance_job is not None,
+        "recording": recorder is not None,
+    }
+
+
 # Main Trading Logic
+# one tick: ingest -> indicators -> decision -> persist order -> fan-out side effects
 def ma_strategy():
-    global balance, balance_without_fee, current_position, margin, trade_power, cooldown_until_index, leverage, position_size_no_fee, margin_no_fee, balance_before_trade, balance_before_trade_no_fee, deducting_fee_total, profits_lst, total_profit_percent, count_closed_orders, equity_curve, max_drawdown, total_wins, total_wins_long, total_wins_short, total_losses, total_long, total_short, profit_percent_per_month, save_money
+    if maintenance_job is not None:
+        maintenance_job.pause()
+    timer = TickTimer(clock=clock.time)
+    tick_decisions.clear()
+    if recorder is not None:
+        recorder.begin_tick(clock.time(), config_hash(strategy_config()))
+    if slow_tick_profiler is not None:
+        slow_tick_profiler.begin()
+    try:
+        strategy_tick(timer)
+    finally:
+        timer.mark("fan-out" if timer.critical_end is not None else "decision")
+        timings = timer.summary()
+        if slow_tick_profiler is not None:
+            slow_tick_profiler.end(timings, tick_inputs())
+        tick_timings.append(timings)
+        side_effects.submit("metrics", report_tick_timings, timings)
+        if maintenance_job is not None:
+            maintenance_job.poke()
+        if recorder is not None:
+            recorder.end_tick(list(tick_decisions))
+
+
+# ---- side effect: telegram (off while replaying) ----
+def notify(send, **kwargs):
+    if telegram_enabled:
+        side_effects.submit("telegram", send, **kwargs)
+
+
+# ---- real order on the exchange (live only, queued: the tick doesn't wait for the fill) ----
+def execute_order(action, order_id, price, position_size=None):
+    if executor is not None and order_id is not None:
+        executor.execute(action, order_id, price, position_size)
+
+
+def strategy_tick(timer):
+    global balance, balance_without_fee, current_position, margin, trade_power, cooldown_until_index, leverage, position_size_no_fee, margin_no_fee, balance_before_trade, balance_before_trade_no_fee, deducting_fee_total, profits_lst, total_profit_percent, count_closed_orders, equity_curve, max_drawdown, total_wins, total_wins_long, total_wins_short, total_losses, total_long, total_short, profit_percent_per_month, save_money, tactical_balance
 
     csv_logger = TradeCSVLogger()
 
     # send message to telegram
     signal_message = TelegramNotifier(bot_token=BOT_TOKEN, chat_id = CHAT_ID)
 
-    open_times = []
-    open_prices = []
-    high_prices = []
-    low_prices = []
-    close_prices = []
-    volume_prices = []
-    close_times = []
-
-    # get data from binance
-    data = (get_ohlcv(symbol= "BTCUSDT", interval= "15m", limit= 201))  # BTCUSDT by default
-    # Fetch OHLCV data from Binance and normalize candle timestamps (UTC) 
-    for i in range(len(data) - 1):
-        open_times.append(str(datetime.fromtimestamp(data[i][0] / 1000, tz=timezone.utc)))
-        open_prices.append(float(data[i][1]))
-        high_prices.append(float(data[i][2]))
-        low_prices.append(float(data[i][3]))
-        close_prices.append(float(data[i][4]))
-        volume_prices.append(float(data[i][5]))
-        close_times.append(str(datetime.fromtimestamp((data[i][6] / 1000) + 0.001, tz=timezone.utc)))
-
-    # move data to database.db
-    db = Database(db_name="database.db")
-    print("inserting data to database.db")
-    db.insert_data(symbol= "BTCUSDT",
-                   open_times= open_times[-1],
-                   open_prices= open_prices[-1],
-                   high_prices= high_prices[-1],
-                   low_prices= low_prices[-1],
-                   close_prices= close_prices[-1],
-                   volume_prices= volume_prices[-1],
-                   close_times= close_times[-1]
-                   )
+    # ===================== INGEST =====================
+    candles, lists = ingest_stage()
+    open_times = lists["open_times"]
+    open_prices = lists["open_prices"]
+    high_prices = lists["high_prices"]
+    low_prices = lists["low_prices"]
+    close_prices = lists["close_prices"]
+    volume_prices = lists["volume_prices"]
+    close_times = lists["close_times"]
+    # candle close time in ms (for the candle close -> order latency)
+    candle_close_ms = int(candles["close_times"][-1]) + 1
+
+    # move data to database.db (not needed for the decision)
+    side_effects.submit("archive candle", archive_candle, "BTCUSDT",
+                        open_times[-1], open_prices[-1], high_prices[-1], low_prices[-1],
+                        close_prices[-1], volume_prices[-1], close_times[-1])
+
+    db = get_db()
 
     # --- restore open order if exists (persist across restarts)
     open_order = db.get_open_order()
@@ -164,26 +480,40 @@ def ma_strategy():
         if open_order.get('current_position') is not None:
             current_position = open_order.get('current_position')
 
-        print(f"Restored open order #{order_id}: {current_position} @ {entry_price} (size={position_size}, margin={margin}, lev={leverage})")
-    
-    # ---- get MA/EMA ----
-    indicator = Indicator(close_prices, period=None)
+        side_effects.submit("console", print, f"Restored open order #{order_id}: {current_position} @ {entry_price} (size={position_size}, margin={margin}, lev={leverage})")
+    timer.mark("ingest")
+
+    # ===================== INDICATORS =====================
+    # ---- get MA/EMA (indicator_cache: same candles -> no recompute, old range dropped) ----
+    indicator = CachedIndicator("BTCUSDT", "15m", candles["open_times"], close_prices,
+                                high_prices, low_prices, volume_prices, follow_stream=True)
     ema_14 = indicator.get_EMA(14)[-1]
     ma_50 = indicator.get_MA(50)[-1]
     ma_130 = indicator.get_MA(130)[-1]
     ma_200 = indicator.get_MA(200)[-1]
 
     # ---- get_ADX ----
-    indicator = Indicator(close_prices)
     adx = indicator.get_ADX(
         high_prices,
         low_prices,
         close_prices,
         period=14)[-1]
-    
+    timer.mark("indicators")
+
+    # ===================== DECISION =====================
     # ---- MANAGE TRADES ----
     trade_manager = TradeManager(csv_logger, first_balance, monthly_profit_percent_stop_trade, 
-                                 tactical_balance, monthly_close_filter, monthly_compound)
+                                 tactical_balance, monthly_close_filter, monthly_compound, ledger=get_ledger(),
+                                 stop_loss_percent=stop_loss_percent, take_profit_percent=take_profit_percent,
+                                 maintenance_rate=maintenance_rate)
+
+    # ---- PROTECTIVE EXITS: stop loss / take profit / liquidation hit since the entry ----
+    exit_reason, exit_price = None, None
+    if current_position is not None and open_order is not None:
+        exit_reason, exit_price = protective_exit(trade_manager, candles, close_times, current_position,
+                                                  entry_price, open_time_value, leverage)
+    # signal exits close at the candle close, protective ones at their level
+    close_price = exit_price if exit_reason is not None else close_prices[-1]
 
     # Calculate MA Distance
     ma_distance = abs(ema_14 - ma_50) / ma_50
@@ -194,32 +524,16 @@ def ma_strategy():
     total_balance = balance + (margin if current_position is not None else 0)
 
     # ---- Monthly close filter: if trading is disabled (trade_power==False)
-    # detect month boundaries from `close_times` and re-enable trading
-    # when a new month starts. Uses indices within the fetched data
-    # (avoids relying on an undefined `start` or `i`).
-    if monthly_close_filter:
-        # build set of month-start indices in the fetched data
-        lst_month_starts = set()
-        prev_month = None
-        for idx, t in enumerate(close_times):
-            try:
-                dt = datetime.fromisoformat(t)
-            except Exception:
-                # fallback if formatting differs
-                dt = datetime.fromtimestamp(datetime.fromisoformat(t).timestamp(), tz=timezone.utc)
-            if prev_month is None or dt.month != prev_month:
-                lst_month_starts.add(idx)
-            prev_month = dt.month
-
-        current_index = len(close_times) - 1
-
-        if not trade_power:
-            if current_index in lst_month_starts:
-                lst_profit_percent_per_month.append(profit_percent_per_month)
-                profit_percent_per_month = 0
-                trade_power = True
-            else:
-                return
+    # re-enable it on the first candle of a new month (checked against the monthly ledger, O(1))
+    if monthly_close_filter and not trade_power:
+        ledger = get_ledger()
+        if ledger.month_started(close_times[-1], close_times[-2]):
+            lst_profit_percent_per_month.append(profit_percent_per_month)
+            profit_percent_per_month = 0
+            trade_power = True
+            ledger.start_month(close_times[-1], tactical_balance, balance, save_money)
+        else:
+            return
 
     # ---- Cooldown handling: if cooldown is active, decrement and skip
     if cooldown_until_index > 0:
@@ -254,6 +568,7 @@ def ma_strategy():
                     return
 
             # ---- open order ----
+            timer.mark("decision")
             updates = trade_manager.open_long(
                 close_prices[-1],
                 close_times[-1],
@@ -297,17 +612,23 @@ def ma_strategy():
                 position_size_no_fee=position_size_no_fee,
                 current_position=current_position
             )
+            timer.mark("persist")
+            execute_order("open_long", order_id, close_prices[-1], position_size)
+            timer.end_critical_path(candle_close_ms)
 
             # terminal + telegram notification with details
-            print(f"ORDER OPENED #{order_id}: LONG @ {entry_price} | size={position_size} | margin={margin} | lev={leverage}")
-            signal_message.send_open_long(price=close_prices[-1], time_str=close_times[-1], margin=margin, position_size=position_size, leverage=leverage)
+            tick_decisions.append({"action": "open_long", "time": close_times[-1], "price": close_prices[-1],
+                                   "margin": margin, "leverage": leverage, "position_size": position_size})
+            side_effects.submit("console", print, f"ORDER OPENED #{order_id}: LONG @ {entry_price} | size={position_size} | margin={margin} | lev={leverage}")
+            notify(signal_message.send_open_long, price=close_prices[-1], time_str=close_times[-1], margin=margin, position_size=position_size, leverage=leverage)
 
     # ===================== CLOSE LONG =====================
     if current_position == "long":
-        if (ema_14 < ma_50) or (ma_130 < ma_200):
+        if exit_reason is not None or (ema_14 < ma_50) or (ma_130 < ma_200):
             # CLOSE LONG
+            timer.mark("decision")
             updates = trade_manager.close_long(
-                close_prices[-1],
+                close_price,
                 close_times[-1],
                 entry_price,
                 position_size,
@@ -357,6 +678,7 @@ def ma_strategy():
             profit_percent_per_month = updates['profit_percent_per_month']
             save_money = updates["save_money"]
             trade_power = updates['trade_power']
+            tactical_balance = trade_manager.tactical_balance
             # capture profit info before clearing updates
             profit = updates.get('profit')
             profit_percent = updates.get('profit_percent')
@@ -366,15 +688,22 @@ def ma_strategy():
             if order_id is not None:
                 try:
                     db.update_order_close(order_id=order_id,
-                                          close_price=close_prices[-1],
+                                          close_price=close_price,
                                           close_time=close_times[-1],
                                           profit=profit,
                                           profit_percent=profit_percent)
                 except Exception as e:
                     print("DB update_order_close failed:", e)
+            timer.mark("persist")
+            execute_order("close_long", order_id, close_price)
+            timer.end_critical_path(candle_close_ms)
 
-            print(f"ORDER CLOSED #{order_id}: LONG closed @ {close_prices[-1]} | P/L: {profit} ({profit_percent}%)")
-            signal_message.send_close_long(price= close_prices[-1], time_str= close_times[-1], profit=profit, profit_percent=profit_percent, balance_before=balance_before_trade, balance_after=balance)
+            tick_decisions.append({"action": "close_long", "time": close_times[-1], "price": close_price,
+                                   "profit": profit, "profit_percent": profit_percent})
+            if exit_reason is not None:
+                tick_decisions[-1]["exit"] = exit_reason
+            side_effects.submit("console", print, f"ORDER CLOSED #{order_id}: LONG closed @ {close_price} | P/L: {profit} ({profit_percent}%)")
+            notify(signal_message.send_close_long, price= close_price, time_str= close_times[-1], profit=profit, profit_percent=profit_percent, balance_before=balance_before_trade, balance_after=balance)
 
 
     # ===================== OPEN SHORT =====================
@@ -405,6 +734,7 @@ def ma_strategy():
                     return
     
             # ---- open SHORT ----
+            timer.mark("decision")
             updates = trade_manager.open_short(
                 close_prices[-1],
                 close_times[-1],
@@ -448,17 +778,23 @@ def ma_strategy():
                 position_size_no_fee=position_size_no_fee,
                 current_position=current_position
             )
+            timer.mark("persist")
+            execute_order("open_short", order_id, close_prices[-1], position_size)
+            timer.end_critical_path(candle_close_ms)
 
-            print(f"ORDER OPENED #{order_id}: SHORT @ {entry_price} | size={position_size} | margin={margin} | lev={leverage}")
-            signal_message.send_open_short(price=close_prices[-1], time_str=close_times[-1], margin=margin, position_size=position_size, leverage=leverage)
+            tick_decisions.append({"action": "open_short", "time": close_times[-1], "price": close_prices[-1],
+                                   "margin": margin, "leverage": leverage, "position_size": position_size})
+            side_effects.submit("console", print, f"ORDER OPENED #{order_id}: SHORT @ {entry_price} | size={position_size} | margin={margin} | lev={leverage}")
+            notify(signal_message.send_open_short, price=close_prices[-1], time_str=close_times[-1], margin=margin, position_size=position_size, leverage=leverage)
 
 
     # ===================== CLOSE SHORT =====================
     if current_position == "short":
-        if (ema_14 > ma_50) or (ma_130 >= ma_200):
+        if exit_reason is not None or (ema_14 > ma_50) or (ma_130 >= ma_200):
             # CLOSE SHORT
+            timer.mark("decision")
             updates = trade_manager.close_short(
-                close_prices[-1],
+                close_price,
                 close_times[-1],
                 entry_price,
                 position_size,
@@ -509,6 +845,7 @@ def ma_strategy():
             profit_percent_per_month = updates['profit_percent_per_month']
             save_money = updates['save_money']
             trade_power = updates['trade_power']
+            tactical_balance = trade_manager.tactical_balance
             # capture profit info before clearing updates
             profit = updates.get('profit')
             profit_percent = updates.get('profit_percent')
@@ -518,45 +855,113 @@ def ma_strategy():
             if order_id is not None:
                 try:
                     db.update_order_close(order_id=order_id,
-                                            close_price=close_prices[-1],
+                                            close_price=close_price,
                                             close_time=close_times[-1],
                                             profit=profit,
                                             profit_percent=profit_percent)
                 except Exception as e:
                     print("DB update_order_close failed:", e)
+            timer.mark("persist")
+            execute_order("close_short", order_id, close_price)
+            timer.end_critical_path(candle_close_ms)
 
-            print(f"ORDER CLOSED #{order_id}: SHORT closed @ {close_prices[-1]} | P/L: {profit} ({profit_percent}%)")
-            signal_message.send_close_short(price= close_prices[-1], time_str= close_times[-1], profit=profit, profit_percent=profit_percent, balance_before=balance_before_trade, balance_after=balance)
+            tick_decisions.append({"action": "close_short", "time": close_times[-1], "price": close_price,
+                                   "profit": profit, "profit_percent": profit_percent})
+            if exit_reason is not None:
+                tick_decisions[-1]["exit"] = exit_reason
+            side_effects.submit("console", print, f"ORDER CLOSED #{order_id}: SHORT closed @ {close_price} | P/L: {profit} ({profit_percent}%)")
+            notify(signal_message.send_close_short, price= close_price, time_str= close_times[-1], profit=profit, profit_percent=profit_percent, balance_before=balance_before_trade, balance_after=balance)
 
 
 # wait on 0, 15, 30, 45 minutes for get data
 def wait_for_next_quarter():
     while True:
-        now = datetime.now(timezone.utc)
+        now = clock.now()
         minute = now.minute
         second = now.second
 
         if minute in VALID_MINUTES and second < FETCH_WINDOW_SECONDS:
             return
-        time.sleep(0.3)
-
-parser = argparse.ArgumentParser(description="Trading bot")
-parser.add_argument(
-    "--rammonitor",
-    action="store_true",
-    help="Enable RAM monitor"
-)
-args = parser.parse_args()
-
-# you can turn on to see bot ram usage:  ----> True/False
-# ================= RAM MONITOR =================
-if args.rammonitor:
-    ram_monitor = RamMonitor(interval=2, warn_mb=500)
-    ram_monitor.start()
+        # check again at the next full minute (the real clock still polls every 0.3 s)
+        clock.sleep_until(int(clock.time()) // 60 * 60 + 60)
 
-# MAIN LOOP 
-while True:
-    wait_for_next_quarter()
-    ma_strategy()
 
-    time.sleep(FETCH_WINDOW_SECONDS + 1)
\ No newline at end of file
+# live trading loop (python get_info.py or python cli.py live)
+def run_live(rammonitor=False, record_file=RECORD_FILE, until=None, on_tick=None, slow_tick_ms=None):
+    """
+    until        : clock time (unix s) to stop at, None = run forever
+    on_tick      : called after every tick (soak tests sample DB size / memory there)
+    slow_tick_ms : latency budget of a tick, overrides SLOW_TICK_BUDGET_MS
+    """
+    global recorder, maintenance_job, executor, ram_monitor, slow_tick_profiler
+
+    # you can turn on to see bot ram usage:  ----> --rammonitor
+    # ================= RAM MONITOR =================
+    if rammonitor:
+        # psutil is only loaded when the monitor is on
+        from rammonitor import RamMonitor
+        ram_monitor = RamMonitor(interval=2, warn_mb=500, clock=clock)
+        ram_monitor.start()
+
+    # resume from the last checkpoint (account + candle buffer)
+    restore_state()
+
+    # every tick's raw inputs go to the tick log, starting with where this session starts from
+    if record_file is not None:
+        recorder = TickRecorder(record_file)
+        recorder.start_session(current_state(), candle_buffer, get_db().get_open_order(), strategy_config(),
+                               ledger=get_ledger().row)
+
+    if RETENTION_POLICY is not None:
+        from retention import MaintenanceJob
+        maintenance_job = MaintenanceJob(DB_FILE, RETENTION_POLICY, every=MAINTENANCE_EVERY_HOURS * 3600, clock=clock)
+
+    if EXECUTION_ENABLED:
+        from execution import ToobitClient, ExecutionAdapter
+        client = ToobitClient(TOOBIT_API_KEY, TOOBIT_SECRET, base_url=TOOBIT_URL)
+        executor = ExecutionAdapter(client, lambda: Database(db_name=DB_FILE), symbol=TOOBIT_SYMBOL)
+
+    budget_ms = slow_tick_ms if slow_tick_ms is not None else SLOW_TICK_BUDGET_MS
+    if budget_ms is not None:
+        from slowtick import SlowTickProfiler
+        slow_tick_profiler = SlowTickProfiler(budget_ms, directory=SLOW_TICK_DIR, keep=SLOW_TICK_KEEP, clock=clock)
+
+    # MAIN LOOP 
+    try:
+        while until is None or clock.time() < until:
+            wait_for_next_quarter()
+            ma_strategy()
+            save_state()
+            if on_tick is not None:
+                on_tick()
+
+            clock.sleep(FETCH_WINDOW_SECONDS + 1)
+    finally:
+        # let the last telegram messages / archive inserts finish
+        side_effects.shutdown()
+        if executor is not None:
+            executor.shutdown()
+        if maintenance_job is not None:
+            maintenance_job.close()
+        if recorder is not None:
+            recorder.close()
+        if ram_monitor is not None:
+            ram_monitor.stop()
+        if slow_tick_profiler is not None:
+            slow_tick_profiler.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trading bot")
+    parser.add_argument(
+        "--rammonitor",
+        action="store_true",
+        help="Enable RAM monitor"
+    )
+    parser.add_argument(
+        "--no-record",
+        action="store_true",
+        help="Don't write the tick log"
+    )
+    args = parser.parse_args()
+    run_live(rammonitor=args.rammonitor, record_file=None if args.no_record else RECORD_FILE)
@@ -0,0 +1,334 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from indicators import Indicator, ma_array, ema_array, adx_array, rolling_avg_volume
+
+
+# hash of the candle range an indicator is computed on
+def data_fingerprint(open_times, *series):
+    """
+    open_times : candle open times (ms) of the range
+    series     : the price/volume lists the indicator reads
+
+    two ranges only share a fingerprint if every candle is the same, so a
+    new candle (or a corrected one) always gives a new key.
+    """
+    open_times = np.asarray(open_times, dtype=np.int64)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(open_times.tobytes())
+    for values in series:
+        digest.update(np.asarray(values, dtype=float).tobytes())
+
+    first = int(open_times[0]) if len(open_times) else None
+    last = int(open_times[-1]) if len(open_times) else None
+    return (len(open_times), first, last, digest.hexdigest())
+
+
+class IndicatorCache:
+    """
+    Memory LRU (+ optional disk tier) for indicator results.
+
+    key: (symbol, interval, data fingerprint, indicator name, params)
+
+    Keys are content addressed: when candles are appended the fingerprint
+    changes, so an old result is never returned for new data. Old entries
+    of a stream are dropped right away (memory and disk) with
+    invalidate(symbol, interval) or, for a live feed, by advance_stream() on
+    every new candle range; otherwise they just fall out of the LRU.
+
+    disk_max_mb : size cap of disk_dir, the least recently used files go first
+    """
+
+    def __init__(self, maxsize=256, disk_dir=None, disk_max_mb=512):
+        self.maxsize = maxsize
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_mb * 1024 ** 2
+        self.entries = OrderedDict()
+        self.stream_heads = {}
+        self.lock = threading.Lock()
+
+        # disk tier: path -> (key, bytes), least recently used first
+        self.disk_index = OrderedDict()
+        self.disk_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+        if disk_dir is not None:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._scan_disk()
+
+    def get_or_compute(self, key, compute):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+
+        value = self._load_disk(key)
+        if value is not None:
+            with self.lock:
+                self.disk_hits += 1
+                self._put(key, value)
+            return value
+
+        value = compute()
+        with self.lock:
+            self.misses += 1
+            self._put(key, value)
+        self._save_disk(key, value)
+        return value
+
+    def _put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    # live feed moved forward: results of the previous range can't be asked for again
+    def advance_stream(self, symbol, interval, fingerprint):
+        stream = (symbol, interval)
+        with self.lock:
+            head = self.stream_heads.get(stream)
+            # same range (len, first, last) read through other series: nothing to drop
+            if head is not None and head[:3] != fingerprint[:3]:
+                # any result (close / hlc / volume based) of the old candle range
+                self._drop(lambda key: key[:2] == stream and key[2][:3] == head[:3])
+            self.stream_heads[stream] = fingerprint
+
+    def invalidate(self, symbol=None, interval=None):
+        with self.lock:
+            self._drop(lambda key: (symbol is None or key[0] == symbol) and (interval is None or key[1] == interval))
+
+    def _drop(self, match):
+        for key in [key for key in self.entries if match(key)]:
+            del self.entries[key]
+        for path in [path for path, (key, size) in self.disk_index.items() if match(key)]:
+            self._remove_disk(path)
+
+    # memory and disk tier
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.stream_heads.clear()
+            for path in list(self.disk_index):
+                self._remove_disk(path)
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "disk_files": len(self.disk_index),
+            "disk_mb": self.disk_bytes / 1024 ** 2,
+            "disk_evictions": self.disk_evictions,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+    # ---------- DISK TIER ----------
+    # file = pickle(key) + pickle(value), so the index is built without loading values
+
+    def _disk_path(self, key):
+        name = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self.disk_dir, name + ".pkl")
+
+    # index the files of an earlier run (oldest first), drop unreadable ones
+    def _scan_disk(self):
+        files = []
+        for name in os.listdir(self.disk_dir):
+            path = os.path.join(self.disk_dir, name)
+            if name.endswith(".tmp"):
+                _remove(path)
+                continue
+            if not name.endswith(".pkl"):
+                continue
+            try:
+                with open(path, "rb") as f:
+                    key = pickle.load(f)
+                files.append((os.path.getmtime(path), path, key, os.path.getsize(path)))
+            except (OSError, EOFError, pickle.UnpicklingError):
+                _remove(path)
+        for _, path, key, size in sorted(files, key=lambda item: item[0]):
+            self.disk_index[path] = (key, size)
+            self.disk_bytes += size
+        with self.lock:
+            self._prune_disk()
+
+    def _load_disk(self, key):
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key)
+        with self.lock:
+            if path not in self.disk_index:
+                return None
+            self.disk_index.move_to_end(path)
+        try:
+            with open(path, "rb") as f:
+                stored_key = pickle.load(f)
+                # sha collision guard
+                if stored_key != key:
+                    return None
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _save_disk(self, key, value):
+        if self.disk_dir is None:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            print("indicator cache disk write failed:", e)
+            return
+        with self.lock:
+            if path in self.disk_index:
+                self.disk_bytes -= self.disk_index.pop(path)[1]
+            self.disk_index[path] = (key, size)
+            self.disk_bytes += size
+            self._prune_disk()
+
+    def _prune_disk(self):
+        while self.disk_index and self.disk_bytes > self.disk_max_bytes:
+            self._remove_disk(next(iter(self.disk_index)))
+            self.disk_evictions += 1
+
+    def _remove_disk(self, path):
+        key, size = self.disk_index.pop(path)
+        self.disk_bytes -= size
+        _remove(path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+_default_cache = None
+
+
+# one cache shared by everything in the process
+def get_default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = IndicatorCache()
+    return _default_cache
+
+
+class CachedIndicator:
+    """
+    Same methods as Indicator, results come from the cache when the same
+    candles were already computed (sweeps, backtests, other strategies).
+
+    Results are shared between callers, don't modify the returned lists/arrays.
+    follow_stream : live feed, drop the cached results of the previous candle range
+    """
+
+    def __init__(self, symbol, interval, open_times, close_prices,
+                 high_prices=None, low_prices=None, volume_prices=None, cache=None, follow_stream=False):
+        self.cache = cache if cache is not None else get_default_cache()
+        self.symbol = symbol
+        self.interval = interval
+        self.open_times = open_times
+        self.close_prices = close_prices
+        self.high_prices = high_prices
+        self.low_prices = low_prices
+        self.volume_prices = volume_prices
+        self.indicator = Indicator(close_prices, period=None)
+
+        self.close_fingerprint = data_fingerprint(open_times, close_prices)
+        self._hlc_fingerprint = None
+        self._volume_fingerprint = None
+        if follow_stream:
+            self.cache.advance_stream(symbol, interval, self.close_fingerprint)
+
+    def _key(self, fingerprint, name, *params):
+        return (self.symbol, self.interval, fingerprint, name, params)
+
+    # a series passed to a method has to be the one the key is built from (same object: no compare)
+    @staticmethod
+    def _check_series(name, passed, stored):
+        if passed is None or passed is stored:
+            return
+        if stored is None or len(passed) != len(stored) or not np.array_equal(
+                np.asarray(passed, dtype=float), np.asarray(stored, dtype=float)):
+            raise ValueError(f"CachedIndicator: {name} series differs from the one it was built with")
+
+    def _hlc(self):
+        if self._hlc_fingerprint is None:
+            self._hlc_fingerprint = data_fingerprint(self.open_times, self.high_prices, self.low_prices, self.close_prices)
+        return self._hlc_fingerprint
+
+    def _volume(self):
+        if self._volume_fingerprint is None:
+            self._volume_fingerprint = data_fingerprint(self.open_times, self.volume_prices)
+        return self._volume_fingerprint
+
+    # ---- list results (like Indicator) ----
+
+    def get_MA(self, period):
+        key = self._key(self.close_fingerprint, "MA", period)
+        return self.cache.get_or_compute(key, lambda: self.indicator.get_MA(period))
+
+    def get_EMA(self, period):
+        key = self._key(self.close_fingerprint, "EMA", period)
+        return self.cache.get_or_compute(key, lambda: self.indicator.get_EMA(period))
+
+    def get_ADX(self, high=None, low=None, close=None, period=14):
+        # high/low/close are accepted for Indicator compatibility, they have to be the stored candles
+        self._check_series("high", high, self.high_prices)
+        self._check_series("low", low, self.low_prices)
+        self._check_series("close", close, self.close_prices)
+        key = self._key(self._hlc(), "ADX", period)
+        return self.cache.get_or_compute(
+            key, lambda: self.indicator.get_ADX(self.high_prices, self.low_prices, self.close_prices, period=period))
+
+    def get_avg_volume_last(self, volume_prices=None, window=15):
+        self._check_series("volume", volume_prices, self.volume_prices)
+        key = self._key(self._volume(), "AVG_VOLUME_LAST", window)
+        return self.cache.get_or_compute(
+            key, lambda: self.indicator.get_avg_volume_last(self.volume_prices, window=window))
+
+    # ---- numpy results (vectorized kernels) ----
+
+    def ma_array(self, period):
+        key = self._key(self.close_fingerprint, "ma_array", period)
+        return self.cache.get_or_compute(key, lambda: _read_only(ma_array(self.close_prices, period)))
+
+    def ema_array(self, period):
+        key = self._key(self.close_fingerprint, "ema_array", period)
+        return self.cache.get_or_compute(key, lambda: _read_only(ema_array(self.close_prices, period)))
+
+    def adx_array(self, period=14):
+        key = self._key(self._hlc(), "adx_array", period)
+        return self.cache.get_or_compute(
+            key, lambda: _read_only(adx_array(self.high_prices, self.low_prices, self.close_prices, period)))
+
+    def rolling_avg_volume(self, window=15):
+        key = self._key(self._volume(), "rolling_avg_volume", window)
+        return self.cache.get_or_compute(key, lambda: _read_only(rolling_avg_volume(self.volume_prices, window)))
+
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
@@ -1,4 +1,11 @@
-import pandas as pd
+from collections import deque
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# pandas is only needed for the ewm based kernels (ADX / EMA arrays),
+# it's imported there so importing this module stays cheap
+
 
 class Indicator:
     def __init__(self, open_prices, period=None):
@@ -53,69 +60,403 @@ class Indicator:
 
 
     # calculate: ADX --> Average Directional Index
+    # (same math as before, done by the numpy kernel instead of a row loop over a DataFrame)
     def get_ADX(self, high, low, close, period=14):
+        return adx_array(high, low, close, period=period).tolist()
 
-        df = pd.DataFrame({
-            "high": high,
-            "low": low,
-            "close": close
-        })
+    # get average volume
+    def get_avg_volume_last(self, volume_prices, window=15):
+        """
+        Calculate average volume of last N candles
+        volume_prices : list of volumes (e.g. last 200 volumes)
+        window        : number of last candles (default 15)
+        """
+        if len(volume_prices) < window:
+            return sum(volume_prices) / len(volume_prices)
 
-        df["prev_close"] = df["close"].shift(1)
-        df["prev_high"] = df["high"].shift(1)
-        df["prev_low"] = df["low"].shift(1)
+        return sum(volume_prices[-window:]) / window
 
-        # ===== True Range =====
-        tr_list = [None]
-        for i in range(1, len(df)):
-            tr = max(
-                df["high"].iloc[i] - df["low"].iloc[i],
-                abs(df["high"].iloc[i] - df["prev_close"].iloc[i]),
-                abs(df["low"].iloc[i] - df["prev_close"].iloc[i])
-            )
-            tr_list.append(tr)
+    # ATR --> Average True Range (Wilder)
+    def get_ATR(self, high, low, close, period=14):
+        return atr_array(high, low, close, period=period).tolist()
 
-        df["tr"] = tr_list
+    # RSI --> Relative Strength Index (Wilder) of the prices
+    def get_RSI(self, period=14):
+        return rsi_array(self.open_prices, period=period).tolist()
 
-        # ===== Directional Movement =====
-        plus_dm = [None]
-        minus_dm = [None]
+    # Bollinger bands of the prices: (middle, upper, lower)
+    def get_bollinger(self, period=20, k=2.0):
+        return tuple(band.tolist() for band in bollinger_array(self.open_prices, period=period, k=k))
 
-        for i in range(1, len(df)):
-            up_move = df["high"].iloc[i] - df["prev_high"].iloc[i]
-            down_move = df["prev_low"].iloc[i] - df["low"].iloc[i]
+    # VWAP, reset every `session_ms` (daily by default) when the open times are given
+    def get_VWAP(self, high, low, close, volume, open_times=None):
+        return vwap_array(high, low, close, volume, open_times=open_times).tolist()
 
-            plus_dm.append(up_move if up_move > down_move and up_move > 0 else 0)
-            minus_dm.append(down_move if down_move > up_move and down_move > 0 else 0)
+    # OBV --> On Balance Volume of the prices
+    def get_OBV(self, volume):
+        return obv_array(self.open_prices, volume).tolist()
 
-        df["+dm"] = plus_dm
-        df["-dm"] = minus_dm
+    # Donchian channel: (upper, middle, lower)
+    def get_donchian(self, high, low, period=20):
+        return tuple(band.tolist() for band in donchian_array(high, low, period=period))
 
-        # ===== Wilder smoothing =====
-        df["tr_smooth"] = df["tr"].ewm(alpha=1/period, adjust=False).mean()
-        df["+dm_smooth"] = df["+dm"].ewm(alpha=1/period, adjust=False).mean()
-        df["-dm_smooth"] = df["-dm"].ewm(alpha=1/period, adjust=False).mean()
 
-        # ===== DI =====
-        df["+di"] = 100 * df["+dm_smooth"] / df["tr_smooth"]
-        df["-di"] = 100 * df["-dm_smooth"] / df["tr_smooth"]
+# ---------- vectorized kernels (whole history in one pass) ----------
 
-        # ===== DX =====
-        df["dx"] = 100 * abs(df["+di"] - df["-di"]) / (df["+di"] + df["-di"])
+# Moving Average over every candle (NaN until the window is full)
+def ma_array(values, period):
+    values = np.asarray(values, dtype=float)
+    ma = np.full(len(values), np.nan)
+    if len(values) < period:
+        return ma
 
-        # ===== ADX =====
-        df["adx"] = df["dx"].ewm(alpha=1/period, adjust=False).mean()
+    csum = np.cumsum(np.r_[0.0, values])
+    ma[period - 1:] = (csum[period:] - csum[:-period]) / period
 
-        return df["adx"].tolist()
+    # same rounding as Indicator.get_MA
+    return np.round(ma, 2)
 
-    # get average volume
-    def get_avg_volume_last(self, volume_prices, window=15):
-        """
-        Calculate average volume of last N candles
-        volume_prices : list of volumes (e.g. last 200 volumes)
-        window        : number of last candles (default 15)
-        """
-        if len(volume_prices) < window:
-            return sum(volume_prices) / len(volume_prices)
 
-        return sum(volume_prices[-window:]) / window
+# Exponential Moving Average over every candle, seeded with the first SMA like Indicator.get_EMA
+def ema_array(values, period):
+    """
+    values : prices
+    period : EMA period
+
+    note: Indicator.get_EMA rounds every step to 2 decimals, this one doesn't,
+    so values can differ by a few cents.
+    """
+    values = np.asarray(values, dtype=float)
+    ema = np.full(len(values), np.nan)
+    if len(values) < period:
+        return ema
+
+    import pandas as pd
+
+    seed = values[:period].mean()
+    series = pd.Series(np.r_[seed, values[period:]])
+    ema[period - 1:] = series.ewm(alpha=2 / (period + 1), adjust=False).mean().to_numpy()
+    return ema
+
+
+# ADX over every candle without python loops (same math as Indicator.get_ADX)
+def adx_array(high, low, close, period=14):
+    import pandas as pd
+
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+    n = len(close)
+    if n == 0:
+        return np.array([], dtype=float)
+
+    tr = np.full(n, np.nan)
+    plus_dm = np.full(n, np.nan)
+    minus_dm = np.full(n, np.nan)
+
+    prev_close = close[:-1]
+    tr[1:] = np.maximum.reduce([
+        high[1:] - low[1:],
+        np.abs(high[1:] - prev_close),
+        np.abs(low[1:] - prev_close)
+    ])
+
+    up_move = high[1:] - high[:-1]
+    down_move = low[:-1] - low[1:]
+    plus_dm[1:] = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+    minus_dm[1:] = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+
+    # ===== Wilder smoothing =====
+    alpha = 1 / period
+    tr_smooth = pd.Series(tr).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    plus_smooth = pd.Series(plus_dm).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    minus_smooth = pd.Series(minus_dm).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        plus_di = 100 * plus_smooth / tr_smooth
+        minus_di = 100 * minus_smooth / tr_smooth
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+
+    return pd.Series(dx).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+
+# average volume of the last `window` candles for every candle (like get_avg_volume_last on each prefix)
+def rolling_avg_volume(volume_prices, window=15):
+    volumes = np.asarray(volume_prices, dtype=float)
+    n = len(volumes)
+    csum = np.cumsum(np.r_[0.0, volumes])
+
+    counts = np.minimum(np.arange(1, n + 1), window)
+    ends = np.arange(1, n + 1)
+    return (csum[ends] - csum[ends - counts]) / counts
+
+
+# True Range of every candle (the first one has no previous close: high - low)
+def true_range(high, low, close):
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+    tr = high - low
+    if len(close) > 1:
+        prev_close = close[:-1]
+        tr[1:] = np.maximum.reduce([tr[1:], np.abs(high[1:] - prev_close), np.abs(low[1:] - prev_close)])
+    return tr
+
+
+# Wilder smoothing seeded with the mean of the first `period` values (NaN before)
+def _wilder(values, period):
+    import pandas as pd
+
+    out = np.full(len(values), np.nan)
+    if len(values) < period:
+        return out
+    seed = values[:period].mean()
+    series = pd.Series(np.r_[seed, values[period:]])
+    out[period - 1:] = series.ewm(alpha=1 / period, adjust=False).mean().to_numpy()
+    return out
+
+
+# Average True Range over every candle (NaN for the first period - 1 candles)
+def atr_array(high, low, close, period=14):
+    return _wilder(true_range(high, low, close), period)
+
+
+# RSI over every candle (NaN until `period` price changes are known)
+def rsi_array(close, period=14):
+    close = np.asarray(close, dtype=float)
+    rsi = np.full(len(close), np.nan)
+    if len(close) <= period:
+        return rsi
+
+    change = np.diff(close)
+    gain = _wilder(np.maximum(change, 0.0), period)
+    loss = _wilder(np.maximum(-change, 0.0), period)
+    rsi[1:] = _rsi(gain, loss)
+    return rsi
+
+
+def _rsi(gain, loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - 100 / (1 + gain / loss)
+    # no losses: 100, flat: 50
+    rsi = np.where(loss == 0, np.where(gain == 0, 50.0, 100.0), rsi)
+    return np.where(np.isnan(gain), np.nan, rsi)
+
+
+# Bollinger bands over every candle: SMA +- k population std (NaN until the window is full)
+def bollinger_array(close, period=20, k=2.0):
+    close = np.asarray(close, dtype=float)
+    middle = np.full(len(close), np.nan)
+    std = np.full(len(close), np.nan)
+    if len(close) >= period:
+        windows = sliding_window_view(close, period)
+        middle[period - 1:] = windows.mean(axis=1)
+        std[period - 1:] = windows.std(axis=1)
+    return middle, middle + k * std, middle - k * std
+
+
+# VWAP of the typical price, reset at every session start (one running VWAP without open_times)
+def vwap_array(high, low, close, volume, open_times=None, session_ms=24 * 60 * 60 * 1000):
+    typical = (np.asarray(high, dtype=float) + np.asarray(low, dtype=float) + np.asarray(close, dtype=float)) / 3
+    volume = np.asarray(volume, dtype=float)
+    if len(typical) == 0:
+        return typical
+
+    pv = np.cumsum(typical * volume)
+    vol = np.cumsum(volume)
+    if open_times is not None:
+        session = np.asarray(open_times, dtype=np.int64) // session_ms
+        starts = np.flatnonzero(np.r_[True, session[1:] != session[:-1]])
+        # index of the first candle of each candle's session
+        first = starts[np.searchsorted(starts, np.arange(len(session)), side="right") - 1]
+        pv = pv - np.r_[0.0, pv][first]
+        vol = vol - np.r_[0.0, vol][first]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # no volume yet in the session: the typical price
+        return np.where(vol > 0, pv / vol, typical)
+
+
+# On Balance Volume over every candle (starts at 0)
+def obv_array(close, volume):
+    close = np.asarray(close, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+    obv = np.zeros(len(close))
+    if len(close) > 1:
+        obv[1:] = np.cumsum(np.sign(np.diff(close)) * volume[1:])
+    return obv
+
+
+# Donchian channel over every candle: highest high / lowest low of the last `period` candles
+def donchian_array(high, low, period=20):
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    upper = np.full(len(high), np.nan)
+    lower = np.full(len(low), np.nan)
+    if len(high) >= period:
+        upper[period - 1:] = sliding_window_view(high, period).max(axis=1)
+        lower[period - 1:] = sliding_window_view(low, period).min(axis=1)
+    return upper, (upper + lower) / 2, lower
+
+
+# ---------- streaming kernels (one closed candle at a time, O(1) per update) ----------
+# update() returns the value of the new candle, the same number the *_array
+# kernel gives at that index (NaN while warming up). Seed with the history once
+# (a loop of update() calls), then one update() per tick.
+
+class WilderAverage:
+    def __init__(self, period):
+        self.period = period
+        self.count = 0
+        self.total = 0.0
+        self.value = np.nan
+
+    def update(self, x):
+        self.count += 1
+        if self.count < self.period:
+            self.total += x
+        elif self.count == self.period:
+            self.value = (self.total + x) / self.period
+        else:
+            self.value += (x - self.value) / self.period
+        return self.value
+
+
+class StreamingATR:
+    def __init__(self, period=14):
+        self.average = WilderAverage(period)
+        self.prev_close = None
+        self.value = np.nan
+
+    def update(self, high, low, close):
+        tr = high - low
+        if self.prev_close is not None:
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        self.value = self.average.update(tr)
+        return self.value
+
+
+class StreamingRSI:
+    def __init__(self, period=14):
+        self.gain = WilderAverage(period)
+        self.loss = WilderAverage(period)
+        self.prev_close = None
+        self.value = np.nan
+
+    def update(self, close):
+        if self.prev_close is not None:
+            change = close - self.prev_close
+            gain = self.gain.update(max(change, 0.0))
+            loss = self.loss.update(max(-change, 0.0))
+            if gain == gain:
+                if loss == 0:
+                    self.value = 50.0 if gain == 0 else 100.0
+                else:
+                    self.value = 100 - 100 / (1 + gain / loss)
+        self.prev_close = close
+        return self.value
+
+
+class StreamingBollinger:
+    """
+    running sum / sum of squares of the window, taken around the first price
+    (keeps the variance exact for prices far from 0)
+    """
+
+    def __init__(self, period=20, k=2.0):
+        self.period = period
+        self.k = k
+        self.window = deque()
+        self.ref = None
+        self.total = 0.0
+        self.squares = 0.0
+        self.value = (np.nan, np.nan, np.nan)
+
+    def update(self, close):
+        if self.ref is None:
+            self.ref = close
+        x = close - self.ref
+        self.window.append(x)
+        self.total += x
+        self.squares += x * x
+        if len(self.window) > self.period:
+            old = self.window.popleft()
+            self.total -= old
+            self.squares -= old * old
+        if len(self.window) == self.period:
+            mean = self.total / self.period
+            std = max(self.squares / self.period - mean * mean, 0.0) ** 0.5
+            middle = self.ref + mean
+            self.value = (middle, middle + self.k * std, middle - self.k * std)
+        return self.value
+
+
+class StreamingVWAP:
+    def __init__(self, session_ms=24 * 60 * 60 * 1000):
+        self.session_ms = session_ms
+        self.session = None
+        self.pv = 0.0
+        self.volume = 0.0
+        self.value = np.nan
+
+    def update(self, high, low, close, volume, open_time=None):
+        if open_time is not None:
+            session = int(open_time) // self.session_ms
+            if session != self.session:
+                self.session = session
+                self.pv = 0.0
+                self.volume = 0.0
+        typical = (high + low + close) / 3
+        self.pv += typical * volume
+        self.volume += volume
+        self.value = self.pv / self.volume if self.volume > 0 else typical
+        return self.value
+
+
+class StreamingOBV:
+    def __init__(self):
+        self.prev_close = None
+        self.value = 0.0
+
+    def update(self, close, volume):
+        if self.prev_close is not None:
+            if close > self.prev_close:
+                self.value += volume
+            elif close < self.prev_close:
+                self.value -= volume
+        self.prev_close = close
+        return self.value
+
+
+class StreamingDonchian:
+    """
+    monotonic deques of (index, price): the window max / min is always at the
+    front, every candle is pushed and popped once (amortized O(1))
+    """
+
+    def __init__(self, period=20):
+        self.period = period
+        self.count = 0
+        self.highs = deque()
+        self.lows = deque()
+        self.value = (np.nan, np.nan, np.nan)
+
+    def update(self, high, low):
+        i = self.count
+        self.count += 1
+        while self.highs and self.highs[-1][1] <= high:
+            self.highs.pop()
+        self.highs.append((i, high))
+        while self.lows and self.lows[-1][1] >= low:
+            self.lows.pop()
+        self.lows.append((i, low))
+        if self.highs[0][0] <= i - self.period:
+            self.highs.popleft()
+        if self.lows[0][0] <= i - self.period:
+            self.lows.popleft()
+        if self.count >= self.period:
+            upper = self.highs[0][1]
+            lower = self.lows[0][1]
+            self.value = (upper, (upper + lower) / 2, lower)
+        return self.value
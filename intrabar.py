@@ -0,0 +1,58 @@
+import numpy as np
+
+
+# first bar in [start, end) with low <= below or high >= above (None = not checked)
+def first_touch(highs, lows, start, end, below=None, above=None, chunk=1024):
+    """
+    Searched in chunks that double in size: a stop hit a few minutes after
+    the entry doesn't scan the whole trade, a trade of months is still only
+    a handful of numpy calls.
+
+    returns bar index or None
+    """
+    pos = start
+    while pos < end:
+        stop = min(end, pos + chunk)
+        hit = np.zeros(stop - pos, dtype=bool)
+        if below is not None:
+            hit |= lows[pos:stop] <= below
+        if above is not None:
+            hit |= highs[pos:stop] >= above
+        k = int(np.argmax(hit))
+        if hit[k]:
+            return pos + k
+        pos = stop
+        chunk *= 2
+    return None
+
+
+class SubBars:
+    """
+    Lower timeframe bars (e.g. 1m) under the candles the strategy trades on.
+
+    sub_candles : dict of arrays (candles.CANDLE_FIELDS), None = the candles themselves
+    close_times : close times of the traded candles
+    """
+
+    def __init__(self, sub_candles, close_times):
+        self.open_times = np.asarray(sub_candles["open_times"], dtype=np.int64)
+        self.close_times = np.asarray(sub_candles["close_times"], dtype=np.int64)
+        self.opens = np.asarray(sub_candles["open_prices"], dtype=float)
+        self.highs = np.asarray(sub_candles["high_prices"], dtype=float)
+        self.lows = np.asarray(sub_candles["low_prices"], dtype=float)
+        self.candle_close_times = np.asarray(close_times, dtype=np.int64)
+
+    # first sub bar after candle i closed
+    def start_of(self, i):
+        return int(np.searchsorted(self.open_times, self.candle_close_times[i], side="right"))
+
+    # sub bars up to the close of candle i
+    def end_of(self, i):
+        return int(np.searchsorted(self.close_times, self.candle_close_times[i], side="right"))
+
+    # candle that sub bar j belongs to
+    def candle_of(self, j):
+        return int(np.searchsorted(self.candle_close_times, self.close_times[j], side="left"))
+
+    def first_touch(self, after_candle, through_candle, below=None, above=None):
+        return first_touch(self.highs, self.lows, self.start_of(after_candle), self.end_of(through_candle), below, above)
@@ -0,0 +1,201 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from candles import close_months
+
+# same values as the settings in get_info.py
+DEFAULT_RULES = {
+    "balance": 1000,
+    "trade_amount_percent": 0.5,
+    "monthly_close_filter": True,
+    "monthly_profit_percent_stop_trade": 8,
+    "monthly_compound": 3,
+}
+
+CHUNK_PATHS = 4096  # paths simulated together (memory: CHUNK_PATHS * trades floats)
+
+
+# ---------- LEDGERS ----------
+
+def _ledger(profits, margins, leverages, months, span_days):
+    """
+    returns : net profit per $ of position value (profit / (margin * leverage)),
+              so a trade can be replayed with another margin / leverage
+    months  : month number of each trade (0 = month of the first trade)
+    """
+    margins = np.asarray(margins, dtype=float)
+    leverages = np.asarray(leverages, dtype=float)
+    _, months = np.unique(np.asarray(months), return_inverse=True)
+    return {
+        "returns": np.asarray(profits, dtype=float) / (margins * leverages),
+        "months": months.astype(np.int64),
+        "span_days": span_days,
+    }
+
+
+def ledger_from_backtest(result, candles):
+    trades = [t for t in result["trade_list"] if t["close_index"] is not None]
+    close_times = candles["close_times"][[t["close_index"] for t in trades]]
+    open_time = candles["close_times"][trades[0]["open_index"]] if trades else 0
+    span_days = (close_times[-1] - open_time) / 86_400_000 if trades else 0.0
+    return _ledger([t["profit"] for t in trades], [t["margin"] for t in trades],
+                   [t["leverage"] for t in trades], close_months(close_times), span_days)
+
+
+# closed orders of the live bot (Database.get_closed_orders)
+def ledger_from_orders(orders):
+    orders = [o for o in orders if o["margin"] and o["leverage"] and o["close_time"]]
+    span_days = 0.0
+    if orders:
+        first = datetime.fromisoformat(orders[0]["open_time"].split("+")[0].strip())
+        last = datetime.fromisoformat(orders[-1]["close_time"].split("+")[0].strip())
+        span_days = (last - first).total_seconds() / 86400
+    return _ledger([o["profit"] or 0 for o in orders], [o["margin"] for o in orders],
+                   [o["leverage"] for o in orders], [o["close_time"][:7] for o in orders], span_days)
+
+
+# ---------- SIMULATION ----------
+
+def sample_returns(returns, paths, method, rng):
+    """
+    bootstrap : trades drawn with replacement (new sequences and mixes)
+    shuffle   : the same trades in a random order (only the path changes)
+    """
+    if method == "bootstrap":
+        return returns[rng.integers(0, len(returns), size=(paths, len(returns)))]
+    if method == "shuffle":
+        return rng.permuted(np.broadcast_to(returns, (paths, len(returns))), axis=1)
+    raise ValueError(f"unknown method: {method}")
+
+
+def simulate_paths(samples, months, rules, ruin_percent=50):
+    """
+    Replay sampled trade sequences through the TradeManager rules, all paths at once
+
+    samples : (paths, trades) returns per $ of position value
+    months  : month number of each trade position (a stopped month skips its remaining trades)
+
+    margin / leverage / save money / monthly stop follow TradeManager.open_* / close_*:
+    margin = trade_amount_percent of the tactical balance (of the balance below 50%),
+    leverage 3 when the balance is <= 90% of the tactical balance, else 5.
+    """
+    paths, trades = samples.shape
+    start = float(rules["balance"])
+    pct = rules["trade_amount_percent"]
+
+    balance = np.full(paths, start)
+    tactical = np.full(paths, start)
+    saved = np.zeros(paths)
+    peak = np.full(paths, start)
+    max_drawdown = np.zeros(paths)
+    underwater = np.zeros(paths, dtype=np.int64)
+    longest_underwater = np.zeros(paths, dtype=np.int64)
+    ruined = np.zeros(paths, dtype=bool)
+    trading = np.ones(paths, dtype=bool)
+    n_months = int(months.max()) + 1 if trades else 0
+    month_hits = np.zeros((paths, n_months), dtype=bool)
+    ruin_level = start * (1 - ruin_percent / 100)
+
+    for k in range(trades):
+        if k > 0 and months[k] != months[k - 1]:
+            trading[:] = True
+        active = trading & ~ruined
+
+        margin = np.where(balance >= 50 / 100 * tactical, pct * tactical, balance * pct)
+        leverage = np.where(balance <= tactical * 90 / 100, 3.0, 5.0)
+        balance = balance + np.where(active, samples[:, k] * margin * leverage, 0.0)
+
+        # ---- save money ----
+        refill = active & (balance < tactical * 75 / 100) & (saved >= tactical * 25 / 100)
+        balance = balance + np.where(refill, tactical * 25 / 100, 0.0)
+        saved = saved - np.where(refill, tactical * 25 / 100, 0.0)
+
+        # ---- monthly stop ----
+        if rules["monthly_close_filter"]:
+            hit = active & ((balance * 100) / tactical - 100 >= rules["monthly_profit_percent_stop_trade"])
+            tactical = np.where(hit, tactical + tactical * rules["monthly_compound"] / 100, tactical)
+            saved = saved + np.where(hit, balance - tactical, 0.0)
+            balance = np.where(hit, tactical, balance)
+            trading &= ~hit
+            month_hits[:, months[k]] |= hit
+
+        equity = balance + saved
+        np.maximum(peak, equity, out=peak)
+        np.minimum(max_drawdown, (equity - peak) / peak * 100, out=max_drawdown)
+        underwater = np.where(equity < peak, underwater + 1, 0)
+        np.maximum(longest_underwater, underwater, out=longest_underwater)
+        ruined |= equity <= ruin_level
+
+    final_equity = balance + saved
+    return {
+        "final_equity": final_equity,
+        "return_percent": (final_equity / start - 1) * 100,
+        "max_drawdown": max_drawdown,
+        "longest_underwater": longest_underwater,
+        "ends_underwater": underwater > 0,
+        "ruined": ruined,
+        "month_hits": month_hits.sum(axis=1),
+        "months": n_months,
+    }
+
+
+def _run_chunk(task):
+    returns, months, paths, method, seed, rules, ruin_percent = task
+    rng = np.random.default_rng(seed)
+    return simulate_paths(sample_returns(returns, paths, method, rng), months, rules, ruin_percent)
+
+
+def monte_carlo(ledger, paths=10_000, method="bootstrap", rules=None, ruin_percent=50, seed=None, workers=1):
+    """
+    Distribution of outcomes of the trade ledger over `paths` resampled sequences
+
+    ledger       : ledger_from_backtest() / ledger_from_orders()
+    rules        : overrides for DEFAULT_RULES
+    ruin_percent : a path is ruined once it lost this % of the start balance
+    workers      : processes (None = all cores), chunks of CHUNK_PATHS paths each
+
+    returns dict of arrays (one value per path) + months, span_days, trades
+    """
+    r = dict(DEFAULT_RULES)
+    r.update(rules or {})
+    returns = ledger["returns"]
+    months = ledger["months"]
+
+    sizes = [min(CHUNK_PATHS, paths - done) for done in range(0, paths, CHUNK_PATHS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(returns, months, size, method, s, r, ruin_percent) for size, s in zip(sizes, seeds)]
+
+    workers = os.cpu_count() if workers is None else workers
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            chunks = list(pool.map(_run_chunk, tasks))
+    else:
+        chunks = [_run_chunk(task) for task in tasks]
+
+    result = {name: np.concatenate([c[name] for c in chunks])
+              for name in ("final_equity", "return_percent", "max_drawdown", "longest_underwater",
+                           "ends_underwater", "ruined", "month_hits")}
+    result["months"] = chunks[0]["months"] if chunks else 0
+    result["span_days"] = ledger["span_days"]
+    result["trades"] = len(returns)
+    return result
+
+
+def summary(result, percentiles=(5, 50, 95)):
+    days_per_trade = result["span_days"] / result["trades"] if result["trades"] else 0.0
+    months = result["months"]
+    return {
+        "paths": len(result["final_equity"]),
+        "return_percent": {q: float(np.percentile(result["return_percent"], q)) for q in percentiles},
+        "max_drawdown": {q: float(np.percentile(result["max_drawdown"], 100 - q)) for q in percentiles},
+        "longest_underwater_days": {q: float(np.percentile(result["longest_underwater"], q) * days_per_trade)
+                                    for q in percentiles},
+        "loss_probability": float((result["return_percent"] < 0).mean()),
+        "ruin_probability": float(result["ruined"].mean()),
+        "ends_underwater": float(result["ends_underwater"].mean()),
+        "monthly_target_hit_rate": float(result["month_hits"].sum() / (months * len(result["month_hits"])))
+                                   if months else 0.0,
+    }
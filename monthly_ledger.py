@@ -0,0 +1,108 @@
+from datetime import datetime, timezone
+
+
+# "2024-03-31 23:59:59.999" -> "2024-03"
+def month_of(time_str):
+    return time_str[:7]
+
+
+class MonthlyLedger:
+    """
+    Month by month state of the monthly close filter, kept in the
+    monthly_ledger table and updated by TradeManager on every close.
+
+    The current month's row is held in memory, so the filter check is a
+    string compare and a report is one small SELECT (no scan of orders).
+    """
+
+    def __init__(self, db, clock=None):
+        self.db = db
+        self.clock = clock
+        self.row = db.get_last_month()
+
+    @property
+    def month(self):
+        return None if self.row is None else self.row["month"]
+
+    @property
+    def trade_power(self):
+        return True if self.row is None else bool(self.row["trade_power"])
+
+    # did a month start since trading was stopped? (O(1), current row only)
+    def month_started(self, close_time, previous_close_time=None):
+        month = month_of(close_time)
+        if self.row is None:
+            # nothing stored yet: fall back to the month change of the last two candles
+            return previous_close_time is not None and month != month_of(previous_close_time)
+        return month > self.row["month"]
+
+    def _new_row(self, month, tactical_balance, balance, save_money):
+        return {
+            "month": month,
+            "start_tactical_balance": tactical_balance,
+            "tactical_balance": tactical_balance,
+            "balance": balance,
+            "profit": 0.0,
+            "profit_percent": 0.0,
+            "trades": 0,
+            "wins": 0,
+            "save_money": save_money,
+            "saved_in": 0.0,
+            "saved_out": 0.0,
+            "compounded": 0,
+            "trade_power": 1,
+            "updated_at": None,
+        }
+
+    def _save(self):
+        now = self.clock.now() if self.clock is not None else datetime.now(timezone.utc)
+        self.row["updated_at"] = now.isoformat(timespec="seconds")
+        self.db.upsert_month(self.row)
+
+    # monthly close filter turned trading back on
+    def start_month(self, close_time, tactical_balance, balance, save_money):
+        self.row = self._new_row(month_of(close_time), tactical_balance, balance, save_money)
+        self._save()
+
+    def record_close(self, close_time, profit, profit_percent_per_month, balance, save_money,
+                     tactical_before, tactical_after, saved_in, saved_out, trade_power):
+        """
+        One closed trade (called from TradeManager.close_long / close_short)
+
+        tactical_before / after : tactical balance before and after the monthly compounding
+        saved_in / saved_out    : moved to save_money (month target) / back from it (refill)
+        """
+        month = month_of(close_time)
+        if self.row is None or self.row["month"] != month:
+            self.row = self._new_row(month, tactical_before, balance - profit, save_money - saved_in + saved_out)
+
+        row = self.row
+        row["trades"] += 1
+        row["wins"] += 1 if profit > 0 else 0
+        row["profit"] += profit
+        row["profit_percent"] = profit_percent_per_month
+        row["balance"] = balance
+        row["tactical_balance"] = tactical_after
+        row["save_money"] = save_money
+        row["saved_in"] += saved_in
+        row["saved_out"] += saved_out
+        row["compounded"] = int(row["compounded"] or tactical_after != tactical_before)
+        row["trade_power"] = int(trade_power)
+        self._save()
+
+    # state to continue with after a restart without checkpoint
+    # (no fee-free balance is kept: balance_without_fee starts again from the balance)
+    def restore_fields(self):
+        if self.row is None:
+            return {}
+        return {
+            "balance": self.row["balance"],
+            "balance_without_fee": self.row["balance"],
+            "tactical_balance": self.row["tactical_balance"],
+            "save_money": self.row["save_money"],
+            "trade_power": bool(self.row["trade_power"]),
+            "profit_percent_per_month": self.row["profit_percent"],
+        }
+
+    def report(self):
+        return self.db.get_monthly_ledger()
@@ -0,0 +1,112 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SideEffects:
+    """
+    Runs the parts of a tick nobody waits for (candle archive, telegram,
+    console output, metrics) on worker threads, so the decision path only
+    pays for a queue put.
+
+    workers=1 (default) keeps them in submit order, so telegram messages
+    can't overtake each other. inline=True runs everything right away
+    (replays / debugging).
+    """
+
+    def __init__(self, workers=1, inline=False):
+        self.inline = inline
+        self.executor = None if inline else ThreadPoolExecutor(max_workers=workers, thread_name_prefix="side-effect")
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.errors = 0
+
+    def submit(self, name, fn, *args, **kwargs):
+        if self.inline:
+            self._run(name, fn, args, kwargs)
+            return None
+
+        future = self.executor.submit(self._run, name, fn, args, kwargs)
+        with self.lock:
+            self.pending.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self.lock:
+            self.pending.discard(future)
+
+    def _run(self, name, fn, args, kwargs):
+        try:
+            fn(*args, **kwargs)
+        except Exception as e:
+            self.errors += 1
+            print(f"side effect '{name}' failed:", e)
+
+    # wait until everything submitted so far is done
+    def flush(self, timeout=None):
+        with self.lock:
+            futures = list(self.pending)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for future in futures:
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            try:
+                future.result(timeout=remaining)
+            except Exception:
+                pass
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+
+
+class TickTimer:
+    """
+    Stage timings of one tick.
+
+    mark(stage) closes a stage (time since the previous mark), end_critical_path()
+    is called once the order is persisted. A tick without an order has its
+    critical path end at the last mark.
+    """
+
+    def __init__(self, clock=time.time):
+        # wall clock of candle_to_order_ms (clock.SimulatedClock.time in soak tests)
+        self.clock = clock
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.stages = {}
+        self.critical_end = None
+        self.candle_to_order_ms = None
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self.last)
+        self.last = now
+
+    def end_critical_path(self, candle_close_ms=None):
+        """
+        candle_close_ms : close time of the candle that made the decision (ms),
+                          gives the wall clock latency candle close -> persisted order
+        """
+        self.critical_end = time.perf_counter()
+        if candle_close_ms is not None:
+            self.candle_to_order_ms = self.clock() * 1000 - candle_close_ms
+
+    def summary(self):
+        end = time.perf_counter()
+        critical_end = self.critical_end if self.critical_end is not None else self.last
+        return {
+            "stages_ms": {stage: seconds * 1000 for stage, seconds in self.stages.items()},
+            "critical_path_ms": (critical_end - self.start) * 1000,
+            "total_ms": (end - self.start) * 1000,
+            "order": self.critical_end is not None,
+            "candle_to_order_ms": self.candle_to_order_ms,
+        }
+
+
+def format_tick_timings(timings):
+    stages = " | ".join(f"{stage} {ms:.1f}" for stage, ms in timings["stages_ms"].items())
+    line = f"⏱ tick: critical path {timings['critical_path_ms']:.1f} ms ({stages})"
+    if timings["candle_to_order_ms"] is not None:
+        line += f" | candle close → order {timings['candle_to_order_ms']:.0f} ms"
+    return line
@@ -0,0 +1,243 @@
+import numpy as np
+
+LONG = 1
+SHORT = -1
+
+
+class Portfolio:
+    """
+    Positions of many accounts on many symbols as numpy arrays (one row per
+    position slot), with the same math as TradeManager: margin * leverage
+    sizing, Toobit fees (entry + exit notional * fee_rate), big pnl cooldown,
+    balance / drawdown per account.
+
+    Every call works on all the rows it is given at once, so marking or
+    closing hundreds of positions costs about the same as one.
+
+    accounts / symbols are registered by name and used as integer ids.
+    """
+
+    def __init__(self, fee_rate=0.0005, cooldown_after_big_pnl=4 * 46, capacity=256):
+        self.fee_rate = fee_rate
+        self.cooldown_after_big_pnl = cooldown_after_big_pnl
+
+        self.account_ids = {}
+        self.symbol_ids = {}
+
+        # ---- per account ----
+        self.balance = np.zeros(0)
+        self.tactical_balance = np.zeros(0)
+        self.fees_total = np.zeros(0)
+        self.realized = np.zeros(0)
+        self.equity_peak = np.zeros(0)
+        self.max_drawdown = np.zeros(0)
+        self.cooldown = np.zeros(0, dtype=np.int64)
+
+        # ---- per position slot ----
+        self.open = np.zeros(capacity, dtype=bool)
+        self.account = np.zeros(capacity, dtype=np.int64)
+        self.symbol = np.zeros(capacity, dtype=np.int64)
+        self.side = np.zeros(capacity, dtype=np.int8)
+        self.entry_price = np.zeros(capacity)
+        self.size = np.zeros(capacity)
+        self.margin = np.zeros(capacity)
+        self.leverage = np.zeros(capacity)
+        self.open_time = np.zeros(capacity, dtype=np.int64)
+
+    # ---------- IDS ----------
+
+    def add_account(self, name, balance=1000):
+        if name in self.account_ids:
+            return self.account_ids[name]
+        self.account_ids[name] = len(self.account_ids)
+        self.balance = np.append(self.balance, float(balance))
+        self.tactical_balance = np.append(self.tactical_balance, float(balance))
+        self.fees_total = np.append(self.fees_total, 0.0)
+        self.realized = np.append(self.realized, 0.0)
+        self.equity_peak = np.append(self.equity_peak, float(balance))
+        self.max_drawdown = np.append(self.max_drawdown, 0.0)
+        self.cooldown = np.append(self.cooldown, 0)
+        return self.account_ids[name]
+
+    def symbol_id(self, symbol):
+        if symbol not in self.symbol_ids:
+            self.symbol_ids[symbol] = len(self.symbol_ids)
+        return self.symbol_ids[symbol]
+
+    @property
+    def open_slots(self):
+        return np.flatnonzero(self.open)
+
+    def _free_slots(self, count):
+        free = np.flatnonzero(~self.open)
+        if len(free) < count:
+            grow = max(count - len(free), len(self.open))
+            for name in ("open", "account", "symbol", "side", "entry_price", "size", "margin", "leverage", "open_time"):
+                values = getattr(self, name)
+                setattr(self, name, np.concatenate([values, np.zeros(grow, dtype=values.dtype)]))
+            free = np.flatnonzero(~self.open)
+        return free[:count]
+
+    # ---------- OPEN ----------
+
+    def sizing(self, accounts, trade_amount_percent, total_balance=None):
+        """
+        TradeManager.open_long/open_short margin + leverage rule for each row
+        total_balance : balance + margin in open positions per row (default: account_equity without pnl)
+
+        returns (margins, leverages)
+        """
+        accounts = np.asarray(accounts, dtype=np.int64)
+        balance = self.balance[accounts]
+        tactical = self.tactical_balance[accounts]
+        if total_balance is None:
+            total_balance = (self.balance + self.locked_margin())[accounts]
+
+        margins = np.where(balance >= 50 / 100 * tactical, trade_amount_percent * tactical, balance * trade_amount_percent)
+        leverages = np.where(total_balance <= tactical * 90 / 100, 3.0, 5.0)
+        return margins, leverages
+
+    def open_positions(self, accounts, symbols, sides, prices, margins, leverages, times=0):
+        """
+        accounts / symbols : ids, sides : LONG / SHORT, one row per new position
+        returns the slot of each new position
+        """
+        accounts = np.asarray(accounts, dtype=np.int64)
+        count = len(accounts)
+        slots = self._free_slots(count)
+        prices = np.broadcast_to(np.asarray(prices, dtype=float), (count,))
+        margins = np.broadcast_to(np.asarray(margins, dtype=float), (count,))
+        leverages = np.broadcast_to(np.asarray(leverages, dtype=float), (count,))
+
+        self.open[slots] = True
+        self.account[slots] = accounts
+        self.symbol[slots] = symbols
+        self.side[slots] = sides
+        self.entry_price[slots] = prices
+        self.size[slots] = margins * leverages / prices
+        self.margin[slots] = margins
+        self.leverage[slots] = leverages
+        self.open_time[slots] = times
+
+        # several rows can belong to the same account
+        np.subtract.at(self.balance, accounts, margins)
+        return slots
+
+    # ---------- MARK TO MARKET ----------
+
+    # prices : one price per symbol id (or one number for every symbol) -> price of each slot
+    def _prices(self, slots, prices):
+        prices = np.asarray(prices, dtype=float)
+        if prices.ndim == 0:
+            return np.full(len(slots), float(prices))
+        return prices[self.symbol[slots]]
+
+    def unrealized(self, prices, slots=None):
+        """
+        prices : one price per symbol id
+        returns dict of arrays per open slot: slots, pnl, fee (entry + exit at this price), pnl_percent
+        """
+        slots = self.open_slots if slots is None else np.asarray(slots, dtype=np.int64)
+        price = self._prices(slots, prices)
+        entry = self.entry_price[slots]
+        size = self.size[slots]
+
+        pnl = self.side[slots] * size * (price - entry)
+        fee = (entry + price) * size * self.fee_rate
+        return {
+            "slots": slots,
+            "price": price,
+            "pnl": pnl,
+            "fee": fee,
+            "pnl_percent": pnl / self.margin[slots] * 100,
+        }
+
+    def locked_margin(self):
+        slots = self.open_slots
+        return np.bincount(self.account[slots], weights=self.margin[slots], minlength=len(self.balance))
+
+    def account_equity(self, prices):
+        """balance + margin + unrealized pnl - fees to close, per account"""
+        marks = self.unrealized(prices)
+        slots = marks["slots"]
+        value = self.margin[slots] + marks["pnl"] - marks["fee"]
+        return self.balance + np.bincount(self.account[slots], weights=value, minlength=len(self.balance))
+
+    def mark(self, prices):
+        """Update the equity peak / max drawdown of every account, returns account_equity"""
+        equity = self.account_equity(prices)
+        np.maximum(self.equity_peak, equity, out=self.equity_peak)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            drawdown = np.where(self.equity_peak > 0, (equity - self.equity_peak) / self.equity_peak * 100, 0.0)
+        np.minimum(self.max_drawdown, drawdown, out=self.max_drawdown)
+        return equity
+
+    # ---------- CLOSE ----------
+
+    def close_positions(self, slots, prices, times=0):
+        """
+        Close the given slots at prices (one per symbol id)
+        a slot given twice (or already closed) is closed once
+
+        returns dict of arrays per closed slot: slots, account, symbol, side, entry_price,
+        close_price, pnl, fee, profit, pnl_percent, open_time, close_time
+        """
+        slots = np.unique(np.asarray(slots, dtype=np.int64))
+        slots = slots[self.open[slots]]
+        marks = self.unrealized(prices, slots)
+        accounts = self.account[slots]
+        margin = self.margin[slots]
+        profit = marks["pnl"] - marks["fee"]
+
+        n_accounts = len(self.balance)
+        self.balance += np.bincount(accounts, weights=margin + profit, minlength=n_accounts)
+        self.fees_total += np.bincount(accounts, weights=marks["fee"], minlength=n_accounts)
+        self.realized += np.bincount(accounts, weights=profit, minlength=n_accounts)
+
+        # ---- COOLDOWN AFTER BIG PROFIT (pnl % without leverage >= 4) ----
+        big = marks["pnl_percent"] / self.leverage[slots] >= 4
+        self.cooldown[accounts[big]] = self.cooldown_after_big_pnl
+
+        self.open[slots] = False
+        return {
+            "slots": slots,
+            "account": accounts,
+            "symbol": self.symbol[slots],
+            "side": self.side[slots].copy(),
+            "entry_price": self.entry_price[slots],
+            "close_price": marks["price"],
+            "pnl": marks["pnl"],
+            "fee": marks["fee"],
+            "profit": profit,
+            "pnl_percent": marks["pnl_percent"],
+            "open_time": self.open_time[slots],
+            "close_time": np.broadcast_to(np.asarray(times, dtype=np.int64), (len(slots),)).copy(),
+        }
+
+    def close_where(self, mask, prices, times=0):
+        """mask : bool per open slot (same order as open_slots), e.g. from risk checks"""
+        return self.close_positions(self.open_slots[np.asarray(mask, dtype=bool)], prices, times)
+
+    # ---------- RISK ----------
+
+    def exposure(self, prices, by="account"):
+        """notional (size * price, signed by side) per account or per symbol id"""
+        slots = self.open_slots
+        notional = self.side[slots] * self.size[slots] * self._prices(slots, prices)
+        if by == "account":
+            return np.bincount(self.account[slots], weights=notional, minlength=len(self.balance))
+        return np.bincount(self.symbol[slots], weights=notional, minlength=len(self.symbol_ids))
+
+    def stop_losses(self, prices, max_loss_percent):
+        """bool per open slot: loss of the position >= max_loss_percent of its margin"""
+        return self.unrealized(prices)["pnl_percent"] <= -max_loss_percent
+
+    def liquidations(self, prices, maintenance_rate=0.005):
+        """bool per open slot: margin + pnl below the maintenance margin (maintenance_rate * notional)"""
+        marks = self.unrealized(prices)
+        slots = marks["slots"]
+        maintenance = maintenance_rate * self.size[slots] * marks["price"]
+        return self.margin[slots] + marks["pnl"] <= maintenance
+
+    def tick_cooldown(self, candles=1):
+        np.maximum(self.cooldown - candles, 0, out=self.cooldown)
@@ -0,0 +1,165 @@
+from collections import OrderedDict
+
+# numbers of a lot that shrink on a partial close
+SIZE_FIELDS = ("size", "size_no_fee", "margin", "margin_no_fee")
+
+
+class PositionBook:
+    """
+    Open lots (positions) of every (account, symbol) in memory: many lots per
+    symbol, long and short at the same time, partial closes.
+
+    Every tick only walks the open lots (lots(), mark()), never the order
+    history. With a database.Database the book writes through to its
+    positions table and load() rebuilds it after a restart (the open lots are
+    read through the (account, symbol, status) index).
+
+    lot : dict with id, account, symbol, side, entry_price, open_time, size,
+          size_no_fee, margin, margin_no_fee, leverage, order_id
+    """
+
+    def __init__(self, db=None):
+        self.db = db
+        self.open_lots = {}       # lot id -> lot
+        self.by_key = {}          # (account, symbol) -> OrderedDict(lot id -> lot), oldest first
+        self.next_id = 1          # ids when there is no database
+
+    # ---------- LOOKUP ----------
+
+    def lots(self, account, symbol, side=None):
+        lots = self.by_key.get((account, symbol))
+        if not lots:
+            return []
+        return [lot for lot in lots.values() if side is None or lot["side"] == side]
+
+    def count(self, account, symbol, side=None):
+        return len(self.lots(account, symbol, side))
+
+    def get(self, lot_id):
+        return self.open_lots[lot_id]
+
+    def locked_margin(self, account=None):
+        return sum(lot["margin"] for lot in self.open_lots.values() if account is None or lot["account"] == account)
+
+    # net size per (account, symbol): long lots - short lots
+    def net_size(self, account, symbol):
+        return sum(lot["size"] if lot["side"] == "long" else -lot["size"] for lot in self.lots(account, symbol))
+
+    # ---------- OPEN / CLOSE ----------
+
+    def open(self, account, symbol, side, entry_price, open_time, size, margin, leverage,
+             size_no_fee=None, margin_no_fee=None, order_id=None):
+        lot = {
+            "id": None,
+            "account": account,
+            "symbol": symbol,
+            "side": side,
+            "entry_price": entry_price,
+            "open_time": open_time,
+            "size": size,
+            "size_no_fee": size if size_no_fee is None else size_no_fee,
+            "margin": margin,
+            "margin_no_fee": margin if margin_no_fee is None else margin_no_fee,
+            "leverage": leverage,
+            "order_id": order_id,
+        }
+        if self.db is not None:
+            lot["id"] = self.db.insert_position(lot)
+        else:
+            lot["id"] = self.next_id
+            self.next_id += 1
+        self._add(lot)
+        return lot
+
+    def part(self, lot_id, fraction=1.0):
+        """the share of a lot a close of `fraction` takes (nothing is changed)"""
+        if not 0 < fraction <= 1:
+            raise ValueError(f"fraction must be in (0, 1]: {fraction}")
+        part = dict(self.open_lots[lot_id])
+        if fraction < 1:
+            for field in SIZE_FIELDS:
+                part[field] *= fraction
+        return part
+
+    def close(self, lot_id, close_price, close_time, fraction=1.0, profit=None, profit_percent=None):
+        """
+        Close a lot, or `fraction` of it (the rest stays open with the same id)
+        returns the closed part (lot dict + close_price, close_time, profit, profit_percent)
+        """
+        lot = self.open_lots[lot_id]
+        part = self.part(lot_id, fraction)
+        part.update(close_price=close_price, close_time=close_time, profit=profit, profit_percent=profit_percent)
+
+        if fraction < 1:
+            for field in SIZE_FIELDS:
+                lot[field] -= part[field]
+            part["parent_id"] = lot_id
+            if self.db is not None:
+                self.db.update_position_size(lot_id, lot["size"], lot["size_no_fee"], lot["margin"], lot["margin_no_fee"])
+                part["id"] = self.db.insert_position(part, status="closed")
+            else:
+                part["id"] = self.next_id
+                self.next_id += 1
+        else:
+            self._remove(lot)
+            if self.db is not None:
+                self.db.close_position(lot_id, close_price, close_time, profit, profit_percent)
+        return part
+
+    def _add(self, lot):
+        self.open_lots[lot["id"]] = lot
+        self.by_key.setdefault((lot["account"], lot["symbol"]), OrderedDict())[lot["id"]] = lot
+
+    def _remove(self, lot):
+        del self.open_lots[lot["id"]]
+        key = (lot["account"], lot["symbol"])
+        del self.by_key[key][lot["id"]]
+        if not self.by_key[key]:
+            del self.by_key[key]
+
+    # ---------- MARK TO MARKET ----------
+
+    def mark(self, prices, fee_rate=0.0):
+        """
+        prices : {symbol: price}
+        returns {lot id: {"pnl", "fee" (entry + exit at this price), "pnl_percent"}} of the open lots
+        """
+        marks = {}
+        for lot_id, lot in self.open_lots.items():
+            price = prices.get(lot["symbol"])
+            if price is None:
+                continue
+            direction = 1 if lot["side"] == "long" else -1
+            pnl = direction * lot["size"] * (price - lot["entry_price"])
+            marks[lot_id] = {
+                "pnl": pnl,
+                "fee": (lot["entry_price"] + price) * lot["size"] * fee_rate,
+                "pnl_percent": pnl / lot["margin"] * 100 if lot["margin"] else 0.0,
+            }
+        return marks
+
+    def unrealized(self, account, prices, fee_rate=0.0):
+        """pnl - fees to close of every open lot of an account"""
+        marks = self.mark(prices, fee_rate)
+        return sum(m["pnl"] - m["fee"] for lot_id, m in marks.items() if self.open_lots[lot_id]["account"] == account)
+
+    # ---------- RESTORE ----------
+
+    def load(self, account=None, symbol=None):
+        """(re)build the book from the database's open positions"""
+        for lot in self.db.get_open_positions(account=account, symbol=symbol):
+            if lot["id"] in self.open_lots:
+                self._remove(self.open_lots[lot["id"]])
+            self._add(lot)
+        return self
+
+    # plain values (checkpoints)
+    def get_state(self):
+        return {"lots": [dict(lot) for lot in self.open_lots.values()], "next_id": self.next_id}
+
+    def set_state(self, state):
+        self.open_lots = {}
+        self.by_key = {}
+        for lot in sorted(state["lots"], key=lambda lot: lot["id"]):
+            self._add(dict(lot))
+        self.next_id = state["next_id"]
@@ -1,31 +1,50 @@
 import psutil
 import os
 import threading
-import time
+from collections import deque
+
+from clock import SystemClock
 
 class RamMonitor(threading.Thread):
-    def __init__(self, interval=2, warn_mb=400):
+    """
+    clock   : clock.SystemClock (default) or a SimulatedClock (soak tests)
+    verbose : print every sample
+    samples : last (clock time, process RSS MB) pairs, peak_mb the highest one
+    """
+
+    def __init__(self, interval=2, warn_mb=400, clock=None, verbose=True, history=10000):
         super().__init__(daemon=True)
         self.interval = interval
         self.warn_mb = warn_mb
+        self.clock = clock or SystemClock()
+        self.verbose = verbose
         self.process = psutil.Process(os.getpid())
+        self.samples = deque(maxlen=history)
+        self.peak_mb = 0.0
         self.running = True
 
+    def sample(self):
+        process_ram = self.process.memory_info().rss / (1024 ** 2)
+        self.samples.append((self.clock.time(), process_ram))
+        self.peak_mb = max(self.peak_mb, process_ram)
+        return process_ram
+
     def run(self):
         while self.running:
-            system_ram = psutil.virtual_memory()
-            process_ram = self.process.memory_info().rss / (1024 ** 2)
+            process_ram = self.sample()
 
-            msg = (
-                f"🖥 RAM {system_ram.percent}% | "
-                f"🐍 Bot RAM: {process_ram:.1f} MB"
-            )
+            if self.verbose:
+                system_ram = psutil.virtual_memory()
+                msg = (
+                    f"🖥 RAM {system_ram.percent}% | "
+                    f"🐍 Bot RAM: {process_ram:.1f} MB"
+                )
 
-            if process_ram > self.warn_mb:
-                msg += " ⚠️ HIGH RAM"
+                if process_ram > self.warn_mb:
+                    msg += " ⚠️ HIGH RAM"
 
-            print(msg)
-            time.sleep(self.interval)
+                print(msg)
+            self.clock.sleep(self.interval)
 
     def stop(self):
         self.running = False
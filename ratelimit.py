@@ -0,0 +1,173 @@
+import threading
+import time
+from collections import deque
+
+# binance REQUEST_WEIGHT limit is 6000 / minute per IP, keep some room for the live bot
+DEFAULT_MAX_WEIGHT = 4800
+WEIGHT_HEADER = "X-MBX-USED-WEIGHT-1M"
+
+
+# weight of GET /api/v3/klines by limit
+def klines_weight(limit):
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+# weight of GET /api/v3/depth by limit
+def depth_weight(limit):
+    if limit <= 100:
+        return 5
+    if limit <= 500:
+        return 25
+    if limit <= 1000:
+        return 50
+    return 250
+
+
+# request weight of the spot endpoints we call (path -> weight or function of the params)
+ENDPOINT_WEIGHTS = {
+    "/api/v3/klines": lambda params: klines_weight(int(params.get("limit", 500))),
+    "/api/v3/depth": lambda params: depth_weight(int(params.get("limit", 100))),
+    "/api/v3/ticker/price": lambda params: 2 if "symbol" in params else 4,
+    "/api/v3/exchangeInfo": 20,
+    "/api/v3/time": 1,
+    "/api/v3/ping": 1,
+}
+
+
+def endpoint_weight(url, params=None):
+    path = url[url.find("/api/"):] if "/api/" in url else url
+    weight = ENDPOINT_WEIGHTS.get(path, 1)
+    return weight(params or {}) if callable(weight) else weight
+
+
+class WeightLimiter:
+    """
+    Sliding one-minute window of request weight, shared by every thread.
+
+    acquire(weight) blocks until the request fits under max_weight. The
+    exchange's own count (X-MBX-USED-WEIGHT-1M) and 429/418 Retry-After
+    are fed back with observe() / backoff(), so other processes using the
+    same IP are accounted for too.
+    """
+
+    def __init__(self, max_weight=DEFAULT_MAX_WEIGHT, window=60.0, clock=time.monotonic, sleep=time.sleep):
+        self.max_weight = max_weight
+        self.window = window
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.spent = deque()        # (time, weight)
+        self.used = 0
+        self.paused_until = 0.0
+        self.waited = 0.0           # seconds spent blocked (all threads)
+
+    def _expire(self, now):
+        while self.spent and self.spent[0][0] <= now - self.window:
+            self.used -= self.spent.popleft()[1]
+
+    def acquire(self, weight=1):
+        while True:
+            with self.lock:
+                now = self.clock()
+                self._expire(now)
+                if now >= self.paused_until and (self.used + weight <= self.max_weight or not self.spent):
+                    self.spent.append((now, weight))
+                    self.used += weight
+                    return
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                else:
+                    delay = self.spent[0][0] + self.window - now
+                self.waited += max(delay, 0.0)
+            self.sleep(max(delay, 0.001))
+
+    # exchange reported more weight than we counted (other clients on the IP): book the difference
+    def observe(self, headers):
+        value = headers.get(WEIGHT_HEADER) if headers is not None else None
+        if value is None:
+            return
+        with self.lock:
+            now = self.clock()
+            self._expire(now)
+            missing = int(value) - self.used
+            if missing > 0:
+                self.spent.append((now, missing))
+                self.used += missing
+
+    def backoff(self, seconds):
+        with self.lock:
+            self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+
+# the one limiter of the process: every caller on this IP books its weight here
+def shared_limiter():
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = WeightLimiter()
+        return _shared_limiter
+
+
+# ---------- SINGLE FLIGHT ----------
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one execution: the first caller
+    runs fn(), the others wait for it and get the same result (or exception).
+    Nothing is cached, a call made after the first one finished runs again.
+
+    The shared result is the same object for every caller: don't modify it.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.shared = 0    # calls answered by another caller's request
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+
+kline_flight = SingleFlight()
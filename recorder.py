@@ -0,0 +1,121 @@
+import json
+import struct
+import zlib
+from urllib.parse import urlparse
+
+# frame kinds of the tick log
+SESSION = 1     # bot started: state snapshot, candle buffer, open order, config
+TICK = 2        # tick started: wall clock, config hash
+HTTP = 3        # raw response body of a request made during the tick
+DECISIONS = 4   # orders opened / closed by the tick
+
+FRAME_HEADER = struct.Struct("<BI")     # kind, payload length
+HTTP_HEADER = struct.Struct("<I")       # json header length
+
+
+class TickRecorder:
+    """
+    Append-only log of everything a live tick reads, so a session can be
+    replayed later without network (see replay.py).
+
+    file layout: frames of [kind: u8][length: u32][payload]
+    http bodies are zlib compressed, everything else is json.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "ab")
+
+    def _write(self, kind, payload):
+        self.file.write(FRAME_HEADER.pack(kind, len(payload)))
+        self.file.write(payload)
+
+    def _write_json(self, kind, value):
+        self._write(kind, json.dumps(value, default=float, separators=(",", ":")).encode("utf-8"))
+
+    # ledger : current monthly_ledger row (MonthlyLedger.row), the monthly close filter reads it
+    def start_session(self, state, candles, open_order, config, ledger=None):
+        self._write_json(SESSION, {
+            "state": state,
+            "candles": None if candles is None else {field: values.tolist() for field, values in candles.items()},
+            "open_order": open_order,
+            "config": config,
+            "ledger": ledger,
+        })
+        self.file.flush()
+
+    def begin_tick(self, wall_clock, config_hash):
+        self._write_json(TICK, {"wall_clock": wall_clock, "config_hash": config_hash})
+
+    def record_http(self, url, params, status, body):
+        header = json.dumps({"url": url, "params": params, "status": status}).encode("utf-8")
+        self._write(HTTP, HTTP_HEADER.pack(len(header)) + header + zlib.compress(body))
+
+    # a tick always ends with its decisions (empty list = no order), then the log is flushed
+    def end_tick(self, decisions):
+        self._write_json(DECISIONS, decisions)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+# every complete frame of a log (a half written last frame is ignored)
+def read_frames(path):
+    with open(path, "rb") as f:
+        data = f.read()
+
+    pos = 0
+    while pos + FRAME_HEADER.size <= len(data):
+        kind, length = FRAME_HEADER.unpack_from(data, pos)
+        start = pos + FRAME_HEADER.size
+        if start + length > len(data):
+            break
+        payload = data[start:start + length]
+        pos = start + length
+
+        if kind == HTTP:
+            (header_len,) = HTTP_HEADER.unpack_from(payload, 0)
+            header = json.loads(payload[HTTP_HEADER.size:HTTP_HEADER.size + header_len])
+            header["body"] = zlib.decompress(payload[HTTP_HEADER.size + header_len:])
+            yield kind, header
+        else:
+            yield kind, json.loads(payload)
+
+
+# group the frames: [{"start": session frame, "ticks": [{"tick", "http", "decisions"}]}]
+def load_sessions(path):
+    sessions = []
+    tick = None
+    for kind, value in read_frames(path):
+        if kind == SESSION:
+            sessions.append({"start": value, "ticks": []})
+            tick = None
+        elif kind == TICK and sessions:
+            tick = {"tick": value, "http": [], "decisions": None}
+            sessions[-1]["ticks"].append(tick)
+        elif kind == HTTP and tick is not None:
+            tick["http"].append(value)
+        elif kind == DECISIONS and tick is not None:
+            tick["decisions"] = value
+            tick = None
+    return sessions
+
+
+class ReplayFeed:
+    """Hands the recorded responses of the current tick back in order, instead of the network."""
+
+    def __init__(self):
+        self.responses = []
+
+    def load_tick(self, tick):
+        self.responses = list(tick["http"])
+
+    def next_response(self, url, params):
+        if not self.responses:
+            raise RuntimeError(f"replay: tick made a request that wasn't recorded ({url} {params})")
+        recorded = self.responses.pop(0)
+        # the host is a setting (binance / a local stub), the request itself has to match
+        if urlparse(recorded["url"]).path != urlparse(url).path or recorded["params"] != params:
+            raise RuntimeError(f"replay: expected request {recorded['url']} {recorded['params']}, got {url} {params}")
+        return recorded["body"]
@@ -0,0 +1,103 @@
+import contextlib
+import io
+import json
+import time
+
+import numpy as np
+
+from recorder import load_sessions, ReplayFeed
+from pipeline import SideEffects
+
+
+# json round trip, so live values and recorded values compare the same way
+def _normalize(decisions):
+    return json.loads(json.dumps(decisions, default=float))
+
+
+def replay_session(session, use_recorded_config=False, quiet=True, stop_on_mismatch=False):
+    """
+    Push a recorded session back through ma_strategy (no network, no telegram)
+
+    session             : one item of recorder.load_sessions()
+    use_recorded_config : run with the settings of the recording instead of the current ones
+    quiet               : hide the console output of the ticks
+
+    returns dict: ticks, mismatches [(tick number, recorded, replayed)], seconds
+    """
+    import get_info
+
+    start = session["start"]
+
+    # ---- fresh bot: in-memory DB, side effects inline, recorded state ----
+    get_info.DB_FILE = ":memory:"
+    get_info.db = None
+    get_info.monthly_ledger = None
+    get_info.timeframes = None
+    get_info.telegram_enabled = False
+    get_info.recorder = None
+    get_info.side_effects = SideEffects(inline=True)
+    get_info.apply_state(start["state"])
+    if use_recorded_config:
+        for name, value in start["config"].items():
+            setattr(get_info, name, value)
+    elif get_info.config_hash(get_info.strategy_config()) != get_info.config_hash(start["config"]):
+        print("replay: settings differ from the recording (use_recorded_config=True to use the recorded ones)")
+
+    candles = start["candles"]
+    get_info.candle_buffer = None if candles is None else {
+        field: np.asarray(values, dtype=np.int64 if field in ("open_times", "close_times") else float)
+        for field, values in candles.items()
+    }
+
+    open_order = start["open_order"]
+    if open_order is not None:
+        fields = {key: value for key, value in open_order.items() if key != "id"}
+        get_info.get_db().insert_order(status="open", **fields)
+
+    # month the live ledger was in (the monthly close filter compares with it), logs without it start empty
+    if start.get("ledger") is not None:
+        get_info.get_db().upsert_month(start["ledger"])
+
+    feed = ReplayFeed()
+    get_info.replay_feed = feed
+    mismatches = []
+    ticks = 0
+    t = time.perf_counter()
+
+    try:
+        for number, tick in enumerate(session["ticks"]):
+            # tick that was cut by a crash / shutdown: nothing to compare with
+            if tick["decisions"] is None:
+                continue
+            feed.load_tick(tick)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+                try:
+                    get_info.ma_strategy()
+                except Exception as e:
+                    # the live tick failed too if its responses are missing (e.g. network error)
+                    if tick["decisions"]:
+                        mismatches.append((number, tick["decisions"], f"error: {e}"))
+                    continue
+            ticks += 1
+
+            replayed = _normalize(list(get_info.tick_decisions))
+            if replayed != tick["decisions"]:
+                mismatches.append((number, tick["decisions"], replayed))
+                if stop_on_mismatch:
+                    break
+    finally:
+        get_info.replay_feed = None
+
+    return {"ticks": ticks, "mismatches": mismatches, "seconds": time.perf_counter() - t}
+
+
+def replay_file(path, session=None, use_recorded_config=False, quiet=True):
+    """
+    Replay every session of a tick log (or only the one with index `session`)
+    returns list of replay_session() results
+    """
+    sessions = load_sessions(path)
+    if session is not None:
+        sessions = [sessions[session]]
+    return [replay_session(s, use_recorded_config=use_recorded_config, quiet=quiet) for s in sessions]
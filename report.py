@@ -0,0 +1,429 @@
+import html
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+
+from candles import close_months
+
+REPORT_POINTS = 2000      # points per chart after LTTB
+CHUNK = 1 << 20           # candles marked to market at a time
+TOP_DRAWDOWNS = 10
+
+
+# ---------- DOWNSAMPLING ----------
+
+# Largest-Triangle-Three-Buckets: `points` points that keep the visual shape of (x, y)
+def lttb(x, y, points):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if points >= n or points < 3:
+        return x, y
+
+    # bucket edges of the n - 2 inner points, first and last point are always kept
+    edges = (np.arange(points - 1) * (n - 2) / (points - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+    keep = np.empty(points, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    a = 0
+    for b in range(points - 2):
+        lo, hi = edges[b], edges[b + 1]
+        # average of the next bucket (the last point for the last bucket)
+        if b + 2 < len(edges):
+            nxt_x = x[hi:edges[b + 2]].mean()
+            nxt_y = y[hi:edges[b + 2]].mean()
+        else:
+            nxt_x, nxt_y = x[-1], y[-1]
+        area = np.abs((x[a] - nxt_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (nxt_y - y[a]))
+        a = lo + int(area.argmax())
+        keep[b + 1] = a
+    return x[keep], y[keep]
+
+
+# first / min / max / last of every `size` points (the rest is returned as is)
+def _m4(x, y, size):
+    rows = len(x) // size
+    if rows == 0:
+        return x, y, x, y
+    xs = x[:rows * size].reshape(rows, size)
+    ys = y[:rows * size].reshape(rows, size)
+    cols = np.stack([np.zeros(rows, dtype=np.int64), ys.argmin(axis=1), ys.argmax(axis=1),
+                     np.full(rows, size - 1, dtype=np.int64)], axis=1)
+    cols.sort(axis=1)
+    fresh = np.ones(cols.shape, dtype=bool)
+    fresh[:, 1:] = cols[:, 1:] != cols[:, :-1]
+    r = np.repeat(np.arange(rows), 4).reshape(rows, 4)
+    return xs[r, cols][fresh], ys[r, cols][fresh], x[rows * size:], y[rows * size:]
+
+
+class SeriesReducer:
+    """
+    Streaming downsampler for a series too long to keep: chunks are folded into
+    first/min/max/last points per bucket (extremes survive), the bucket grows
+    when too many points are kept, and result() runs LTTB on what is left.
+    Memory stays at about max_points, whatever the length of the series.
+    """
+
+    def __init__(self, points=REPORT_POINTS, max_points=None):
+        self.points = points
+        self.max_points = max_points or points * 16
+        self.bucket = 1
+        self.kept_x = np.empty(0)
+        self.kept_y = np.empty(0)
+        self.pending_x = np.empty(0)
+        self.pending_y = np.empty(0)
+        self.count = 0
+
+    def add(self, x, y):
+        self.count += len(x)
+        self.pending_x = np.concatenate((self.pending_x, np.asarray(x, dtype=float)))
+        self.pending_y = np.concatenate((self.pending_y, np.asarray(y, dtype=float)))
+        if self.bucket > 1:
+            bx, by, self.pending_x, self.pending_y = _m4(self.pending_x, self.pending_y, self.bucket)
+        else:
+            bx, by, self.pending_x, self.pending_y = self.pending_x, self.pending_y, np.empty(0), np.empty(0)
+        self.kept_x = np.concatenate((self.kept_x, bx))
+        self.kept_y = np.concatenate((self.kept_y, by))
+        while len(self.kept_x) > self.max_points:
+            # fold the kept points again, 8 at a time (two old buckets)
+            self.bucket *= 2
+            kx, ky, rx, ry = _m4(self.kept_x, self.kept_y, 8)
+            self.kept_x = np.concatenate((kx, rx))
+            self.kept_y = np.concatenate((ky, ry))
+
+    def result(self):
+        x = np.concatenate((self.kept_x, self.pending_x))
+        y = np.concatenate((self.kept_y, self.pending_y))
+        return lttb(x, y, self.points)
+
+
+class DrawdownPeriods:
+    """
+    Peak -> trough -> recovery periods of a streamed equity series
+    (keeps the `top` deepest, the last one may still be open)
+    """
+
+    def __init__(self, top=TOP_DRAWDOWNS):
+        self.top = top
+        self.peak = None
+        self.peak_x = None
+        self.current = None      # open period: {start, trough, depth}
+        self.periods = []
+        self.max_drawdown = 0.0
+
+    def _close(self, period, end):
+        period["end"] = end
+        self.periods.append(period)
+        if len(self.periods) > self.top * 10:
+            self.periods.sort(key=lambda p: p["depth"])
+            del self.periods[self.top:]
+
+    # returns the drawdown (%) of every point of the chunk
+    def add(self, x, y):
+        y = np.asarray(y, dtype=float)
+        if self.peak is None:
+            self.peak, self.peak_x = float(y[0]), float(x[0])
+        peaks = np.maximum.accumulate(np.concatenate(([self.peak], y)))[1:]
+        drawdown = (y - peaks) / peaks * 100
+        if len(y):
+            self.max_drawdown = min(self.max_drawdown, float(drawdown.min()))
+
+        # runs of points under the previous peak
+        under = drawdown < 0
+        if self.current is not None and len(y) and not under[0]:
+            self._close(self.current, float(x[0]))
+            self.current = None
+        edges = np.flatnonzero(np.diff(np.concatenate(([False], under, [False])).astype(np.int8)))
+        new_peaks = np.flatnonzero(~under)
+        for lo, hi in edges.reshape(-1, 2).tolist():
+            if lo == 0 and self.current is not None:
+                period = self.current
+            else:
+                start = self.peak_x if lo == 0 else float(x[lo - 1])
+                period = {"start": start, "trough": None, "depth": 0.0}
+            trough = lo + int(drawdown[lo:hi].argmin())
+            if drawdown[trough] < period["depth"]:
+                period["depth"] = float(drawdown[trough])
+                period["trough"] = float(x[trough])
+            self.current = None
+            if hi < len(y):
+                self._close(period, float(x[hi]))
+            else:
+                self.current = period
+
+        if len(new_peaks):
+            self.peak_x = float(x[new_peaks[-1]])
+        self.peak = float(peaks[-1])
+        return drawdown
+
+    def result(self):
+        periods = list(self.periods)
+        if self.current is not None:
+            periods.append(dict(self.current, end=None))
+        periods.sort(key=lambda p: p["depth"])
+        return periods[:self.top]
+
+
+# ---------- EQUITY PER CANDLE ----------
+
+def candle_equity(result, candles, chunk=CHUNK):
+    """
+    Equity of a backtest_result() marked to market on every candle close,
+    yielded in chunks of (close time ms, equity) so a long backtest never
+    builds the whole series: realized equity (balance + save money) plus
+    the unrealized PnL of the open position.
+    """
+    start, end = result["start"], result["end"]
+    equity_index = result["equity_index"]
+    equity = result["equity"]
+    closes = candles["close_prices"]
+    close_times = candles["close_times"]
+
+    trades = result["trade_list"]
+    open_index = np.array([t["open_index"] for t in trades], dtype=np.int64)
+    close_index = np.array([end if t["close_index"] is None else t["close_index"] for t in trades], dtype=np.int64)
+    entry = np.array([t["entry_price"] for t in trades], dtype=float)
+    size = np.array([t["margin"] * t["leverage"] for t in trades], dtype=float)
+    direction = np.array([1.0 if t["side"] == "long" else -1.0 for t in trades])
+
+    for lo in range(start, end, chunk):
+        idx = np.arange(lo, min(lo + chunk, end))
+        realized = equity[np.maximum(np.searchsorted(equity_index, idx, side="right") - 1, 0)]
+        if len(trades):
+            k = np.searchsorted(open_index, idx, side="right") - 1
+            kk = np.maximum(k, 0)
+            in_trade = (k >= 0) & (idx < close_index[kk])
+            unrealized = np.where(in_trade, size[kk] * direction[kk] * (closes[idx] / entry[kk] - 1), 0.0)
+        else:
+            unrealized = 0.0
+        yield close_times[idx], realized + unrealized
+
+
+# ---------- REPORT ----------
+
+def _month_label(month):
+    return f"{month // 12 + 1970:04d}-{month % 12 + 1:02d}"
+
+
+def _time_str(ms):
+    if ms is None:
+        return None
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime("%Y-%m-%d %H:%M")
+
+
+def trade_distribution(trades, bins=30):
+    closed = [t for t in trades if t["close_index"] is not None]
+    profit_percent = np.array([t["profit_percent"] for t in closed], dtype=float)
+    profits = np.array([t["profit"] for t in closed], dtype=float)
+    durations = np.array([t["close_index"] - t["open_index"] for t in closed], dtype=np.int64)
+    if len(closed) == 0:
+        return {"trades": 0}
+
+    counts, edges = np.histogram(profit_percent, bins=bins)
+    by_exit = {}
+    by_side = {}
+    for t in closed:
+        for table, key in ((by_exit, t.get("exit", "signal")), (by_side, t["side"])):
+            row = table.setdefault(key, {"trades": 0, "wins": 0, "profit": 0.0})
+            row["trades"] += 1
+            row["wins"] += 1 if t["profit_percent"] > 0 else 0
+            row["profit"] += float(t["profit"])
+
+    gains = profits[profits > 0].sum()
+    losses = -profits[profits < 0].sum()
+    return {
+        "trades": len(closed),
+        "histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+        "by_exit": by_exit,
+        "by_side": by_side,
+        "avg_win_percent": float(profit_percent[profit_percent > 0].mean()) if (profit_percent > 0).any() else 0.0,
+        "avg_loss_percent": float(profit_percent[profit_percent <= 0].mean()) if (profit_percent <= 0).any() else 0.0,
+        "best_percent": float(profit_percent.max()),
+        "worst_percent": float(profit_percent.min()),
+        "profit_factor": float(gains / losses) if losses > 0 else None,
+        "avg_candles": float(durations.mean()),
+        "max_candles": int(durations.max()),
+    }
+
+
+def build_report(result, candles, points=REPORT_POINTS, chunk=CHUNK, top_drawdowns=TOP_DRAWDOWNS, title="Backtest"):
+    """
+    Compact report of a backtest_result(): summary, downsampled equity and
+    drawdown curves, monthly table, trade distribution and the deepest
+    drawdown periods. The equity is streamed candle by candle in chunks, so
+    the size and memory don't depend on the length of the backtest.
+
+    returns a dict of plain values (json ready), see write_report()
+    """
+    equity_curve = SeriesReducer(points)
+    drawdown_curve = SeriesReducer(points)
+    periods = DrawdownPeriods(top_drawdowns)
+    months = {}     # month -> [start equity, end equity]
+    previous = float(result["start_equity"])
+
+    for times, equity in candle_equity(result, candles, chunk):
+        if len(times) == 0:
+            continue
+        equity_curve.add(times, equity)
+        drawdown_curve.add(times, periods.add(times, equity))
+
+        month = close_months(times)
+        last = np.flatnonzero(np.append(month[1:] != month[:-1], True))
+        for i in last.tolist():
+            m = int(month[i])
+            months.setdefault(m, [previous, None])[1] = float(equity[i])
+            previous = float(equity[i])
+
+    month_trades = {}
+    for t in result["trade_list"]:
+        if t["close_index"] is None:
+            continue
+        m = int(close_months(candles["close_times"][t["close_index"]:t["close_index"] + 1])[0])
+        row = month_trades.setdefault(m, [0, 0, 0.0])
+        row[0] += 1
+        row[1] += 1 if t["profit_percent"] > 0 else 0
+        row[2] += float(t["profit"])
+
+    monthly = []
+    for m in sorted(months):
+        first, last = months[m]
+        trades, wins, profit = month_trades.get(m, (0, 0, 0.0))
+        monthly.append({"month": _month_label(m), "return_percent": (last / first - 1) * 100, "equity": last,
+                        "trades": trades, "wins": wins, "profit": profit})
+
+    ex, ey = equity_curve.result()
+    dx, dy = drawdown_curve.result()
+    return {
+        "title": title,
+        "summary": {
+            "candles": result["end"] - result["start"],
+            "from": _time_str(int(candles["close_times"][result["start"]])) if result["end"] > result["start"] else None,
+            "to": _time_str(int(candles["close_times"][result["end"] - 1])) if result["end"] > result["start"] else None,
+            "start_equity": result["start_equity"],
+            "final_equity": result["final_equity"],
+            "return_percent": result["return_percent"],
+            # marked to market every candle (backtest_result only sees the closes)
+            "max_drawdown": periods.max_drawdown,
+            "trades": result["trades"],
+            "win_rate": result["win_rate"],
+            "params": {k: v for k, v in result["params"].items() if isinstance(v, (int, float, str, bool, type(None)))},
+        },
+        "equity": {"time": ex.astype(np.int64).tolist(), "value": np.round(ey, 2).tolist()},
+        "drawdown": {"time": dx.astype(np.int64).tolist(), "value": np.round(dy, 3).tolist()},
+        "monthly": monthly,
+        "distribution": trade_distribution(result["trade_list"]),
+        "drawdown_periods": [{"start": _time_str(p["start"]), "trough": _time_str(p["trough"]),
+                              "end": _time_str(p["end"]), "depth": p["depth"]} for p in periods.result()],
+    }
+
+
+# ---------- OUTPUT ----------
+
+def _svg_line(times, values, width=900, height=220, color="#2a6fdb", fill=False):
+    t = np.asarray(times, dtype=float)
+    v = np.asarray(values, dtype=float)
+    if len(t) < 2:
+        return ""
+    x = (t - t[0]) / max(t[-1] - t[0], 1) * width
+    lo, hi = float(v.min()), float(v.max())
+    y = height - (v - lo) / max(hi - lo, 1e-9) * height
+    path = " ".join(f"{a:.1f},{b:.1f}" for a, b in zip(x, y))
+    area = f'<polygon points="0,{height} {path} {width},{height}" fill="{color}" opacity="0.15"/>' if fill else ""
+    return (f'<svg viewBox="0 -10 {width} {height + 20}" width="100%" height="{height + 20}" '
+            f'preserveAspectRatio="none">{area}<polyline points="{path}" fill="none" stroke="{color}" '
+            f'stroke-width="1"/></svg><div class="axis">{lo:,.2f} &ndash; {hi:,.2f}</div>')
+
+
+def _svg_bars(edges, counts, width=900, height=160):
+    if not counts:
+        return ""
+    top = max(counts) or 1
+    w = width / len(counts)
+    bars = []
+    for i, c in enumerate(counts):
+        h = c / top * height
+        color = "#2e9e5b" if edges[i] >= 0 else "#d0463b"
+        bars.append(f'<rect x="{i * w:.1f}" y="{height - h:.1f}" width="{w - 1:.1f}" height="{h:.1f}" fill="{color}">'
+                    f'<title>{edges[i]:.2f}% .. {edges[i + 1]:.2f}%: {c}</title></rect>')
+    return f'<svg viewBox="0 0 {width} {height}" width="100%" height="{height}">{"".join(bars)}</svg>'
+
+
+def _table(rows, columns):
+    head = "".join(f"<th>{html.escape(name)}</th>" for name, _ in columns)
+    body = []
+    for row in rows:
+        cells = []
+        for _, fmt in columns:
+            value = fmt(row)
+            cells.append(f"<td>{html.escape(str(value))}</td>")
+        body.append(f"<tr>{''.join(cells)}</tr>")
+    return f"<table><tr>{head}</tr>{''.join(body)}</table>"
+
+
+def render_html(report):
+    s = report["summary"]
+    d = report["distribution"]
+    summary_rows = [
+        ("period", f"{s['from']} -> {s['to']} ({s['candles']} candles)"),
+        ("equity", f"{s['start_equity']:,.2f} -> {s['final_equity']:,.2f} $"),
+        ("return", f"{s['return_percent']:.2f} %"),
+        ("max drawdown", f"{s['max_drawdown']:.2f} %"),
+        ("trades", f"{s['trades']} (win rate {s['win_rate']:.1f} %)"),
+    ]
+    if d.get("trades"):
+        pf = "-" if d["profit_factor"] is None else f"{d['profit_factor']:.2f}"
+        summary_rows.append(("profit factor", pf))
+        summary_rows.append(("avg win / loss", f"{d['avg_win_percent']:.2f} % / {d['avg_loss_percent']:.2f} %"))
+
+    parts = [
+        f"<h1>{html.escape(report['title'])}</h1>",
+        _table(summary_rows, [("", lambda r: r[0]), ("", lambda r: r[1])]),
+        "<h2>Equity</h2>",
+        _svg_line(report["equity"]["time"], report["equity"]["value"]),
+        "<h2>Drawdown %</h2>",
+        _svg_line(report["drawdown"]["time"], report["drawdown"]["value"], color="#d0463b", fill=True),
+        "<h2>Months</h2>",
+        _table(report["monthly"], [("month", lambda r: r["month"]),
+                                   ("return %", lambda r: f"{r['return_percent']:.2f}"),
+                                   ("equity", lambda r: f"{r['equity']:,.2f}"),
+                                   ("trades", lambda r: r["trades"]),
+                                   ("wins", lambda r: r["wins"]),
+                                   ("profit $", lambda r: f"{r['profit']:,.2f}")]),
+    ]
+    if d.get("trades"):
+        parts += [
+            "<h2>Trade profit %</h2>",
+            _svg_bars(d["histogram"]["edges"], d["histogram"]["counts"]),
+            _table([dict(v, name=k) for k, v in list(d["by_side"].items()) + list(d["by_exit"].items())],
+                   [("", lambda r: r["name"]), ("trades", lambda r: r["trades"]), ("wins", lambda r: r["wins"]),
+                    ("profit $", lambda r: f"{r['profit']:,.2f}")]),
+        ]
+    parts += [
+        "<h2>Deepest drawdowns</h2>",
+        _table(report["drawdown_periods"], [("peak", lambda r: r["start"]), ("trough", lambda r: r["trough"]),
+                                            ("recovered", lambda r: r["end"] or "not yet"),
+                                            ("depth %", lambda r: f"{r['depth']:.2f}")]),
+    ]
+    style = ("body{font-family:sans-serif;max-width:960px;margin:auto;color:#222}"
+             "table{border-collapse:collapse;margin:8px 0}td,th{border:1px solid #ddd;padding:2px 8px;"
+             "text-align:right}svg{background:#fafafa}.axis{font-size:11px;color:#777}")
+    data = json.dumps(report).replace("</", "<\\/")
+    return (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{html.escape(report['title'])}</title>"
+            f"<style>{style}</style></head><body>{''.join(parts)}"
+            f"<script type=\"application/json\" id=\"report\">{data}</script>"
+            f"</body></html>")
+
+
+# .html (self-contained, the data is embedded too) or .json
+def write_report(report, path):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            json.dump(report, f)
+        else:
+            f.write(render_html(report))
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
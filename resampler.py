@@ -0,0 +1,275 @@
+import numpy as np
+
+from indicators import Indicator
+
+# candle length of every binance interval we can build from smaller candles
+INTERVAL_MS = {
+    "1m": 60_000,
+    "3m": 3 * 60_000,
+    "5m": 5 * 60_000,
+    "15m": 15 * 60_000,
+    "30m": 30 * 60_000,
+    "1h": 60 * 60_000,
+    "2h": 2 * 60 * 60_000,
+    "4h": 4 * 60 * 60_000,
+    "6h": 6 * 60 * 60_000,
+    "8h": 8 * 60 * 60_000,
+    "12h": 12 * 60 * 60_000,
+    "1d": 24 * 60 * 60_000,
+}
+
+
+def interval_to_ms(interval):
+    if interval not in INTERVAL_MS:
+        raise ValueError(f"unsupported interval: {interval}")
+    return INTERVAL_MS[interval]
+
+
+def bars_per_interval(base_interval, target_interval):
+    base_ms = interval_to_ms(base_interval)
+    target_ms = interval_to_ms(target_interval)
+    if target_ms < base_ms or target_ms % base_ms != 0:
+        raise ValueError(f"can't build {target_interval} candles from {base_interval} candles")
+    return target_ms // base_ms
+
+
+# resample a whole history in one pass (no python loop over candles)
+def resample_ohlcv(open_times, open_prices, high_prices, low_prices, close_prices, volume_prices,
+                   base_interval="15m", target_interval="1h", drop_partial=True):
+    """
+    Build higher timeframe candles from base candles
+
+    open_times     : candle open time in milliseconds (binance kline[0])
+    base_interval  : interval of the input candles (default 15m)
+    target_interval: interval to build (1h, 4h, ...)
+    drop_partial   : drop buckets that don't have all base candles yet
+                     (first bucket of the history or the still running last one)
+
+    returns dict of numpy arrays: open_times, open, high, low, close, volume, count, complete
+    """
+    per_bar = bars_per_interval(base_interval, target_interval)
+    target_ms = interval_to_ms(target_interval)
+
+    open_times = np.asarray(open_times, dtype=np.int64)
+    n = len(open_times)
+    if n == 0:
+        empty = np.array([], dtype=float)
+        return {
+            "open_times": np.array([], dtype=np.int64), "open": empty, "high": empty,
+            "low": empty, "close": empty, "volume": empty,
+            "count": np.array([], dtype=np.int64), "complete": np.array([], dtype=bool)
+        }
+
+    opens = np.asarray(open_prices, dtype=float)
+    highs = np.asarray(high_prices, dtype=float)
+    lows = np.asarray(low_prices, dtype=float)
+    closes = np.asarray(close_prices, dtype=float)
+    volumes = np.asarray(volume_prices, dtype=float)
+
+    # binance aligns intraday candles to the unix epoch (UTC)
+    buckets = open_times - open_times % target_ms
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+
+    result = {
+        "open_times": buckets[starts],
+        "open": opens[starts],
+        "high": np.maximum.reduceat(highs, starts),
+        "low": np.minimum.reduceat(lows, starts),
+        "close": closes[ends],
+        "volume": np.add.reduceat(volumes, starts),
+        "count": ends - starts + 1,
+    }
+    result["complete"] = result["count"] == per_bar
+
+    if drop_partial:
+        keep = result["complete"]
+        result = {key: value[keep] for key, value in result.items()}
+
+    return result
+
+
+class Resampler:
+    """
+    Incremental higher timeframe candles built from closed base candles.
+
+    Feed every closed base candle to update(); a bar is finished as soon as the
+    last base candle of its bucket closes (e.g. the 1h bar closes together with
+    the :45 15m candle). The running bucket is kept apart as a partial bar and
+    only used when asked for.
+
+    Partial bars, seed() and update() alike: a bucket the feed has moved past is
+    kept with complete=False when base candles are missing (cut by the start of
+    the history, or a gap in the feed), only the running bucket is partial.
+    """
+
+    def __init__(self, target_interval="1h", base_interval="15m", maxlen=1000):
+        self.target_interval = target_interval
+        self.base_interval = base_interval
+        self.target_ms = interval_to_ms(target_interval)
+        self.base_ms = interval_to_ms(base_interval)
+        self.per_bar = bars_per_interval(base_interval, target_interval)
+        self.maxlen = maxlen
+
+        self.open_times = []
+        self.open_prices = []
+        self.high_prices = []
+        self.low_prices = []
+        self.close_prices = []
+        self.volume_prices = []
+        self.counts = []
+        self.completes = []
+
+        self.partial = None
+        self.last_base_open_time = None
+
+    # load history with the vectorized resampler
+    def seed(self, open_times, open_prices, high_prices, low_prices, close_prices, volume_prices):
+        if len(open_times) == 0:
+            return
+
+        bars = resample_ohlcv(open_times, open_prices, high_prices, low_prices, close_prices, volume_prices,
+                              base_interval=self.base_interval, target_interval=self.target_interval,
+                              drop_partial=False)
+
+        last_open_time = int(np.asarray(open_times, dtype=np.int64)[-1])
+        last = len(bars["open_times"]) - 1
+        for i in range(last + 1):
+            bar = {
+                "open_time": int(bars["open_times"][i]),
+                "open": float(bars["open"][i]),
+                "high": float(bars["high"][i]),
+                "low": float(bars["low"][i]),
+                "close": float(bars["close"][i]),
+                "volume": float(bars["volume"][i]),
+                "count": int(bars["count"][i]),
+            }
+            if i == last and not self._bucket_closed(last_open_time):
+                self.partial = bar
+            else:
+                self._close(bar)
+
+        self.last_base_open_time = last_open_time
+
+    # add one closed base candle, returns the bars it finished (list, usually empty or one)
+    def update(self, open_time, open_price, high_price, low_price, close_price, volume):
+        open_time = int(open_time)
+
+        # ignore candles we already have (refetch of the same window)
+        if self.last_base_open_time is not None and open_time <= self.last_base_open_time:
+            return []
+        self.last_base_open_time = open_time
+
+        bucket = open_time - open_time % self.target_ms
+        finished = []
+
+        # a gap in the feed: the old bucket won't get its missing candles
+        if self.partial is not None and self.partial["open_time"] != bucket:
+            finished.append(self._close(self.partial))
+            self.partial = None
+
+        if self.partial is None:
+            self.partial = {
+                "open_time": bucket,
+                "open": float(open_price),
+                "high": float(high_price),
+                "low": float(low_price),
+                "close": float(close_price),
+                "volume": float(volume),
+                "count": 1,
+            }
+        else:
+            self.partial["high"] = max(self.partial["high"], float(high_price))
+            self.partial["low"] = min(self.partial["low"], float(low_price))
+            self.partial["close"] = float(close_price)
+            self.partial["volume"] += float(volume)
+            self.partial["count"] += 1
+
+        if self._bucket_closed(open_time):
+            finished.append(self._close(self.partial))
+            self.partial = None
+
+        return finished
+
+    # base candle `open_time` is the last one of its bucket
+    def _bucket_closed(self, open_time):
+        return (open_time + self.base_ms) % self.target_ms == 0
+
+    def _close(self, bar):
+        bar["complete"] = bar["count"] == self.per_bar
+        self._append(bar)
+        return bar
+
+    def _append(self, bar):
+        self.open_times.append(bar["open_time"])
+        self.open_prices.append(bar["open"])
+        self.high_prices.append(bar["high"])
+        self.low_prices.append(bar["low"])
+        self.close_prices.append(bar["close"])
+        self.volume_prices.append(bar["volume"])
+        self.counts.append(bar["count"])
+        self.completes.append(bar["complete"])
+
+        # trim in chunks so appends stay O(1) on average
+        if len(self.open_times) > 2 * self.maxlen:
+            for lst in (self.open_times, self.open_prices, self.high_prices, self.low_prices,
+                        self.close_prices, self.volume_prices, self.counts, self.completes):
+                del lst[:-self.maxlen]
+
+    def series(self, include_partial=False):
+        """
+        OHLCV lists of the finished bars (last `maxlen` or a bit more)
+        include_partial : also add the running bar at the end
+        """
+        data = {
+            "open_times": list(self.open_times),
+            "open_prices": list(self.open_prices),
+            "high_prices": list(self.high_prices),
+            "low_prices": list(self.low_prices),
+            "close_prices": list(self.close_prices),
+            "volume_prices": list(self.volume_prices),
+            "complete": list(self.completes),
+        }
+        if include_partial and self.partial is not None:
+            data["open_times"].append(self.partial["open_time"])
+            data["open_prices"].append(self.partial["open"])
+            data["high_prices"].append(self.partial["high"])
+            data["low_prices"].append(self.partial["low"])
+            data["close_prices"].append(self.partial["close"])
+            data["volume_prices"].append(self.partial["volume"])
+            data["complete"].append(False)
+        return data
+
+    # Indicator over this timeframe closes (same kernels as the base feed)
+    def indicator(self, include_partial=False):
+        return Indicator(self.series(include_partial)["close_prices"], period=None)
+
+
+class MultiTimeframe:
+    """
+    Fan out one base candle feed to many higher timeframes.
+
+    mtf = MultiTimeframe(["1h", "4h"])
+    mtf.seed(...)                      # history from the same get_ohlcv call
+    finished = mtf.update(...)         # {"1h": [finished bars], "4h": [...]}
+    ma_4h = mtf["4h"].indicator().get_MA(50)[-1]
+    """
+
+    def __init__(self, intervals=("1h", "4h"), base_interval="15m", maxlen=1000):
+        self.resamplers = {
+            interval: Resampler(interval, base_interval=base_interval, maxlen=maxlen)
+            for interval in intervals
+        }
+
+    def __getitem__(self, interval):
+        return self.resamplers[interval]
+
+    def seed(self, open_times, open_prices, high_prices, low_prices, close_prices, volume_prices):
+        for resampler in self.resamplers.values():
+            resampler.seed(open_times, open_prices, high_prices, low_prices, close_prices, volume_prices)
+
+    def update(self, open_time, open_price, high_price, low_price, close_price, volume):
+        return {
+            interval: resampler.update(open_time, open_price, high_price, low_price, close_price, volume)
+            for interval, resampler in self.resamplers.items()
+        }
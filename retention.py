@@ -0,0 +1,290 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from backfill import page_dir, page_starts, stored_pages, dedupe_candles, to_ms
+from candles import CANDLE_FIELDS, concat_candles, load_candles, save_candles, open_time_str
+from clock import SystemClock
+from database import Database
+from resampler import interval_to_ms
+
+# same values as the settings in get_info.py
+DEFAULT_POLICY = {
+    "candle_days": 30,            # symbol_data rows kept in database.db, older ones go to the candle store
+    "candle_store": "candle_store",
+    "interval": "15m",            # interval of the symbol_data rows
+    "order_months": 12,           # closed orders kept, older ones go to archive_dir/orders_<year>.db
+    "archive_dir": "archive",
+    "batch": 500,                 # rows per transaction (short write locks, the tick never waits long)
+    "vacuum_pages": 256,          # pages freed per incremental_vacuum step
+    "budget_seconds": 60,         # max time of one maintenance run
+}
+
+
+def _cutoff_str(now, days):
+    return open_time_str(int((now - timedelta(days=days)).timestamp() * 1000))
+
+
+def _month_cutoff(now, months):
+    # first day of the month `months` months before now: orders closed before it are archived
+    month = now.year * 12 + now.month - 1 - months
+    return f"{month // 12:04d}-{month % 12 + 1:02d}"
+
+
+# ---------- CANDLES -> candle store ----------
+
+def _merge_into_store(store_dir, symbol, interval, candles):
+    """add candles to the backfill.py candle store (page files, dedup by open time)"""
+    path = page_dir(store_dir, symbol, interval)
+    os.makedirs(path, exist_ok=True)
+    open_times = candles["open_times"]
+    have = stored_pages(store_dir, symbol, interval)
+    starts = np.asarray(page_starts(int(open_times.min()), int(open_times.max()) + 1, interval), dtype=np.int64)
+    page_of = starts[np.searchsorted(starts, open_times, side="right") - 1]
+    for page in np.unique(page_of).tolist():
+        part = {field: values[page_of == page] for field, values in candles.items()}
+        file = os.path.join(path, f"{page}.npz")
+        if page in have:
+            part = dedupe_candles(concat_candles(load_candles(file), part))
+        # a page made from archived rows can be partial: backfill() refills its gaps
+        save_candles(file, part)
+
+
+def archive_candles(db_path, policy=None, now=None, stop=None):
+    """
+    symbol_data rows older than policy["candle_days"] -> candle store, then deleted
+    returns number of rows moved
+    """
+    p = dict(DEFAULT_POLICY, **(policy or {}))
+    now = now or datetime.now(timezone.utc)
+    cutoff = _cutoff_str(now, p["candle_days"])
+    step = interval_to_ms(p["interval"])
+    conn = sqlite3.connect(db_path, timeout=30)
+    moved = 0
+    try:
+        while stop is None or not stop():
+            rows = conn.execute("""
+            SELECT id, symbol, open_times, open_prices, high_prices, low_prices, close_prices, volume_prices
+            FROM symbol_data WHERE open_times < ? ORDER BY id LIMIT ?
+            """, (cutoff, p["batch"])).fetchall()
+            if not rows:
+                break
+            by_symbol = {}
+            for row in rows:
+                by_symbol.setdefault(row[1], []).append(row)
+            for symbol, symbol_rows in by_symbol.items():
+                open_times = np.array([to_ms(r[2]) for r in symbol_rows], dtype=np.int64)
+                prices = np.array([r[3:8] for r in symbol_rows], dtype=float)
+                candles = {"open_times": open_times, "close_times": open_times + step - 1}
+                for k, field in enumerate(("open_prices", "high_prices", "low_prices", "close_prices", "volume_prices")):
+                    candles[field] = prices[:, k]
+                _merge_into_store(p["candle_store"], symbol, p["interval"],
+                                  {field: candles[field] for field in CANDLE_FIELDS})
+            # the rows are only deleted once their candles are on disk
+            conn.executemany("DELETE FROM symbol_data WHERE id = ?", [(row[0],) for row in rows])
+            conn.commit()
+            moved += len(rows)
+    finally:
+        conn.close()
+    return moved
+
+
+# ---------- CLOSED ORDERS -> yearly archive DBs ----------
+
+def archive_orders(db_path, policy=None, now=None, stop=None):
+    """
+    closed orders whose close month is more than policy["order_months"] months
+    back -> archive_dir/orders_<close year>.db (same schema), then deleted
+    returns number of orders moved
+    """
+    p = dict(DEFAULT_POLICY, **(policy or {}))
+    now = now or datetime.now(timezone.utc)
+    cutoff = _month_cutoff(now, p["order_months"])
+    os.makedirs(p["archive_dir"], exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    moved = 0
+    try:
+        columns = [r[1] for r in conn.execute("PRAGMA table_info('orders')")]
+        names = ", ".join(columns)
+        years = [r[0] for r in conn.execute("""
+        SELECT DISTINCT substr(close_time, 1, 4) FROM orders
+        WHERE status = 'closed' AND close_time < ? ORDER BY 1
+        """, (cutoff,))]
+        for year in years:
+            archive_path = os.path.join(p["archive_dir"], f"orders_{year}.db")
+            # creates the tables (and the newer order columns) in the archive
+            Database(db_name=archive_path).close()
+            conn.execute("ATTACH DATABASE ? AS archive", (archive_path,))
+            try:
+                while stop is None or not stop():
+                    ids = [r[0] for r in conn.execute("""
+                    SELECT id FROM orders
+                    WHERE status = 'closed' AND close_time < ? AND substr(close_time, 1, 4) = ?
+                    ORDER BY id LIMIT ?
+                    """, (cutoff, year, p["batch"]))]
+                    if not ids:
+                        break
+                    marks = ", ".join("?" for _ in ids)
+                    # one transaction: copy + delete
+                    conn.execute(f"INSERT OR REPLACE INTO archive.orders ({names}) "
+                                 f"SELECT {names} FROM orders WHERE id IN ({marks})", ids)
+                    conn.execute(f"DELETE FROM orders WHERE id IN ({marks})", ids)
+                    conn.commit()
+                    moved += len(ids)
+            finally:
+                conn.execute("DETACH DATABASE archive")
+    finally:
+        conn.close()
+    return moved
+
+
+# closed orders of the archives + database.db (reports over the whole history)
+def all_closed_orders(db_path, archive_dir=DEFAULT_POLICY["archive_dir"], symbol=None):
+    orders = []
+    if os.path.isdir(archive_dir):
+        for name in sorted(os.listdir(archive_dir)):
+            if name.startswith("orders_") and name.endswith(".db"):
+                archive = Database(db_name=os.path.join(archive_dir, name))
+                orders += archive.get_closed_orders(symbol=symbol)
+                archive.close()
+    db = Database(db_name=db_path)
+    orders += db.get_closed_orders(symbol=symbol)
+    db.close()
+    return orders
+
+
+# ---------- VACUUM / ANALYZE ----------
+
+def vacuum_step(db_path, pages=DEFAULT_POLICY["vacuum_pages"]):
+    """
+    free up to `pages` pages (needs auto_vacuum=INCREMENTAL, see enable_incremental_vacuum)
+    returns pages still free afterwards, None when the DB isn't in incremental mode
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return None
+        # executescript steps the pragma to the end (execute() frees one page per step)
+        conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+        return conn.execute("PRAGMA freelist_count").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def analyze(db_path):
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        # bounded ANALYZE: samples at most ~400 rows per index
+        conn.execute("PRAGMA analysis_limit = 400")
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# one full VACUUM, needed once for DBs created before auto_vacuum was set (run it with the bot stopped)
+def enable_incremental_vacuum(db_path):
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+def run_maintenance(db_path, policy=None, now=None, stop=None, verbose=True):
+    """
+    Archive old candles and orders, vacuum the freed pages, ANALYZE.
+    Every step works in small transactions; `stop()` returning True (or the
+    policy's budget_seconds running out) ends the run between two of them.
+
+    returns dict: candles, orders (rows moved), free_pages, seconds
+    """
+    p = dict(DEFAULT_POLICY, **(policy or {}))
+    t = time.monotonic()
+
+    def should_stop():
+        return (stop is not None and stop()) or time.monotonic() - t > p["budget_seconds"]
+
+    result = {"candles": archive_candles(db_path, p, now, should_stop),
+              "orders": archive_orders(db_path, p, now, should_stop), "free_pages": None}
+
+    while not should_stop():
+        free = vacuum_step(db_path, p["vacuum_pages"])
+        result["free_pages"] = free
+        if not free:
+            break
+        time.sleep(0.05)
+    if not should_stop():
+        analyze(db_path)
+
+    result["seconds"] = time.monotonic() - t
+    if verbose:
+        print(f"db maintenance: {result['candles']} candles / {result['orders']} orders archived "
+              f"| free pages: {result['free_pages']} | {result['seconds']:.1f} s")
+    return result
+
+
+# ---------- BACKGROUND JOB ----------
+
+class MaintenanceJob:
+    """
+    Runs run_maintenance() on a low priority daemon thread, at most every
+    `every` seconds, started by poke() right after a tick (so it has the 15
+    minutes until the next one). A tick that starts while it runs calls
+    pause(): the job stops between two small transactions.
+
+    clock : clock.SystemClock (default) or a SimulatedClock: `every` and the
+            retention cutoffs follow it
+    """
+
+    def __init__(self, db_path, policy=None, every=6 * 3600, clock=None):
+        self.db_path = db_path
+        self.policy = policy
+        self.every = every
+        self.clock = clock or SystemClock()
+        self.last_run = None
+        self.wake = threading.Event()
+        self.paused = threading.Event()
+        self.closed = threading.Event()
+        self.running = False
+        self.thread = threading.Thread(target=self._loop, name="db-maintenance", daemon=True)
+        self.thread.start()
+
+    def poke(self):
+        self.paused.clear()
+        if self.last_run is None or self.clock.monotonic() - self.last_run >= self.every:
+            self.wake.set()
+
+    def pause(self):
+        self.paused.set()
+
+    def close(self):
+        self.closed.set()
+        self.paused.set()
+        self.wake.set()
+        self.thread.join(5)
+
+    def _loop(self):
+        try:
+            # lowest CPU priority for this thread only (linux: thread id = scheduling entity)
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError):
+            pass
+        while True:
+            self.wake.wait()
+            self.wake.clear()
+            if self.closed.is_set():
+                return
+            self.running = True
+            try:
+                run_maintenance(self.db_path, self.policy, now=self.clock.now(), stop=self.paused.is_set)
+            except Exception as e:
+                print("db maintenance failed:", e)
+            finally:
+                self.running = False
+                self.last_run = self.clock.monotonic()
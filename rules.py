@@ -0,0 +1,91 @@
+from account import total_balance, open_position, close_position, open_lot, close_lots
+
+
+# ---- Monthly close filter + cooldown for one candle ----
+def tick_gate(account, params, new_month):
+    """
+    new_month : this candle starts a new month
+
+    returns False when ma_strategy would return before looking at the signals
+    """
+    if params["monthly_close_filter"] and not account["trade_power"]:
+        if not new_month:
+            return False
+        account["lst_profit_percent_per_month"].append(account["profit_percent_per_month"])
+        account["profit_percent_per_month"] = 0
+        account["trade_power"] = True
+
+    if account["cooldown_until_index"] > 0:
+        account["cooldown_until_index"] -= 1
+        return False
+
+    return True
+
+
+# ---- orders a strategy can ask for on a candle ----
+ORDER_ACTIONS = ("open_long", "close_long", "open_short", "close_short")
+
+
+def apply_actions(account, trade_manager, params, actions, price, time_str, name="default", symbol=None):
+    """
+    actions : names from ORDER_ACTIONS, applied in order. one that doesn't fit
+              the position at that moment (open while in a trade, close_long
+              while short...) is skipped, like the checks in ma_strategy
+    name / symbol : lot of trade_manager.positions (lot mode only)
+
+    returns list of (action, updates) for the orders that were made
+    """
+    results = []
+    total_balance_value = total_balance(account)
+    if trade_manager.positions is not None:
+        return _apply_lot_actions(account, trade_manager, params, actions, price, time_str, name, symbol,
+                                  total_balance_value)
+
+    for action in actions:
+        if action not in ORDER_ACTIONS:
+            raise ValueError(f"unknown action: {action}")
+        kind, side = action.split("_")
+        if kind == "open" and account["current_position"] is None:
+            results.append((action, open_position(trade_manager, account, side, price, time_str,
+                                                  params["trade_amount_percent"], total_balance_value)))
+        elif kind == "close" and account["current_position"] == side:
+            results.append((action, close_position(trade_manager, account, price, time_str, params["fee_rate"],
+                                                   params["cooldown_after_big_pnl"], params["trade_amount_percent"])))
+    return results
+
+
+# lot mode: open_* adds a lot while there are fewer than max_lots on that side (and
+# no lot on the other side unless hedge) and some balance is left, close_* closes
+# every lot of its side
+def _apply_lot_actions(account, trade_manager, params, actions, price, time_str, name, symbol, total_balance_value):
+    book = trade_manager.positions
+    max_lots = params.get("max_lots", 1)
+    hedge = params.get("hedge", False)
+    results = []
+    for action in actions:
+        if action not in ORDER_ACTIONS:
+            raise ValueError(f"unknown action: {action}")
+        kind, side = action.split("_")
+        if kind == "open":
+            other = "short" if side == "long" else "long"
+            if (account["balance"] > 0 and book.count(name, symbol, side) < max_lots
+                    and (hedge or not book.count(name, symbol, other))):
+                results.append((action, open_lot(trade_manager, account, name, symbol, side, price, time_str,
+                                                 params["trade_amount_percent"], total_balance_value)))
+        else:
+            for updates in close_lots(trade_manager, account, name, symbol, side, price, time_str, params["fee_rate"],
+                                      params["cooldown_after_big_pnl"], params["trade_amount_percent"]):
+                results.append((action, updates))
+    return results
+
+
+# ---- open / close on this candle's signals (same order as ma_strategy) ----
+def tick_orders(account, trade_manager, params, entry_long, exit_long, entry_short, exit_short, price, time_str):
+    """
+    entry_* / exit_* : signal_conditions() of this candle (filters included)
+
+    returns list of (action, updates) for the orders of this candle
+    """
+    flags = (entry_long, exit_long, entry_short, exit_short)
+    actions = [action for action, flag in zip(ORDER_ACTIONS, flags) if flag]
+    return apply_actions(account, trade_manager, params, actions, price, time_str)
@@ -0,0 +1,217 @@
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from candles import CANDLE_FIELDS, TIME_FIELDS, klines_to_candles
+
+MAGIC = 0x43414E44  # "CAND"
+HEADER_SLOTS = 8    # int64: magic, capacity, seq, version, spare...
+SEQ = 2
+VERSION = 3
+
+
+class SharedCandleFeed:
+    """
+    Ring buffer of closed candles in multiprocessing.shared_memory.
+
+    One ingest process publishes, any number of worker processes attach by
+    name and read numpy views straight out of the shared block (no copies).
+
+    Every candle is written twice (slot i and i + capacity), so the last n
+    candles are always one contiguous slice -> window(n) is a plain view.
+    seq counts the candles published so far; version is odd while a
+    candle is being written (seqlock, readers retry).
+
+    A view stays valid until capacity - n newer candles are published;
+    use snapshot() to keep a copy longer than that.
+    """
+
+    def __init__(self, name=None, capacity=4096, create=False):
+        size = (HEADER_SLOTS + len(CANDLE_FIELDS) * 2 * capacity) * 8
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        self.header = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=self.shm.buf)
+        if create:
+            self.header[:] = 0
+            self.header[0] = MAGIC
+            self.header[1] = capacity
+        elif self.header[0] != MAGIC:
+            raise ValueError(f"shared memory {name} is not a candle feed")
+
+        self.capacity = int(self.header[1])
+        self.owner = create
+        self.columns = {}
+        offset = HEADER_SLOTS * 8
+        for field in CANDLE_FIELDS:
+            dtype = np.int64 if field in TIME_FIELDS else np.float64
+            self.columns[field] = np.ndarray((2 * self.capacity,), dtype=dtype, buffer=self.shm.buf, offset=offset)
+            offset += 2 * self.capacity * 8
+
+    @classmethod
+    def create(cls, name=None, capacity=4096):
+        return cls(name=name, capacity=capacity, create=True)
+
+    @classmethod
+    def attach(cls, name):
+        return cls(name=name, create=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def seq(self):
+        return int(self.header[SEQ])
+
+    def last_open_time(self):
+        seq = self.seq
+        if seq == 0:
+            return None
+        return int(self.columns["open_times"][(seq - 1) % self.capacity])
+
+    # ---------- WRITER (ingest process only) ----------
+
+    def publish(self, candle):
+        """candle : dict with CANDLE_FIELDS (one value each)"""
+        seq = self.seq
+        slot = seq % self.capacity
+
+        self.header[VERSION] += 1   # odd: writing
+        for field in CANDLE_FIELDS:
+            column = self.columns[field]
+            column[slot] = candle[field]
+            column[slot + self.capacity] = candle[field]
+        self.header[SEQ] = seq + 1
+        self.header[VERSION] += 1   # even: done
+
+    # publish the candles newer than the last published one, returns how many
+    def publish_new(self, candles):
+        last = self.last_open_time()
+        count = 0
+        for i in range(len(candles["open_times"])):
+            if last is not None and candles["open_times"][i] <= last:
+                continue
+            self.publish({field: candles[field][i] for field in CANDLE_FIELDS})
+            count += 1
+        return count
+
+    # ---------- READERS ----------
+
+    def window(self, n, end_seq=None):
+        """
+        Last n candles up to candle number end_seq (default: newest) as zero-copy views
+        returns dict of arrays (CANDLE_FIELDS) or None if they were overwritten / not there yet
+        """
+        while True:
+            version = int(self.header[VERSION])
+            if version % 2:
+                continue
+            seq = self.seq
+            end_seq = seq if end_seq is None else end_seq
+            n = min(n, end_seq)
+            if end_seq > seq or end_seq - n < seq - self.capacity or n <= 0:
+                return None
+
+            end = (end_seq - 1) % self.capacity + self.capacity + 1
+            views = {field: column[end - n:end] for field, column in self.columns.items()}
+            if int(self.header[VERSION]) == version:
+                return views
+
+    def snapshot(self, n, end_seq=None):
+        views = self.window(n, end_seq)
+        return None if views is None else {field: values.copy() for field, values in views.items()}
+
+    def wait(self, after_seq, timeout=None, condition=None, poll=0.05):
+        """
+        Block until more than after_seq candles are published
+        condition : multiprocessing.Condition shared with the publisher (else polling)
+        returns the current seq (may still be after_seq on timeout)
+        """
+        if condition is not None:
+            with condition:
+                condition.wait_for(lambda: self.seq > after_seq, timeout=timeout)
+            return self.seq
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.seq <= after_seq:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(poll)
+        return self.seq
+
+    def close(self):
+        # numpy views keep the buffer exported, drop them before closing
+        self.columns = {}
+        self.header = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# ---------- PROCESSES ----------
+
+def notify(condition):
+    if condition is not None:
+        with condition:
+            condition.notify_all()
+
+
+# ingest process: the only one that talks to binance
+def ingest_loop(feed, condition=None, symbol="BTCUSDT", interval="15m", history=201):
+    import get_info
+
+    data = get_info.get_ohlcv(symbol=symbol, interval=interval, limit=history)
+    feed.publish_new(klines_to_candles(data[:-1]))
+    notify(condition)
+
+    while True:
+        get_info.wait_for_next_quarter()
+        try:
+            data = get_info.get_ohlcv(symbol=symbol, interval=interval, limit=3)
+            if feed.publish_new(klines_to_candles(data[:-1])):
+                notify(condition)
+        except Exception as e:
+            print("ingest failed:", e)
+        get_info.clock.sleep(get_info.FETCH_WINDOW_SECONDS + 1)
+
+
+# worker process: map the feed and call handler(window, seq) for every new candle
+def worker_loop(feed_name, handler, condition=None, window=200, stop_event=None):
+    feed = SharedCandleFeed.attach(feed_name)
+    seen = feed.seq if getattr(handler, "skip_history", False) else 0
+    try:
+        while stop_event is None or not stop_event.is_set():
+            seq = feed.wait(seen, timeout=1.0, condition=condition)
+            for end_seq in range(seen + 1, seq + 1):
+                views = feed.window(window, end_seq)
+                if views is None:
+                    continue  # fell behind more than the ring holds
+                handler(views, end_seq)
+            seen = seq
+    finally:
+        if hasattr(handler, "finish"):
+            handler.finish()
+        feed.close()
+
+
+def start_workers(feed, handlers, condition=None, window=200):
+    """
+    handlers : picklable callables handler(window, seq), one process each
+               (e.g. engine.StrategyEngine([...]) with the strategies of that worker)
+    returns (processes, stop_event)
+    """
+    stop_event = multiprocessing.Event()
+    processes = []
+    for handler in handlers:
+        process = multiprocessing.Process(target=worker_loop,
+                                          args=(feed.name, handler, condition, window, stop_event),
+                                          daemon=True)
+        process.start()
+        processes.append(process)
+    return processes, stop_event
+
@@ -0,0 +1,154 @@
+import numpy as np
+
+from indicators import ma_array, ema_array, adx_array, rolling_avg_volume
+
+
+# indicators ma_strategy reads, for every candle (computed once, reused by every parameter set)
+def indicator_arrays(open_prices, high_prices, low_prices, close_prices, volume_prices, volume_window=15):
+    """
+    candle i uses only candles 0..i, so row i is what the live bot sees when
+    candle i closes. live uses a 200 candle window, the EMA/ADX warm up from
+    the window start there; the difference is far below the thresholds.
+
+    returns dict of numpy arrays (raw candles + indicators), every array has
+    the same length so a window is just a slice of each one
+    """
+    opens = np.asarray(open_prices, dtype=float)
+    highs = np.asarray(high_prices, dtype=float)
+    lows = np.asarray(low_prices, dtype=float)
+    closes = np.asarray(close_prices, dtype=float)
+    volumes = np.asarray(volume_prices, dtype=float)
+    n = len(closes)
+
+    # ---- MA/EMA ----
+    ema_14 = ema_array(closes, 14)
+    ma_50 = ma_array(closes, 50)
+    ma_130 = ma_array(closes, 130)
+    ma_200 = ma_array(closes, 200)
+
+    # ---- ADX ----
+    adx = adx_array(highs, lows, closes, period=14)
+
+    # ---- MA Distance / Last Candle Move ----
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ma_distance = np.abs(ema_14 - ma_50) / ma_50
+    last_candle_move = np.full(n, np.nan)
+    last_candle_move[1:] = np.abs(closes[1:] - closes[:-1]) / closes[:-1]
+
+    ready = ~(np.isnan(ema_14) | np.isnan(ma_50) | np.isnan(ma_130) | np.isnan(ma_200))
+    ready[:1] = False
+
+    return {
+        "open": opens,
+        "high": highs,
+        "low": lows,
+        "close": closes,
+        "volume": volumes,
+        "ema_14": ema_14,
+        "ma_50": ma_50,
+        "ma_130": ma_130,
+        "ma_200": ma_200,
+        "adx": adx,
+        "vol_avg": rolling_avg_volume(volumes, window=volume_window),
+        "ma_distance": ma_distance,
+        "last_candle_move": last_candle_move,
+        "ready": ready,
+    }
+
+
+def slice_arrays(arrays, start, end):
+    return {name: values[start:end] for name, values in arrays.items()}
+
+
+# entry/exit rules of ma_strategy on precomputed indicator arrays
+def signal_conditions(arrays, ma_distance_threshold=0.00204, candle_move_threshold=0.0082,
+                      adx_filter=True, adx_threshold=20.5,
+                      volume_filter=True, volume_multiplier=1.2, strong_body_ratio=0.6):
+    ready = arrays["ready"]
+    ema_14 = arrays["ema_14"]
+    ma_50 = arrays["ma_50"]
+    ma_130 = arrays["ma_130"]
+    ma_200 = arrays["ma_200"]
+
+    # ---- trend / momentum ----
+    trend_long = ready & (ma_130 >= ma_200) & (ema_14 > ma_50)
+    trend_short = ready & (ma_130 < ma_200) & (ema_14 < ma_50)
+    momentum = (arrays["ma_distance"] > ma_distance_threshold) | (arrays["last_candle_move"] > candle_move_threshold)
+
+    # ---- ADX filter ----
+    adx_pass = arrays["adx"] >= adx_threshold
+
+    # ---- Volume filter (strong candle + volume above the 15 candle average) ----
+    body = np.abs(arrays["close"] - arrays["open"])
+    range_ = arrays["high"] - arrays["low"]
+    strong_candle = (range_ > 0) & (body >= strong_body_ratio * range_)
+    volume_pass = arrays["volume"] >= volume_multiplier * arrays["vol_avg"]
+
+    filters = np.ones(len(ready), dtype=bool)
+    if adx_filter:
+        filters &= adx_pass
+    if volume_filter:
+        filters &= volume_pass & strong_candle
+
+    return {
+        "trend_long": trend_long,
+        "trend_short": trend_short,
+        "momentum": momentum,
+        "adx_pass": adx_pass,
+        "strong_candle": strong_candle,
+        "volume_pass": volume_pass,
+        "entry_long": trend_long & momentum & filters,
+        "entry_short": trend_short & momentum & filters,
+        "exit_long": ready & ((ema_14 < ma_50) | (ma_130 < ma_200)),
+        "exit_short": ready & ((ema_14 > ma_50) | (ma_130 >= ma_200)),
+    }
+
+
+# every rule of ma_strategy as boolean arrays over a whole history
+def signal_matrix(open_prices, high_prices, low_prices, close_prices, volume_prices,
+                  ma_distance_threshold=0.00204, candle_move_threshold=0.0082,
+                  adx_filter=True, adx_threshold=20.5,
+                  volume_filter=True, volume_window=15, volume_multiplier=1.2, strong_body_ratio=0.6):
+    """
+    Compute the MA/ADX/volume conditions of ma_strategy for every candle at once
+
+    returns dict of numpy arrays (indicators + boolean conditions)
+    """
+    arrays = indicator_arrays(open_prices, high_prices, low_prices, close_prices, volume_prices,
+                              volume_window=volume_window)
+    matrix = dict(arrays)
+    matrix.update(signal_conditions(arrays,
+                                    ma_distance_threshold=ma_distance_threshold,
+                                    candle_move_threshold=candle_move_threshold,
+                                    adx_filter=adx_filter, adx_threshold=adx_threshold,
+                                    volume_filter=volume_filter, volume_multiplier=volume_multiplier,
+                                    strong_body_ratio=strong_body_ratio))
+    return matrix
+
+
+class SignalEvents:
+    """
+    Jump between candles where the position can change instead of walking every candle.
+
+    events = SignalEvents(matrix)
+    i = events.next("entry_long", start)   # first candle >= start with an entry, or None
+    """
+
+    def __init__(self, matrix):
+        self.indices = {
+            name: np.flatnonzero(matrix[name])
+            for name in ("entry_long", "entry_short", "exit_long", "exit_short")
+        }
+
+    def next(self, name, start):
+        idx = self.indices[name]
+        pos = np.searchsorted(idx, start)
+        if pos >= len(idx):
+            return None
+        return int(idx[pos])
+
+    # first candle >= start where any of the given signals fires
+    def next_any(self, names, start):
+        found = [self.next(name, start) for name in names]
+        found = [i for i in found if i is not None]
+        return min(found) if found else None
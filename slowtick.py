@@ -0,0 +1,139 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from clock import SystemClock
+
+
+def _stack(frame):
+    """frame -> ("module.py:function", ...) root first"""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+class SlowTickProfiler:
+    """
+    Sampling profiler armed around every tick, kept only for the slow ones.
+
+    begin() (start of ma_strategy) lets a daemon thread sample the tick thread's
+    stack every `interval` seconds (sys._current_frames, no tracing hooks, so the
+    tick itself runs at full speed); between ticks the thread just waits.
+    end(timings, inputs) stops it: a tick over `budget_ms` gets its profile
+    written to `directory`, any other tick's samples are dropped.
+
+    Per slow tick two files, tick_<UTC time>_<ms>ms.*:
+      .folded : collapsed stacks ("a;b;c count"), for flamegraph.pl / speedscope
+      .json   : budget, phase timings, input sizes, top functions by samples
+    Only the newest `keep` dumps are kept.
+    """
+
+    def __init__(self, budget_ms=2000, directory="slow_ticks", interval=0.005, keep=20, clock=None):
+        self.budget_ms = budget_ms
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+        self.clock = clock or SystemClock()
+
+        self.samples = Counter()
+        self.target = None
+        self.armed = threading.Event()
+        self.closed = False
+        self.lock = threading.Lock()
+        self.dumps = 0
+        self.thread = threading.Thread(target=self._loop, name="slow-tick-profiler", daemon=True)
+        self.thread.start()
+
+    def begin(self):
+        with self.lock:
+            self.samples.clear()
+            self.target = threading.get_ident()
+        self.armed.set()
+
+    def end(self, timings, inputs=None):
+        """
+        timings : TickTimer.summary() of the tick
+        inputs  : sizes of what the tick worked on (candles, orders...)
+
+        returns the path of the dump (without extension) or None
+        """
+        self.armed.clear()
+        with self.lock:
+            self.target = None
+            samples = self.samples
+            self.samples = Counter()
+        if self.budget_ms is None or timings["total_ms"] <= self.budget_ms:
+            return None
+        return self.dump(samples, timings, inputs or {})
+
+    def close(self):
+        self.closed = True
+        self.armed.set()
+        self.thread.join(2)
+
+    def _loop(self):
+        while True:
+            self.armed.wait()
+            if self.closed:
+                return
+            with self.lock:
+                target = self.target
+                frame = sys._current_frames().get(target) if target is not None else None
+                if frame is not None:
+                    self.samples[_stack(frame)] += 1
+            del frame
+            time.sleep(self.interval)
+
+    # ---------- DUMP ----------
+
+    def dump(self, samples, timings, inputs):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = self.clock.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        path = os.path.join(self.directory, f"tick_{stamp}_{timings['total_ms']:.0f}ms")
+
+        with open(path + ".folded", "w") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+        total = sum(samples.values())
+        own = Counter()
+        inclusive = Counter()
+        for stack, count in samples.items():
+            own[stack[-1]] += count
+            for name in set(stack):
+                inclusive[name] += count
+
+        report = {
+            "budget_ms": self.budget_ms,
+            "timings": timings,
+            "inputs": inputs,
+            "samples": total,
+            "interval_ms": self.interval * 1000,
+            "top_self": [(name, count, count * 100 / total) for name, count in own.most_common(15)] if total else [],
+            "top_inclusive": [(name, count, count * 100 / total)
+                              for name, count in inclusive.most_common(25)] if total else [],
+        }
+        with open(path + ".json", "w") as f:
+            json.dump(report, f, indent=2, default=str)
+
+        self.dumps += 1
+        self._rotate()
+        print(f"slow tick: {timings['total_ms']:.0f} ms > budget {self.budget_ms} ms | "
+              f"{total} samples -> {path}.folded")
+        return path
+
+    def _rotate(self):
+        names = sorted({name.rsplit(".", 1)[0] for name in os.listdir(self.directory) if name.startswith("tick_")})
+        for old in names[:-self.keep] if self.keep else ():
+            for ext in (".folded", ".json"):
+                try:
+                    os.remove(os.path.join(self.directory, old + ext))
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,141 @@
+import contextlib
+import os
+import time
+
+import numpy as np
+
+from binance_stub import StubBinance
+from clock import SimulatedClock
+from ratelimit import shared_limiter
+
+DAY = 24 * 60 * 60
+DEFAULT_START = 1_704_067_200   # 2024-01-01 00:00 UTC
+
+
+def run_soak(days=30, workdir="soak", start=None, candles=None, seed=0, record=False, quiet=True, sample_every=96):
+    """
+    Run the real live loop (get_info.run_live: scheduler, ma_strategy, checkpoint,
+    DB writes, side effects, maintenance job, RamMonitor) on a SimulatedClock
+    against a local StubBinance, so `days` of live behaviour take minutes.
+
+    workdir      : database.db, checkpoint, tick log, candle store / archive, slow tick dumps of the run
+    start        : unix time (s) of the first tick (default 2024-01-01, or right
+                   after the first CANDLE_BUFFER_SIZE recorded candles)
+    candles      : recorded candles to serve (dict of arrays), default a random walk
+    record       : write the tick log too (tests its growth)
+    quiet        : swallow the bot's console output
+    sample_every : ticks between two samples of DB size / memory (96 = one day)
+
+    returns dict: ticks, days, seconds, speedup, samples [{day, ticks, db_mb,
+                  rss_mb}], db_mb, peak_rss_mb, tick_ms (p50 / p99 / max), closed_orders
+    """
+    import get_info
+    from database import Database
+
+    os.makedirs(workdir, exist_ok=True)
+    if start is None:
+        if candles is not None:
+            start = int(candles["open_times"][get_info.CANDLE_BUFFER_SIZE + 1]) // 1000
+        else:
+            start = DEFAULT_START
+    start = start // 900 * 900
+    until = start + days * DAY
+
+    clock = SimulatedClock(start)
+    stub_start = int(candles["open_times"][0]) if candles is not None else (start - 60 * DAY) * 1000
+    stub = StubBinance(start_ms=stub_start, seed=seed, max_weight=10 ** 12, clock=clock, candles=candles).start()
+
+    # the bot's settings, pointed at the stub / the work dir
+    get_info.clock = clock
+    get_info.BINANCE_URL = stub.url
+    get_info.DB_FILE = os.path.join(workdir, "database.db")
+    get_info.CHECKPOINT_FILE = os.path.join(workdir, "bot_state.ckpt")
+    get_info.SLOW_TICK_DIR = os.path.join(workdir, "slow_ticks")
+    get_info.telegram_enabled = False
+    get_info.EXECUTION_ENABLED = False
+    if get_info.RETENTION_POLICY is not None:
+        get_info.RETENTION_POLICY = dict(get_info.RETENTION_POLICY,
+                                         candle_store=os.path.join(workdir, "candle_store"),
+                                         archive_dir=os.path.join(workdir, "archive"))
+    limiter = shared_limiter()
+    limiter_clock, limiter_sleep = limiter.clock, limiter.sleep
+    limiter.clock, limiter.sleep = clock.monotonic, clock.sleep
+
+    try:
+        import psutil  # noqa: F401  (RamMonitor needs it)
+        rammonitor = True
+    except ImportError:
+        rammonitor = False
+
+    ticks = 0
+    samples = []
+
+    def sample():
+        rss = get_info.ram_monitor.sample() if get_info.ram_monitor is not None else None
+        samples.append({
+            "day": (clock.time() - start) / DAY,
+            "ticks": ticks,
+            "db_mb": os.path.getsize(get_info.DB_FILE) / 1024 ** 2,
+            "rss_mb": rss,
+        })
+
+    def on_tick():
+        nonlocal ticks
+        ticks += 1
+        if ticks % sample_every == 0:
+            sample()
+
+    t = time.perf_counter()
+    out = open(os.devnull, "w") if quiet else None
+    try:
+        with contextlib.redirect_stdout(out) if quiet else contextlib.nullcontext():
+            try:
+                get_info.run_live(rammonitor=rammonitor, until=until, on_tick=on_tick,
+                                  record_file=os.path.join(workdir, "ticks.rec") if record else None)
+            finally:
+                seconds = time.perf_counter() - t
+                # wake the RamMonitor thread (waits for simulated time) and let it end
+                clock.close()
+                if get_info.ram_monitor is not None:
+                    get_info.ram_monitor.join(5)
+    finally:
+        stub.shutdown()
+        limiter.clock, limiter.sleep = limiter_clock, limiter_sleep
+        if out is not None:
+            out.close()
+    if not samples or samples[-1]["ticks"] != ticks:
+        sample()
+
+    db = Database(db_name=get_info.DB_FILE)
+    closed_orders = len(db.get_closed_orders())
+    db.close()
+    critical = np.array([timing["critical_path_ms"] for timing in get_info.tick_timings])
+    return {
+        "ticks": ticks,
+        "days": days,
+        "seconds": seconds,
+        "speedup": days * DAY / seconds if seconds else None,
+        "samples": samples,
+        "db_mb": samples[-1]["db_mb"],
+        "peak_rss_mb": get_info.ram_monitor.peak_mb if get_info.ram_monitor is not None else None,
+        "tick_ms": {
+            "p50": float(np.percentile(critical, 50)) if len(critical) else None,
+            "p99": float(np.percentile(critical, 99)) if len(critical) else None,
+            "max": float(critical.max()) if len(critical) else None,
+        },
+        "closed_orders": closed_orders,
+    }
+
+
+def format_soak(result):
+    lines = [f"soak: {result['days']} days | {result['ticks']} ticks in {result['seconds']:.1f} s "
+             f"(x{result['speedup']:.0f} real time) | closed orders: {result['closed_orders']}"]
+    for s in result["samples"]:
+        rss = f"{s['rss_mb']:.1f} MB" if s["rss_mb"] is not None else "-"
+        lines.append(f"  day {s['day']:5.1f} | ticks {s['ticks']:6d} | db {s['db_mb']:7.2f} MB | rss {rss}")
+    tick = result["tick_ms"]
+    if tick["p50"] is not None:
+        lines.append(f"tick critical path: p50 {tick['p50']:.1f} ms | p99 {tick['p99']:.1f} ms | max {tick['max']:.1f} ms")
+    if result["peak_rss_mb"] is not None:
+        lines.append(f"peak rss: {result['peak_rss_mb']:.1f} MB")
+    return "\n".join(lines)
@@ -0,0 +1,88 @@
+from candles import close_time_str
+
+
+class Frame:
+    """
+    What a strategy sees on a candle: index i into the candles / indicator
+    arrays. The engine reuses one Frame and only moves i, so reading a value
+    is one array lookup.
+
+    candles : dict of arrays (candles.CANDLE_FIELDS)
+    arrays  : signals.indicator_arrays() of the same candles (shared by every strategy)
+    """
+
+    __slots__ = ("i", "candles", "arrays", "new_month")
+
+    def __init__(self, candles, arrays):
+        self.i = 0
+        self.candles = candles
+        self.arrays = arrays
+        self.new_month = False
+
+    @property
+    def price(self):
+        return self.arrays["close"][self.i]
+
+    @property
+    def time_str(self):
+        return close_time_str(self.candles["close_times"][self.i])
+
+    # value of an indicator on this candle ("ema_14", "adx", ...), `back` candles ago
+    def value(self, name, back=0):
+        return self.arrays[name][self.i - back]
+
+
+class Strategy:
+    """
+    Base class for the strategies run by engine.StrategyEngine.
+
+    params     : overrides for backtest.DEFAULT_PARAMS (signal thresholds, but also
+                 the account settings: balance, leverage, fee_rate, cooldown...)
+    prepare()  : called once per candle set (whole history in a backtest, the
+                 candle buffer in live), do the vectorized work here
+    on_candle(): called on every closed candle, returns a list of
+                 rules.ORDER_ACTIONS; TradeManager does the accounting
+    """
+
+    params = {}
+
+    def __init__(self, name=None, **params):
+        self.name = name or type(self).__name__
+        self.params = dict(type(self).params)
+        self.params.update(params)
+
+    def prepare(self, candles, arrays):
+        pass
+
+    def on_candle(self, frame, account):
+        return []
+
+
+class MAStrategy(Strategy):
+    """The rules of get_info.ma_strategy (EMA14/MA50/130/200 + ADX / volume filters)."""
+
+    def prepare(self, candles, arrays):
+        from backtest import DEFAULT_PARAMS, SIGNAL_PARAMS
+        from signals import signal_conditions
+
+        p = dict(DEFAULT_PARAMS)
+        p.update(self.params)
+        conditions = signal_conditions(arrays, **{name: p[name] for name in SIGNAL_PARAMS})
+        # python lists: indexing one is cheaper than a numpy scalar lookup
+        self.entry_long = conditions["entry_long"].tolist()
+        self.exit_long = conditions["exit_long"].tolist()
+        self.entry_short = conditions["entry_short"].tolist()
+        self.exit_short = conditions["exit_short"].tolist()
+
+    def on_candle(self, frame, account):
+        i = frame.i
+        actions = []
+        if self.entry_long[i]:
+            actions.append("open_long")
+        if self.exit_long[i]:
+            actions.append("close_long")
+        if self.entry_short[i]:
+            actions.append("open_short")
+        if self.exit_short[i]:
+            actions.append("close_short")
+        return actions
@@ -0,0 +1,40 @@
+import numpy as np
+
+import backtest
+from backtest import run_backtest
+
+N = 6
+START = 1_704_067_200_000
+MINUTES_15 = 15 * 60 * 1000
+
+
+def flat_candles(low_on=None):
+    open_times = START + np.arange(N, dtype=np.int64) * MINUTES_15
+    close = np.full(N, 100.0)
+    low = np.full(N, 99.5)
+    if low_on is not None:
+        low[low_on] = 90.0
+    return {"open_times": open_times, "open_prices": close.copy(), "high_prices": close + 0.5, "low_prices": low,
+            "close_prices": close, "volume_prices": np.ones(N), "close_times": open_times + MINUTES_15 - 1}
+
+
+# long entry signal on every candle, never an exit signal: only the stop closes
+def entry_every_candle(arrays, **_):
+    n = len(arrays["close"])
+    never = np.zeros(n, dtype=bool)
+    return {"entry_long": np.ones(n, dtype=bool), "exit_long": never,
+            "entry_short": never.copy(), "exit_short": never.copy()}
+
+
+def test_no_entry_on_the_stopped_out_candle(monkeypatch):
+    monkeypatch.setattr(backtest, "signal_conditions", entry_every_candle)
+    candles = flat_candles(low_on=2)
+    arrays = {"close": candles["close_prices"]}
+
+    result = run_backtest(candles, {"stop_loss_percent": 5}, arrays=arrays)
+    trades = result["trade_list"]
+
+    assert [(t["open_index"], t["close_index"], t["exit"]) for t in trades[:1]] == [(0, 2, "stop_loss")]
+    # the live tick that closes on the stop doesn't open again: the next long is on candle 3
+    assert trades[1]["open_index"] == 3
+    assert all(t["open_index"] != 2 for t in trades)
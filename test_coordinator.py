@@ -0,0 +1,71 @@
+import numpy as np
+
+from coordinator import SymbolRunner
+
+N = 400
+MINUTES_15 = 15 * 60 * 1000
+BUFFER = 50
+
+
+class FeedSource:
+    """closed candles up to `now` of a seeded random walk, like KlineSource"""
+
+    interval = "15m"
+
+    def __init__(self):
+        rng = np.random.default_rng(5)
+        close = 30000 + np.cumsum(rng.normal(0, 40, N))
+        open_times = 1_704_067_200_000 + np.arange(N, dtype=np.int64) * MINUTES_15
+        self.candles = {"open_times": open_times, "open_prices": np.r_[close[0], close[:-1]],
+                        "high_prices": close + 20, "low_prices": close - 20, "close_prices": close,
+                        "volume_prices": rng.uniform(1, 100, N), "close_times": open_times + MINUTES_15 - 1}
+        self.now = BUFFER + 1
+
+    def __call__(self, symbol, limit):
+        start = max(self.now - limit, 0)
+        return {field: values[start:self.now] for field, values in self.candles.items()}
+
+
+def runner(tmp_path):
+    source = FeedSource()
+    return source, SymbolRunner("BTCUSDT", source, str(tmp_path), buffer_size=BUFFER)
+
+
+def assert_contiguous(buffer, source):
+    assert len(buffer["open_times"]) == BUFFER
+    assert (np.diff(buffer["open_times"]) == MINUTES_15).all()
+    assert buffer["open_times"][-1] == source.candles["open_times"][source.now - 1]
+
+
+# two candles closed since the last tick: the strategy sees both
+def test_steps_every_new_candle(tmp_path):
+    source, symbol = runner(tmp_path)
+    assert symbol.tick(1)["new_candles"] == BUFFER
+    assert symbol.engine.candle_count == 1
+
+    source.now += 2
+    assert symbol.tick(2)["new_candles"] == 2
+    assert symbol.engine.candle_count == 3
+    assert_contiguous(symbol.buffer, source)
+
+    # same tick again: nothing new, no step
+    assert symbol.tick(2)["new_candles"] == 0
+    assert symbol.engine.candle_count == 3
+
+
+# off longer than the last klines cover: the buffer is loaded again, no hole in it
+def test_gap_reloads_the_buffer(tmp_path):
+    source, symbol = runner(tmp_path)
+    symbol.tick(1)
+
+    source.now += 10
+    result = symbol.tick(2)
+    assert result["new_candles"] == 10
+    assert symbol.engine.candle_count == 2
+    assert_contiguous(symbol.buffer, source)
+
+    # restart from the checkpoint, then the next candle continues the buffer
+    source.now += 1
+    restarted = SymbolRunner("BTCUSDT", source, str(tmp_path), buffer_size=BUFFER)
+    assert restarted.tick(3)["new_candles"] == 1
+    assert_contiguous(restarted.buffer, source)
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from database import Database
+from execution import ExecutionAdapter, ToobitClient
+from toobit_mock import MockToobit
+
+PRICE = 60000.0
+
+
+@pytest.fixture
+def exchange():
+    mock = MockToobit(price=PRICE, slippage_bps=2.0).start()
+    yield mock
+    mock.shutdown()
+    mock.server_close()
+
+
+def adapter(exchange, db_file):
+    client = ToobitClient(exchange.api_key, exchange.secret, base_url=exchange.url)
+    return ExecutionAdapter(client, lambda: Database(db_name=db_file), inline=True)
+
+
+def test_quantity_is_floored_coins(exchange):
+    executor = adapter(exchange, ":memory:")
+    # 500 $ margin x5 at 60000: 0.041666 BTC -> 0.041
+    assert executor.quantity(2500 / PRICE) == pytest.approx(0.041)
+    assert executor.quantity(0.003) == pytest.approx(0.003)
+    assert executor.quantity(0.0009) == 0
+
+
+# the size get_info passes (coins) opens a real order, and the close sells what was filled
+def test_open_then_close_btc(exchange, tmp_path):
+    db_file = os.path.join(tmp_path, "database.db")
+    db = Database(db_name=db_file)
+    position_size = 2500 / PRICE
+    order_id = db.insert_order("BTCUSDT", "long", PRICE, "2024-01-10 00:15:00+00:00", position_size, 500, 5)
+
+    executor = adapter(exchange, db_file)
+    executor.execute("open_long", order_id, PRICE, position_size)
+    opened = executor.fills[-1]
+    assert opened["fill_qty"] == pytest.approx(0.041)
+    assert opened["fill_price"] == pytest.approx(PRICE * 1.0002)
+
+    # after a restart the close quantity comes from the orders table
+    exchange.price = 61000.0
+    restarted = adapter(exchange, db_file)
+    restarted.execute("close_long", order_id, 61000.0)
+    closed = restarted.fills[-1]
+    assert closed["fill_qty"] == pytest.approx(0.041)
+
+    sides = [(order["side"], order["origQty"]) for order in exchange.orders.values()]
+    assert sides == [("BUY_OPEN", "0.041"), ("SELL_CLOSE", "0.041")]
+    execution = Database(db_name=db_file).get_order_execution(order_id)
+    assert execution["open_fill_qty"] == execution["close_fill_qty"] == pytest.approx(0.041)
@@ -0,0 +1,51 @@
+import os
+
+import numpy as np
+import pytest
+
+from indicator_cache import IndicatorCache, CachedIndicator
+from indicators import Indicator
+
+N = 300
+
+
+@pytest.fixture
+def candles():
+    rng = np.random.default_rng(3)
+    close = (30000 + np.cumsum(rng.normal(0, 40, N))).tolist()
+    high = [c + 20 for c in close]
+    low = [c - 20 for c in close]
+    volume = rng.uniform(0, 100, N).tolist()
+    open_times = (1_704_067_200_000 + np.arange(N) * 900_000).tolist()
+    return open_times, close, high, low, volume
+
+
+def test_passed_series_must_match(candles):
+    open_times, close, high, low, volume = candles
+    cached = CachedIndicator("BTCUSDT", "15m", open_times, close, high, low, volume, cache=IndicatorCache())
+
+    # the stored lists (or equal copies) give the plain Indicator result
+    np.testing.assert_array_equal(cached.get_ADX(high, low, close, period=14),
+                                  Indicator(close).get_ADX(high, low, close, period=14))
+    np.testing.assert_array_equal(cached.get_ADX(list(high), list(low), list(close)), cached.get_ADX())
+    assert cached.get_avg_volume_last(volume, window=15) == Indicator(close).get_avg_volume_last(volume, window=15)
+
+    with pytest.raises(ValueError):
+        cached.get_ADX([h + 1 for h in high], low, close)
+    with pytest.raises(ValueError):
+        cached.get_avg_volume_last(volume[:-1])
+
+
+def test_clear_empties_disk_tier(candles, tmp_path):
+    open_times, close, high, low, volume = candles
+    cache = IndicatorCache(disk_dir=str(tmp_path))
+    CachedIndicator("BTCUSDT", "15m", open_times, close, cache=cache).get_MA(50)
+    assert cache.stats()["disk_files"] == 1
+
+    cache.clear()
+    assert cache.stats()["disk_files"] == 0
+    assert os.listdir(tmp_path) == []
+
+    CachedIndicator("BTCUSDT", "15m", open_times, close, cache=cache).get_MA(50)
+    assert cache.stats()["disk_hits"] == 0
+    assert cache.stats()["misses"] == 2
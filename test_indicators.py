@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from indicators import (
+    atr_array, rsi_array, bollinger_array, vwap_array, obv_array, donchian_array,
+    StreamingATR, StreamingRSI, StreamingBollinger, StreamingVWAP, StreamingOBV, StreamingDonchian,
+)
+
+N = 2000
+
+
+# seeded 15m OHLCV random walk around 30k (rounded closes: some flat candles for OBV / RSI)
+@pytest.fixture(scope="module")
+def candles():
+    rng = np.random.default_rng(7)
+    close = np.round(30000 + np.cumsum(rng.normal(0, 40, N)), 0)
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) + rng.uniform(0, 30, N)
+    low = np.minimum(open_, close) - rng.uniform(0, 30, N)
+    volume = rng.uniform(0, 100, N)
+    volume[rng.random(N) < 0.02] = 0.0
+    open_times = 1_704_067_200_000 + np.arange(N, dtype=np.int64) * 15 * 60 * 1000
+    return {"open": open_, "high": high, "low": low, "close": close, "volume": volume, "open_times": open_times}
+
+
+def assert_parity(streamed, batch):
+    streamed = np.asarray(streamed, dtype=float)
+    # same warm-up: NaN exactly where the batch kernel has NaN
+    np.testing.assert_array_equal(np.isnan(streamed), np.isnan(batch))
+    np.testing.assert_allclose(streamed, batch, rtol=1e-7, atol=1e-7)
+
+
+@pytest.mark.parametrize("period", [3, 14])
+def test_atr(candles, period):
+    atr = StreamingATR(period)
+    streamed = [atr.update(h, l, c) for h, l, c in zip(candles["high"], candles["low"], candles["close"])]
+    assert_parity(streamed, atr_array(candles["high"], candles["low"], candles["close"], period))
+
+
+@pytest.mark.parametrize("period", [3, 14])
+def test_rsi(candles, period):
+    rsi = StreamingRSI(period)
+    streamed = [rsi.update(c) for c in candles["close"]]
+    assert_parity(streamed, rsi_array(candles["close"], period))
+
+
+def test_bollinger(candles):
+    bands = StreamingBollinger(20, k=2.0)
+    streamed = np.array([bands.update(c) for c in candles["close"]])
+    for column, batch in enumerate(bollinger_array(candles["close"], 20, k=2.0)):
+        assert_parity(streamed[:, column], batch)
+
+
+@pytest.mark.parametrize("sessions", [False, True])
+def test_vwap(candles, sessions):
+    open_times = candles["open_times"] if sessions else None
+    vwap = StreamingVWAP()
+    streamed = [vwap.update(h, l, c, v, None if open_times is None else t)
+                for h, l, c, v, t in zip(candles["high"], candles["low"], candles["close"], candles["volume"],
+                                         candles["open_times"])]
+    assert_parity(streamed, vwap_array(candles["high"], candles["low"], candles["close"], candles["volume"],
+                                       open_times=open_times))
+
+
+def test_obv(candles):
+    obv = StreamingOBV()
+    streamed = [obv.update(c, v) for c, v in zip(candles["close"], candles["volume"])]
+    assert_parity(streamed, obv_array(candles["close"], candles["volume"]))
+
+
+@pytest.mark.parametrize("period", [1, 20])
+def test_donchian(candles, period):
+    channel = StreamingDonchian(period)
+    streamed = np.array([channel.update(h, l) for h, l in zip(candles["high"], candles["low"])])
+    for column, batch in enumerate(donchian_array(candles["high"], candles["low"], period)):
+        assert_parity(streamed[:, column], batch)
+
+
+# shorter history than the warm-up: all NaN on both sides
+def test_warm_up_only(candles):
+    atr = StreamingATR(14)
+    streamed = [atr.update(h, l, c) for h, l, c in zip(candles["high"][:10], candles["low"][:10], candles["close"][:10])]
+    assert_parity(streamed, atr_array(candles["high"][:10], candles["low"][:10], candles["close"][:10], 14))
+    assert np.isnan(streamed).all()
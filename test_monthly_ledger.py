@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+import get_info
+from database import Database
+from monthly_ledger import MonthlyLedger
+
+MARCH = "2024-03-10 12:14:59.999000+00:00"
+
+
+def ledger_after_close(tmp_path):
+    db = Database(os.path.join(tmp_path, "database.db"))
+    ledger = MonthlyLedger(db)
+    # +40 $ on a 1000 $ tactical balance, compounded to 1040
+    ledger.record_close(MARCH, 40.0, 4.0, 1040.0, 120.0, 1000.0, 1040.0, 0.0, 0.0, True)
+    return db
+
+
+def test_restore_fields_from_last_row(tmp_path):
+    fields = MonthlyLedger(ledger_after_close(tmp_path)).restore_fields()
+    assert fields == {"balance": 1040.0, "balance_without_fee": 1040.0, "tactical_balance": 1040.0,
+                      "save_money": 120.0, "trade_power": True, "profit_percent_per_month": 4.0}
+    assert MonthlyLedger(Database(os.path.join(tmp_path, "empty.db"))).restore_fields() == {}
+
+
+# no checkpoint: balance comes back with the tactical balance, not the 1000 default
+def test_restore_state_without_checkpoint(tmp_path, monkeypatch):
+    db = ledger_after_close(tmp_path)
+    monkeypatch.setattr(get_info, "CHECKPOINT_FILE", os.path.join(tmp_path, "missing.ckpt"))
+    monkeypatch.setattr(get_info, "monthly_ledger", MonthlyLedger(db))
+    for name in get_info.STATE_FIELDS:
+        monkeypatch.setattr(get_info, name, getattr(get_info, name))
+
+    assert get_info.restore_state() is False
+    assert get_info.balance == get_info.balance_without_fee == 1040.0
+    assert get_info.tactical_balance == 1040.0
+    assert get_info.save_money == 120.0
+    assert get_info.profit_percent_per_month == pytest.approx(4.0)
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from portfolio import Portfolio, LONG, SHORT
+
+FEE_RATE = 0.0005
+
+
+def two_positions():
+    portfolio = Portfolio(fee_rate=FEE_RATE, capacity=2)
+    account = portfolio.add_account("a", balance=1000)
+    btc, eth = portfolio.symbol_id("BTCUSDT"), portfolio.symbol_id("ETHUSDT")
+    slots = portfolio.open_positions([account, account], [btc, eth], [LONG, SHORT], [100.0, 10.0], 200.0, 5.0)
+    return portfolio, account, slots
+
+
+def test_open_and_close():
+    portfolio, account, slots = two_positions()
+    assert portfolio.balance[account] == 600
+    assert portfolio.size[slots].tolist() == [10.0, 100.0]
+    assert portfolio.locked_margin()[account] == 400
+
+    # long +2 %, short -1 % of the price (x5 leverage on the pnl)
+    closed = portfolio.close_positions(slots, [102.0, 9.9], times=5)
+
+    assert closed["pnl"].tolist() == pytest.approx([20.0, 10.0])
+    fees = (100 + 102) * 10 * FEE_RATE + (10 + 9.9) * 100 * FEE_RATE
+    assert closed["fee"].sum() == pytest.approx(fees)
+    assert portfolio.balance[account] == pytest.approx(1000 + 30 - fees)
+    assert portfolio.realized[account] == pytest.approx(30 - fees)
+    assert closed["close_time"].tolist() == [5, 5]
+    assert not portfolio.open.any()
+    # the long made 10 % on its margin (2 % without leverage): no cooldown
+    assert portfolio.cooldown[account] == 0
+
+
+# the same slot given twice (or a slot already closed) is credited once
+def test_close_duplicate_slots():
+    portfolio, account, slots = two_positions()
+    closed = portfolio.close_positions([slots[0], slots[0], slots[0]], [100.0, 10.0])
+
+    assert closed["slots"].tolist() == [slots[0]]
+    assert portfolio.balance[account] == pytest.approx(600 + 200 - 2 * 100 * 10 * FEE_RATE)
+    assert portfolio.open[slots].tolist() == [False, True]
+
+    again = portfolio.close_positions([slots[0]], [100.0, 10.0])
+    assert len(again["slots"]) == 0
+    assert portfolio.balance[account] == pytest.approx(800 - 2 * 100 * 10 * FEE_RATE)
+
+
+def test_big_pnl_cooldown_and_risk_masks():
+    portfolio, account, slots = two_positions()
+    prices = np.array([104.0, 12.0])
+
+    # short lost 20 % of its price: 100 % of its margin at x5
+    assert portfolio.stop_losses(prices, 50).tolist() == [False, True]
+    assert portfolio.liquidations(prices).tolist() == [False, True]
+
+    portfolio.close_where([True, False], prices)
+    assert portfolio.cooldown[account] == portfolio.cooldown_after_big_pnl
+    portfolio.tick_cooldown(10)
+    assert portfolio.cooldown[account] == portfolio.cooldown_after_big_pnl - 10
@@ -0,0 +1,112 @@
+import os
+
+import pytest
+
+from account import new_account, open_lot, close_lot, close_position, open_position
+from database import Database
+from engine import StrategyEngine
+from positions import PositionBook
+from strategy import MAStrategy
+from trade_csv_logger import TradeCSVLogger
+from trademanager import TradeManager
+
+FEE_RATE = 0.0005
+TIME = "2024-01-10 00:15:00+00:00"
+LATER = "2024-01-10 04:15:00+00:00"
+
+
+def lot_account(save_money=300):
+    account = new_account(balance=1000, leverage=5)
+    account["save_money"] = save_money
+    trade_manager = TradeManager(TradeCSVLogger(), account["first_balance"], 8, account["tactical_balance"],
+                                 True, 3, verbose=False, positions=PositionBook())
+    return account, trade_manager
+
+
+def open_two(account, trade_manager, sides):
+    return [open_lot(trade_manager, account, "s", "BTCUSDT", side, 100.0, TIME, 0.5)["lot"] for side in sides]
+
+
+# two lots hold the whole balance: closing one at breakeven is a ~0% month, not -50%
+@pytest.mark.parametrize("sides", [("long", "long"), ("long", "short")], ids=["pyramid", "hedge"])
+def test_close_one_lot_at_breakeven(sides):
+    account, trade_manager = lot_account()
+    first, second = open_two(account, trade_manager, sides)
+    assert account["balance"] == 0
+
+    updates = close_lot(trade_manager, account, first["id"], 100.0, LATER, FEE_RATE, 184, 0.5)
+
+    assert account["save_money"] == 300
+    assert account["trade_power"] is True
+    assert trade_manager.tactical_balance == 1000
+    # only the fees are lost
+    assert account["profit_percent_per_month"] == pytest.approx(-0.25)
+    assert account["equity_curve"][-1] == pytest.approx(account["balance"] + second["margin"])
+    assert account["max_drawdown"] == 0
+    assert updates["profit"] == pytest.approx(-2 * 100.0 * first["size"] * FEE_RATE)
+    assert account["lot_margin"] == second["margin"]
+
+
+# the month target is reached on the account equity: the other lot's margin stays locked
+def test_month_target_with_open_lot():
+    account, trade_manager = lot_account(save_money=0)
+    first, second = open_two(account, trade_manager, ("long", "long"))
+
+    close_lot(trade_manager, account, first["id"], 104.0, LATER, FEE_RATE, 184, 0.5)
+
+    equity = account["balance"] + account["lot_margin"] + account["save_money"]
+    assert account["trade_power"] is False
+    assert trade_manager.tactical_balance == pytest.approx(1030)
+    assert account["balance"] + account["lot_margin"] == pytest.approx(1030)
+    assert account["balance"] >= 0
+    assert equity == pytest.approx(1000 + 500 * 5 * 0.04 - 2 * FEE_RATE * first["size"] * 102)
+
+
+# one lot: the same numbers as the single position path
+def test_single_lot_matches_close_position():
+    lots, lot_manager = lot_account()
+    single, single_manager = lot_account()
+    lot = open_two(lots, lot_manager, ("long",))[0]
+    open_position(single_manager, single, "long", 100.0, TIME, 0.5, 1000)
+
+    lot_updates = close_lot(lot_manager, lots, lot["id"], 91.0, LATER, FEE_RATE, 184, 0.5)
+    single_updates = close_position(single_manager, single, 91.0, LATER, FEE_RATE, 184, 0.5)
+
+    for key in ("balance", "save_money", "trade_power", "profit_percent_per_month", "max_drawdown", "equity_curve"):
+        assert lots[key] == single[key]
+    assert lot_updates["profit"] == single_updates["profit"]
+
+
+# lots written through to the positions table come back after a restart and close from there
+def test_restart_from_database(tmp_path):
+    db_file = os.path.join(tmp_path, "database.db")
+    account, trade_manager = lot_account()
+    trade_manager.positions = PositionBook(Database(db_name=db_file))
+    first, second = open_two(account, trade_manager, ("long", "short"))
+
+    book = PositionBook(Database(db_name=db_file)).load()
+    assert sorted(book.open_lots) == [first["id"], second["id"]]
+    assert book.get(second["id"]) == second
+    assert book.locked_margin("s") == first["margin"] + second["margin"]
+
+    trade_manager.positions = book
+    for lot in (first, second):
+        close_lot(trade_manager, account, lot["id"], 100.0, LATER, FEE_RATE, 184, 0.5)
+    assert book.open_lots == {}
+    assert Database(db_name=db_file).get_open_positions() == []
+
+
+# the engine of a live shard loads its strategy's open lots when it starts
+def test_engine_loads_lots(tmp_path):
+    db = Database(db_name=os.path.join(tmp_path, "database.db"))
+    book = PositionBook(db)
+    lot = book.open("lots", "BTCUSDT", "long", 100.0, TIME, 2.5, 50.0, 5)
+    book.open("other", "BTCUSDT", "short", 100.0, TIME, 2.5, 50.0, 5)
+
+    engine = StrategyEngine([MAStrategy("lots", max_lots=2)], db=db)
+    slot = engine.slots["lots"]
+    assert list(slot["trade_manager"].positions.open_lots) == [lot["id"]]
+    assert slot["account"]["lot_margin"] == 50.0
+
+    engine.set_state(engine.get_state())
+    assert list(slot["trade_manager"].positions.open_lots) == [lot["id"]]
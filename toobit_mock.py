@@ -0,0 +1,147 @@
+import argparse
+import hmac
+import itertools
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qsl
+
+from execution import API_KEY_HEADER, ORDER_PATH, DUPLICATE_ORDER_CODE, sign
+
+
+class MockToobit(ThreadingHTTPServer):
+    """
+    Local stand-in for the Toobit futures order endpoints, to run the
+    execution adapter without an account or network.
+
+    price        : mark price, market orders fill around it (set it between calls)
+    slippage_bps : market orders fill this much worse than the mark price
+    fill_delay   : seconds before an order is FILLED (before that it is NEW)
+    latency      : seconds added to every answer
+    lose_every   : the n-th POST is executed but answered with a 503 (tests the
+                   client order id retry)
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port=0, api_key="test-key", secret="test-secret", price=30000.0, slippage_bps=2.0,
+                 fill_delay=0.0, latency=0.0, lose_every=None, recv_window=60000):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.api_key = api_key
+        self.secret = secret
+        self.price = price
+        self.slippage_bps = slippage_bps
+        self.fill_delay = fill_delay
+        self.latency = latency
+        self.lose_every = lose_every
+        self.recv_window = recv_window
+        self.lock = threading.Lock()
+        self.orders = {}          # client order id -> order
+        self.ids = itertools.count(1_000_000)
+        self.posts = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def _view(self, order):
+        filled = time.time() >= order["fill_at"]
+        view = {k: v for k, v in order.items() if k != "fill_at"}
+        view["status"] = "FILLED" if filled else "NEW"
+        view["executedQty"] = order["origQty"] if filled else "0"
+        view["avgPrice"] = order["fill_price"] if filled else "0"
+        del view["fill_price"]
+        return view
+
+    def place(self, query):
+        with self.lock:
+            self.posts += 1
+            client_id = query["newClientOrderId"]
+            if client_id in self.orders:
+                return 400, {"code": DUPLICATE_ORDER_CODE, "msg": "Duplicate clientOrderId"}
+            direction = 1 if query["side"].startswith("BUY") else -1
+            order = {
+                "orderId": next(self.ids),
+                "clientOrderId": client_id,
+                "symbol": query["symbol"],
+                "side": query["side"],
+                "type": query.get("type", "MARKET"),
+                "origQty": query["quantity"],
+                "price": "0",
+                "fill_price": f"{self.price * (1 + direction * self.slippage_bps / 10_000):.2f}",
+                "fill_at": time.time() + self.fill_delay,
+                "time": int(time.time() * 1000),
+            }
+            self.orders[client_id] = order
+            if self.lose_every and self.posts % self.lose_every == 0:
+                return 503, {"code": -1001, "msg": "Internal error; unable to process your request"}
+            return 200, self._view(order)
+
+    def query(self, query):
+        with self.lock:
+            order = self.orders.get(query.get("origClientOrderId"))
+            if order is None:
+                return 400, {"code": -2013, "msg": "Order does not exist."}
+            return 200, self._view(order)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, method):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        if server.latency:
+            time.sleep(server.latency)
+
+        url = urlparse(self.path)
+        if url.path != ORDER_PATH:
+            return self._send(404, {"code": -1, "msg": "not found"})
+        pairs = parse_qsl(url.query)
+        query = dict(pairs)
+        if self.headers.get(API_KEY_HEADER) != server.api_key:
+            return self._send(401, {"code": -2015, "msg": "Invalid API-key"})
+        unsigned = [(k, v) for k, v in pairs if k != "signature"]
+        if not hmac.compare_digest(sign(server.secret, unsigned), query.get("signature", "")):
+            return self._send(401, {"code": -1022, "msg": "Signature for this request is not valid."})
+        if abs(time.time() * 1000 - int(query.get("timestamp", 0))) > int(query.get("recvWindow", server.recv_window)):
+            return self._send(400, {"code": -1021, "msg": "Timestamp for this request is outside of the recvWindow."})
+
+        status, body = server.place(query) if method == "POST" else server.query(query)
+        self._send(status, body)
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_GET(self):
+        self._handle("GET")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="local mock of the toobit futures order endpoints")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--price", type=float, default=30000.0)
+    parser.add_argument("--fill-delay", type=float, default=0.0)
+    args = parser.parse_args()
+    mock = MockToobit(port=args.port, price=args.price, fill_delay=args.fill_delay)
+    print(f"mock toobit on {mock.url} (api key {mock.api_key!r}, secret {mock.secret!r})")
+    mock.serve_forever()
@@ -1,6 +1,3 @@
-import pandas as pd
-
-
 class TradeCSVLogger:
     def __init__(self):
         self.rows = []
@@ -64,6 +61,9 @@ class TradeCSVLogger:
         minutes,
         file_name="data_orders.csv"
     ):
+        # only the csv export needs pandas
+        import pandas as pd
+
         df = pd.DataFrame(self.rows)
 
         summary_row = {
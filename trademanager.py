@@ -41,13 +41,70 @@ def trade_duration(open_time: str, close_time: str):
 
 # Trade manager class to encapsulate open/close logic without changing behavior
 class TradeManager:
-    def __init__(self, csv_logger, first_balance, monthly_profit_percent_stop_trade, tactical_balance, monthly_close_filter, monthly_compound) :
+    def __init__(self, csv_logger, first_balance, monthly_profit_percent_stop_trade, tactical_balance, monthly_close_filter, monthly_compound, verbose=True,
+                 stop_loss_percent=None, take_profit_percent=None, maintenance_rate=0.005, ledger=None, positions=None) :
         self.csv_logger = csv_logger
         self.first_balance = first_balance
         self.monthly_profit_percent_stop_trade = monthly_profit_percent_stop_trade
         self.tactical_balance = tactical_balance
         self.monthly_close_filter = monthly_close_filter
         self.monthly_compound = monthly_compound
+        # backtests run thousands of trades, they turn the terminal output off
+        self.verbose = verbose
+        # protective exits, price move in % from entry (None = off)
+        self.stop_loss_percent = stop_loss_percent
+        self.take_profit_percent = take_profit_percent
+        self.maintenance_rate = maintenance_rate
+        # MonthlyLedger updated on every close (None = not kept)
+        self.ledger = ledger
+        # positions.PositionBook: many lots per symbol (pyramiding / hedging), None = one position per account
+        self.positions = positions
+
+
+    # stop loss / take profit / liquidation prices of a position
+    def protective_levels(self, side, entry_price, leverage):
+        direction = 1 if side == "long" else -1
+
+        stop_price = None
+        if self.stop_loss_percent is not None:
+            stop_price = entry_price * (1 - direction * self.stop_loss_percent / 100)
+
+        take_profit_price = None
+        if self.take_profit_percent is not None:
+            take_profit_price = entry_price * (1 + direction * self.take_profit_percent / 100)
+
+        # isolated margin: the position is liquidated when the loss eats the margin down to the maintenance margin
+        liquidation_price = entry_price * (1 - direction * (1 / leverage - self.maintenance_rate))
+
+        return {
+            'stop_price': stop_price,
+            'take_profit_price': take_profit_price,
+            'liquidation_price': liquidation_price,
+        }
+
+
+    # first protective exit hit inside one bar -> (reason, fill price) or None
+    def intrabar_exit(self, side, levels, open_price, high_price, low_price):
+        long = side == "long"
+
+        # stop / liquidation: whichever comes first on the way against the position
+        adverse, reason = levels['liquidation_price'], "liquidation"
+        if levels['stop_price'] is not None and (levels['stop_price'] > adverse if long else levels['stop_price'] < adverse):
+            adverse, reason = levels['stop_price'], "stop_loss"
+
+        # both touched in the same bar: take the loss (we can't know the order inside the bar)
+        if long and low_price <= adverse:
+            return reason, min(adverse, open_price)
+        if not long and high_price >= adverse:
+            return reason, max(adverse, open_price)
+
+        target = levels['take_profit_price']
+        if target is not None:
+            if long and high_price >= target:
+                return "take_profit", max(target, open_price)
+            if not long and low_price <= target:
+                return "take_profit", min(target, open_price)
+        return None
 
 
     # open long processes
@@ -87,7 +144,8 @@ class TradeManager:
         open_time_value = open_times
         current_position = "long"
 
-        print("Open LONG at price:", entry_price, "$", "| Open Time:", open_time_value, "| leverage:", leverage)
+        if self.verbose:
+            print("Open LONG at price:", entry_price, "$", "| Open Time:", open_time_value, "| leverage:", leverage)
 
         return {
             'entry_price': entry_price,
@@ -118,7 +176,7 @@ class TradeManager:
                 max_drawdown, total_wins, total_wins_long, total_losses,
                 total_long, cooldown_after_big_pnl, leverage,
                 cooldown_until_index, open_time_value, csv_logger, trade_amount_percent, profit_percent_per_month,
-                save_money, trade_power):
+                save_money, trade_power, locked_margin=0):
 
         close_price = open_prices
 
@@ -138,7 +196,9 @@ class TradeManager:
         # profit after fee
         profit = balance - balance_before_trade
         profit_percent = profit * 100 / balance_before_trade
-        profit_percent_per_month = ((balance * 100) / self.tactical_balance) - 100
+        # account equity: free balance + margin still locked in other open lots (lot mode)
+        equity = balance + locked_margin
+        profit_percent_per_month = ((equity * 100) / self.tactical_balance) - 100
         pnl_percent = (pnl / margin) * 100
 
         deducting_fee_total += total_fee
@@ -146,10 +206,10 @@ class TradeManager:
         total_profit_percent += profit_percent
         count_closed_orders += 1
 
-        equity_curve.append(balance)
+        equity_curve.append(equity)
         # ---- calculate max drawdown ----
         peak = max(equity_curve)
-        drawdown = (balance - peak) / peak * 100
+        drawdown = (equity - peak) / peak * 100
         max_drawdown = min(max_drawdown, drawdown)
 
         # ---- count wins and losses ----
@@ -166,21 +226,23 @@ class TradeManager:
         pnl_percent_without_leverage = ((pnl / margin) * 100 ) / leverage
         if pnl_percent_without_leverage >= 4:
             cooldown_until_index = 0 + cooldown_after_big_pnl
-            print(f"🟡 Cooldown Activated (LONG) until candle index {cooldown_until_index}")
+            if self.verbose:
+                print(f"🟡 Cooldown Activated (LONG) until candle index {cooldown_until_index}")
 
         close_time_value = open_times
         days, hours, minutes = trade_duration(open_time_value, close_time_value)
 
 
-        print("Close LONG at price:", close_price, "$", "| Close Time:", close_time_value, "| leverage:", leverage)
-        print("Balance:", round(balance_before_trade, 2), "$", "→", round(balance, 2), "$", "| Save Money:", round(save_money, 2), "$")
-        print("Balance (no fee):",
-            round(balance_before_trade_no_fee, 2), "$", "→", round(balance_without_fee, 2), "$")
-        print("pnl:", round(pnl, 2), "$ |", round(pnl_percent, 2), "% |" , "Amount:", round(margin), "$")
-        print("fee:", round(total_fee, 2), "$")
-        print("Profit:", round(profit, 2), "$ |", round(profit_percent, 2), "%")
-        print(f"Trade Duration: {days} days, {hours} hours, {minutes} minutes")
-        print("-" * 90)
+        if self.verbose:
+            print("Close LONG at price:", close_price, "$", "| Close Time:", close_time_value, "| leverage:", leverage)
+            print("Balance:", round(balance_before_trade, 2), "$", "→", round(balance, 2), "$", "| Save Money:", round(save_money, 2), "$")
+            print("Balance (no fee):",
+                round(balance_before_trade_no_fee, 2), "$", "→", round(balance_without_fee, 2), "$")
+            print("pnl:", round(pnl, 2), "$ |", round(pnl_percent, 2), "% |" , "Amount:", round(margin), "$")
+            print("fee:", round(total_fee, 2), "$")
+            print("Profit:", round(profit, 2), "$ |", round(profit_percent, 2), "%")
+            print(f"Trade Duration: {days} days, {hours} hours, {minutes} minutes")
+            print("-" * 90)
 
         csv_logger.log_trade(
             "LONG",
@@ -205,8 +267,11 @@ class TradeManager:
         )
 
         # ---- save money ----
-        if balance < self.tactical_balance * 75 / 100:
+        tactical_before = self.tactical_balance
+        saved_in = saved_out = 0
+        if equity < self.tactical_balance * 75 / 100:
             if save_money >= self.tactical_balance * 25 / 100:
+                saved_out = self.tactical_balance * 25 / 100
                 balance += self.tactical_balance * 25 / 100
                 save_money -= self.tactical_balance * 25 / 100
 
@@ -214,11 +279,17 @@ class TradeManager:
         if self.monthly_close_filter == True :
             if profit_percent_per_month >= self.monthly_profit_percent_stop_trade:
                 self.tactical_balance = self.tactical_balance + (self.tactical_balance * self.monthly_compound / 100)
-                save_money += balance - self.tactical_balance
-                balance = self.tactical_balance
+                # above the new tactical balance goes to save_money (only the free balance can move)
+                saved_in = min(equity - self.tactical_balance, balance)
+                save_money += saved_in
+                balance = max(self.tactical_balance - locked_margin, 0)
                 cooldown_until_index = 0
                 trade_power = False    # off
 
+        if self.ledger is not None:
+            self.ledger.record_close(close_time_value, profit, profit_percent_per_month, balance, save_money,
+                                     tactical_before, self.tactical_balance, saved_in, saved_out, trade_power)
+
         current_position = None
 
         return {
@@ -280,7 +351,8 @@ class TradeManager:
         open_time_value = open_times
         current_position = "short"
 
-        print("Open SHORT at price:", entry_price, "$", "| Open Time:", open_time_value, "| leverage:", leverage)
+        if self.verbose:
+            print("Open SHORT at price:", entry_price, "$", "| Open Time:", open_time_value, "| leverage:", leverage)
 
         return {
             'entry_price': entry_price,
@@ -311,7 +383,7 @@ class TradeManager:
             max_drawdown, total_wins, total_wins_short, total_losses,
             total_short, cooldown_after_big_pnl, leverage,
             cooldown_until_index, open_time_value, csv_logger, trade_amount_percent, profit_percent_per_month,
-            save_money, trade_power):
+            save_money, trade_power, locked_margin=0):
 
         close_price = open_prices
 
@@ -331,7 +403,9 @@ class TradeManager:
         # profit after fee
         profit = balance - balance_before_trade
         profit_percent = profit * 100 / balance_before_trade
-        profit_percent_per_month = ((balance * 100) / self.tactical_balance) - 100
+        # account equity: free balance + margin still locked in other open lots (lot mode)
+        equity = balance + locked_margin
+        profit_percent_per_month = ((equity * 100) / self.tactical_balance) - 100
         pnl_percent = (pnl / margin) * 100
 
         deducting_fee_total += total_fee
@@ -339,10 +413,10 @@ class TradeManager:
         total_profit_percent += profit_percent
         count_closed_orders += 1
 
-        equity_curve.append(balance)
+        equity_curve.append(equity)
         # ---- calculate max drawdown ----
         peak = max(equity_curve)
-        drawdown = (balance - peak) / peak * 100
+        drawdown = (equity - peak) / peak * 100
         max_drawdown = min(max_drawdown, drawdown)
 
         # ---- count wins and losses ----
@@ -359,21 +433,23 @@ class TradeManager:
         pnl_percent_without_leverage = ((pnl / margin) * 100) / leverage
         if pnl_percent_without_leverage >= 4:
             cooldown_until_index = 0 + cooldown_after_big_pnl
-            print(f"🟡 Cooldown Activated (SHORT) until candle index {cooldown_until_index}")
+            if self.verbose:
+                print(f"🟡 Cooldown Activated (SHORT) until candle index {cooldown_until_index}")
 
         close_time_value = open_times
         days, hours, minutes = trade_duration(open_time_value, close_time_value)
 
 
-        print("Close SHORT at price:", close_price, "$", "| Close Time:", close_time_value, "| leverage:", leverage)
-        print("Balance:", round(balance_before_trade, 2), "$", "→", round(balance, 2), "$", "| Save Money:", round(save_money, 2), "$")
-        print("Balance (no fee):",
-            round(balance_before_trade_no_fee, 2), "$", "→", round(balance_without_fee, 2), "$")
-        print("pnl:", round(pnl, 2), "$ |", round(pnl_percent, 2), "% |", "Amount:", round(margin), "$")
-        print("fee:", round(total_fee, 2), "$")
-        print("Profit:", round(profit, 2), "$ |", round(profit_percent, 2), "%")
-        print(f"Trade Duration: {days} days, {hours} hours, {minutes} minutes")
-        print("-" * 90)
+        if self.verbose:
+            print("Close SHORT at price:", close_price, "$", "| Close Time:", close_time_value, "| leverage:", leverage)
+            print("Balance:", round(balance_before_trade, 2), "$", "→", round(balance, 2), "$", "| Save Money:", round(save_money, 2), "$")
+            print("Balance (no fee):",
+                round(balance_before_trade_no_fee, 2), "$", "→", round(balance_without_fee, 2), "$")
+            print("pnl:", round(pnl, 2), "$ |", round(pnl_percent, 2), "% |", "Amount:", round(margin), "$")
+            print("fee:", round(total_fee, 2), "$")
+            print("Profit:", round(profit, 2), "$ |", round(profit_percent, 2), "%")
+            print(f"Trade Duration: {days} days, {hours} hours, {minutes} minutes")
+            print("-" * 90)
 
         csv_logger.log_trade(
             "SHORT",
@@ -398,8 +474,11 @@ class TradeManager:
         )
 
         # ---- save money ----
-        if balance < self.tactical_balance * 75 / 100:
+        tactical_before = self.tactical_balance
+        saved_in = saved_out = 0
+        if equity < self.tactical_balance * 75 / 100:
             if save_money >= self.tactical_balance * 25 / 100:
+                saved_out = self.tactical_balance * 25 / 100
                 balance += self.tactical_balance * 25 / 100
                 save_money -= self.tactical_balance * 25 / 100
 
@@ -407,11 +486,17 @@ class TradeManager:
         if self.monthly_close_filter == True :
             if profit_percent_per_month >= self.monthly_profit_percent_stop_trade:
                 self.tactical_balance = self.tactical_balance + (self.tactical_balance * self.monthly_compound / 100)
-                save_money += balance - self.tactical_balance
-                balance = self.tactical_balance
+                # above the new tactical balance goes to save_money (only the free balance can move)
+                saved_in = min(equity - self.tactical_balance, balance)
+                save_money += saved_in
+                balance = max(self.tactical_balance - locked_margin, 0)
                 cooldown_until_index = 0
                 trade_power = False    # off
-            
+
+        if self.ledger is not None:
+            self.ledger.record_close(close_time_value, profit, profit_percent_per_month, balance, save_money,
+                                     tactical_before, self.tactical_balance, saved_in, saved_out, trade_power)
+
         current_position = None
 
         return {
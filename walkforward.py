@@ -0,0 +1,293 @@
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from backtest import run_backtest, candle_arrays, equity_max_drawdown
+
+CANDLES_PER_DAY = 4 * 24  # 15m candles
+
+# set in every worker process once, windows only send their indices
+_worker_candles = None
+_worker_arrays = None
+
+
+def _init_worker(candles, arrays):
+    global _worker_candles, _worker_arrays
+    _worker_candles = candles
+    _worker_arrays = arrays
+
+
+def expand_grid(param_grid):
+    """
+    param_grid : {"ma_distance_threshold": [0.0015, 0.002], "adx_threshold": [18, 20.5, 23]}
+    returns list of param dicts (every combination)
+    """
+    names = list(param_grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(param_grid[name] for name in names))]
+
+
+# rolling in-sample / out-of-sample windows over candle indices
+def split_windows(n, in_sample, out_sample, step=None, warmup=200):
+    """
+    n          : number of candles
+    in_sample  : candles used to pick the params
+    out_sample : candles traded with the picked params right after in_sample
+    step       : how far the next window moves (default out_sample, so OOS windows touch)
+    warmup     : candles needed before the first trade (MA200)
+    """
+    step = out_sample if step is None else step
+    windows = []
+    is_start = warmup
+    while is_start + in_sample + out_sample <= n:
+        is_end = is_start + in_sample
+        windows.append((is_start, is_end, is_end + out_sample))
+        is_start += step
+    return windows
+
+
+def score(result, objective="return"):
+    if objective == "return":
+        return result["return_percent"]
+    if objective == "calmar":
+        return result["return_percent"] / max(1.0, abs(result["max_drawdown"]))
+    raise ValueError(f"unknown objective: {objective}")
+
+
+# ---------- SUCCESSIVE HALVING ----------
+
+# end of every rung: min_candles, min_candles * eta, ... up to end (a short last step is merged)
+def halving_rungs(start, end, min_candles, eta=3):
+    ends = []
+    length = min_candles
+    while start + length * eta <= end:
+        ends.append(start + length)
+        length *= eta
+    ends.append(end)
+    return ends
+
+
+# extend some param sets from their last rung to `end`
+def _run_rung(task):
+    combos, states, start, end, last, base_params, objective = task
+    out = []
+    for combo, state in zip(combos, states):
+        params = dict(base_params)
+        params.update(combo)
+        result = run_backtest(_worker_candles, params, arrays=_worker_arrays, start=start, end=end,
+                              close_at_end=last, resume=state)
+        out.append((score(result, objective), result.get("resume"), {
+            "return_percent": result["return_percent"],
+            "max_drawdown": result["max_drawdown"],
+            "trades": result["trades"],
+            "win_rate": result["win_rate"],
+        }))
+    return out
+
+
+def successive_halving(candles, param_grid, start=200, end=None, min_candles=None, eta=3, min_keep=3,
+                       objective="return", base_params=None, workers=None, arrays=None, search="halving"):
+    """
+    Adaptive grid search: every param set is backtested on a short slice, the
+    best 1/eta go on over a slice eta times longer, and so on up to `end`.
+    A set that goes on continues its backtest where it stopped (run_backtest
+    resume), it doesn't start over.
+
+    min_candles : first rung (default: the range / eta**3, so four rungs, at least 14 days)
+    min_keep    : sets that always go on (the order on short slices is noisy)
+    search      : "halving", or "grid" = every set over the whole range (one rung)
+
+    returns dict: params, score, stats (of the winner over [start, end)),
+                  ranking [(score, params, rung end)], candles (backtested),
+                  grid_candles (what a full grid costs), rungs, seconds
+    """
+    t = time.perf_counter()
+    base_params = dict(base_params or {})
+    if "volume_window" in param_grid:
+        raise ValueError("volume_window changes the indicator arrays, it can't be part of the grid")
+    if search not in ("halving", "grid"):
+        raise ValueError(f"unknown search: {search}")
+
+    if arrays is None:
+        arrays = candle_arrays(candles)
+    end = len(arrays["close"]) if end is None else min(end, len(arrays["close"]))
+    combos = expand_grid(param_grid) or [{}]
+    if min_candles is None:
+        min_candles = max(CANDLES_PER_DAY * 14, (end - start) // eta ** 3)
+    rungs = halving_rungs(start, end, min_candles, eta) if search == "halving" else [end]
+
+    workers = workers or os.cpu_count() or 1
+    pool = None
+    if workers > 1 and len(combos) > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(candles, arrays))
+    else:
+        _init_worker(candles, arrays)
+
+    alive = list(range(len(combos)))
+    states = [None] * len(combos)
+    reached = {}
+    evaluated = 0
+    previous = start
+    try:
+        for rung, rung_end in enumerate(rungs):
+            last = rung_end == end
+            # a few chunks per worker: the states travel with their set
+            size = max(1, math.ceil(len(alive) / (workers * 4)))
+            chunks = [alive[k:k + size] for k in range(0, len(alive), size)]
+            tasks = [([combos[c] for c in chunk], [states[c] for c in chunk], start, rung_end, last,
+                      base_params, objective) for chunk in chunks]
+            outputs = pool.map(_run_rung, tasks) if pool is not None else map(_run_rung, tasks)
+
+            scores = {}
+            for chunk, output in zip(chunks, outputs):
+                for c, (value, state, stats) in zip(chunk, output):
+                    scores[c] = value
+                    states[c] = state
+                    reached[c] = (value, rung_end, stats)
+            evaluated += (rung_end - previous) * len(alive)
+            previous = rung_end
+            if last:
+                break
+
+            alive.sort(key=lambda c: scores[c], reverse=True)
+            keep = max(math.ceil(len(alive) / eta), min_keep)
+            for c in alive[keep:]:
+                states[c] = None
+            alive = alive[:keep]
+            if len(alive) <= min_keep:
+                # nothing left to prune: straight to the end
+                rungs[rung + 1:] = [end]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    best = max(alive, key=lambda c: reached[c][0])
+    params = dict(base_params)
+    params.update(combos[best])
+    ranking = sorted(((value, combos[c], rung_end) for c, (value, rung_end, _) in reached.items()),
+                     key=lambda item: (item[2], item[0]), reverse=True)
+    return {
+        "params": params,
+        "score": reached[best][0],
+        "stats": reached[best][2],
+        "ranking": ranking,
+        "candles": evaluated,
+        "grid_candles": len(combos) * (end - start),
+        "rungs": rungs[:rung + 1],
+        "seconds": time.perf_counter() - t,
+    }
+
+
+# optimize on the in-sample part, trade the out-of-sample part with the winner
+def _run_window(task):
+    (is_start, is_end, oos_end), param_grid, base_params, objective, search = task
+
+    if search == "halving":
+        found = successive_halving(_worker_candles, param_grid, start=is_start, end=is_end, objective=objective,
+                                   base_params=base_params, workers=1, arrays=_worker_arrays)
+        best_params, best_score, best_is = found["params"], found["score"], found["stats"]
+    else:
+        best_params = None
+        best_score = None
+        best_is = None
+        for combo in expand_grid(param_grid) or [{}]:
+            params = dict(base_params)
+            params.update(combo)
+            result = run_backtest(_worker_candles, params, arrays=_worker_arrays, start=is_start, end=is_end)
+            value = score(result, objective)
+            if best_score is None or value > best_score:
+                best_params, best_score, best_is = params, value, result
+
+    oos = run_backtest(_worker_candles, best_params, arrays=_worker_arrays, start=is_end, end=oos_end)
+
+    # drop the heavy parts, only what stitching and the report need goes back to the parent
+    return {
+        "in_sample": (is_start, is_end),
+        "out_sample": (is_end, oos_end),
+        "params": best_params,
+        "in_sample_score": best_score,
+        "in_sample_return": best_is["return_percent"],
+        "return_percent": oos["return_percent"],
+        "max_drawdown": oos["max_drawdown"],
+        "trades": oos["trades"],
+        "wins": oos["wins"],
+        "start_equity": oos["start_equity"],
+        "equity_index": oos["equity_index"],
+        "equity": oos["equity"],
+    }
+
+
+def walk_forward(candles, param_grid, in_sample=CANDLES_PER_DAY * 90, out_sample=CANDLES_PER_DAY * 30,
+                 step=None, objective="return", base_params=None, workers=None, search="grid"):
+    """
+    Walk-forward optimization over a candle history
+
+    candles    : dict of arrays (see candles.CANDLE_FIELDS)
+    param_grid : {param: [values]} searched on every in-sample window
+    objective  : "return" or "calmar" (return / max drawdown)
+    workers    : processes (default all cores, 1 = run here without a pool)
+    search     : "grid" (every param set on the whole in-sample window) or
+                 "halving" (successive_halving() inside every window)
+
+    Indicators are computed once on the whole history; every window (and every
+    param set) only re-evaluates the entry/exit conditions on its slice.
+
+    returns dict: windows (per window params and OOS stats), equity_index /
+    equity (stitched OOS curve, each window compounds on the previous one) and
+    the overall OOS stats
+    """
+    base_params = dict(base_params or {})
+    if "volume_window" in param_grid:
+        raise ValueError("volume_window changes the indicator arrays, it can't be part of the grid")
+
+    arrays = candle_arrays(candles)
+    windows = split_windows(len(arrays["close"]), in_sample, out_sample, step)
+    if not windows:
+        raise ValueError("history is shorter than one in-sample + out-of-sample window")
+
+    tasks = [(window, param_grid, base_params, objective, search) for window in windows]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(candles, arrays)
+        results = [_run_window(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)),
+                                 initializer=_init_worker, initargs=(candles, arrays)) as pool:
+            results = list(pool.map(_run_window, tasks))
+
+    return stitch_windows(results)
+
+
+# chain the OOS equity curves: every window starts where the previous one ended
+def stitch_windows(results):
+    index_parts = []
+    equity_parts = []
+    multiplier = 1.0
+    start_equity = results[0]["start_equity"]
+
+    for result in results:
+        relative = result["equity"] / result["start_equity"]
+        index_parts.append(result["equity_index"])
+        equity_parts.append(start_equity * multiplier * relative)
+        multiplier *= relative[-1]
+
+    equity = np.concatenate(equity_parts)
+    trades = sum(r["trades"] for r in results)
+    wins = sum(r["wins"] for r in results)
+
+    return {
+        "windows": results,
+        "equity_index": np.concatenate(index_parts),
+        "equity": equity,
+        "start_equity": start_equity,
+        "final_equity": float(equity[-1]),
+        "return_percent": (multiplier - 1) * 100,
+        "max_drawdown": equity_max_drawdown(equity),
+        "trades": trades,
+        "win_rate": wins * 100 / trades if trades else 0.0,
+        "profitable_windows": sum(1 for r in results if r["return_percent"] > 0),
+    }